@@ -40,6 +40,7 @@ class Api(object):
         self.url = config_server.get("url")
         self.version = config_server.get("version")
         self.identity = IdentityManager.get()
+        self.response_headers = {}
 
     def request(self, params):
         self.check_token()
@@ -74,9 +75,12 @@ class Api(object):
         return self.get_response(response)
 
     def get_response(self, response):
+        self.response_headers = response.headers
         data = self.get_data(response)
         if 200 <= response.status_code < 300:
             return data
+        elif response.status_code == 304:
+            return None  # Not modified, for conditional requests
         elif response.status_code == 401 \
                 and not response.url.endswith("auth/token"):
             self.refresh_token()
@@ -178,6 +182,24 @@ class DeviceApi(Api):
             "path": "/" + self.identity.uuid + "/setting"
         })
 
+    def get_skill_settings(self, etag=None):
+        """ Retrieve the settings of all skills from the web backend
+
+        Args:
+            etag (str): ETag of the previous response, to only get the
+                        settings if they have changed since
+
+        Returns:
+            tuple: list of skill settings or None if not modified, ETag of
+                   the response or None if not supported by the backend
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        settings = self.request({
+            "path": "/" + self.identity.uuid + "/skill",
+            "headers": headers
+        })
+        return settings, self.response_headers.get("ETag")
+
     def get_location(self):
         """ Retrieve device location information from the web backend
 
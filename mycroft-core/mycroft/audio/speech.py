@@ -24,7 +24,7 @@ from mycroft.util.log import LOG
 ws = None
 config = None
 tts = None
-tts_hash = None
+tts_changed = False
 lock = Lock()
 
 _last_stop_signal = 0
@@ -42,7 +42,6 @@ def handle_speak(event):
         Handle "speak" message
     """
     config = Configuration.get()
-    Configuration.init(ws)
     global _last_stop_signal
 
     # Mild abuse of the signal system to allow other processes to detect
@@ -84,11 +83,11 @@ def mute_and_speak(utterance):
         Args:
             utterance: The sentence to be spoken
     """
-    global tts_hash
+    global tts_changed
 
     lock.acquire()
     # update TTS object if configuration has changed
-    if tts_hash != hash(str(config.get('tts', ''))):
+    if tts_changed:
         global tts
         # Stop tts playback thread
         tts.playback.stop()
@@ -96,7 +95,7 @@ def mute_and_speak(utterance):
         # Create new tts instance
         tts = TTSFactory.create()
         tts.init(ws)
-        tts_hash = hash(str(config.get('tts', '')))
+        tts_changed = False
 
     LOG.info("Speak: " + utterance)
     try:
@@ -118,6 +117,15 @@ def handle_stop(event):
         tts.playback.clear_visimes()
 
 
+def handle_tts_config(config):
+    """
+        Handle change of the tts configuration, the tts is replaced before
+        speaking the next sentence.
+    """
+    global tts_changed
+    tts_changed = True
+
+
 def init(websocket):
     """
         Start speach related handlers
@@ -125,7 +133,6 @@ def init(websocket):
 
     global ws
     global tts
-    global tts_hash
     global config
 
     ws = websocket
@@ -137,7 +144,7 @@ def init(websocket):
 
     tts = TTSFactory.create()
     tts.init(ws)
-    tts_hash = config.get('tts')
+    Configuration.subscribe('tts', handle_tts_config)
 
 
 def shutdown():
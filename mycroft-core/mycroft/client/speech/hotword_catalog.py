@@ -0,0 +1,125 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Catalog of hot words kept in a file, e.g. the topics of bookmarks.
+
+    Each line of the file is a key phrase, optionally followed by a tab
+    and its threshold. Lines starting with # are comments. The phonemes
+    of the key phrases are looked up in the pocketsphinx dictionary.
+
+    The file is polled for changes. Lines appended to it are read on
+    their own, so adding a topic doesn't mean reading the whole catalog
+    again. A file replaced, truncated or rewritten is read completely.
+    Only complete lines are read, a line is added once it ends with a
+    newline.
+"""
+import hashlib
+import os
+
+from mycroft.util.log import LOG
+
+
+class HotWordCatalog(object):
+    """
+        Hot words listed in a catalog file.
+
+        Args:
+            path (str):                 path of the catalog
+            phoneme_dict (PhonemeDict): dictionary to look up phonemes in
+            threshold (float):          threshold of lines without one
+    """
+
+    def __init__(self, path, phoneme_dict, threshold=1e-20):
+        self.path = path
+        self.phoneme_dict = phoneme_dict
+        self.threshold = threshold
+        self.keywords = {}  # hot word: (key phrase, phonemes, threshold)
+        self._read_size = 0  # Bytes of the file read
+        self._read_hash = hashlib.md5()  # Of the bytes read
+        self._stat = None  # (inode, size, mtime) when read
+
+    def parse(self, line):
+        """
+            Parse a line of the catalog.
+
+            Returns: (hot word, (key phrase, phonemes, threshold)), None
+                     for comments or if the phonemes can't be found
+        """
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return None
+        fields = line.split('\t')
+        key_phrase = ' '.join(fields[0].lower().split())
+        try:
+            threshold = float(fields[1]) if len(fields) > 1 else None
+        except ValueError:
+            threshold = None
+        phonemes = self.phoneme_dict.phonemes(key_phrase)
+        if not phonemes:
+            LOG.warning('No phonemes found for hot word ' + key_phrase)
+            return None
+        return key_phrase, (key_phrase, phonemes, threshold or self.threshold)
+
+    def read(self):
+        """
+            Read the changes to the catalog since the last read.
+
+            Returns: (added, removed), the keywords added by hot word and
+                     the list of hot words removed
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            stat = None
+        if stat is None:
+            removed = list(self.keywords)
+            self.keywords = {}
+            self._read_size, self._stat = 0, None
+            self._read_hash = hashlib.md5()
+            return {}, removed
+        current = (stat.st_ino, stat.st_size, stat.st_mtime)
+        if current == self._stat:
+            return {}, []
+
+        appended = (self._stat and self._stat[0] == stat.st_ino and
+                    stat.st_size >= self._read_size)
+        with open(self.path) as f:
+            if appended:
+                # A file truncated and written again keeps its inode,
+                # the lines read before must be unchanged
+                read = hashlib.md5(f.read(self._read_size))
+                appended = read.digest() == self._read_hash.digest()
+            if not appended:
+                f.seek(0)
+            data = f.read()
+        data = data[:data.rfind('\n') + 1]
+        if not appended:
+            self._read_size, self._read_hash = 0, hashlib.md5()
+        self._read_size += len(data)
+        self._read_hash.update(data)
+        self._stat = current
+
+        keywords = dict(filter(None, map(self.parse, data.splitlines())))
+        self.phoneme_dict.store()
+        if appended:
+            added = dict((k, v) for k, v in keywords.items()
+                         if self.keywords.get(k) != v)
+            self.keywords.update(added)
+            return added, []
+        added = dict((k, v) for k, v in keywords.items()
+                     if self.keywords.get(k) != v)
+        removed = [k for k in self.keywords if k not in keywords]
+        self.keywords = keywords
+        return added, removed
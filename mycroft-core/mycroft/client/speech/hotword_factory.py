@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import json
 import tempfile
 import time
 
 import os
 from os.path import dirname, exists, join, abspath
+from threading import Lock
 
 from mycroft.configuration import Configuration
 from mycroft.util.log import LOG
@@ -42,8 +44,37 @@ class HotWordEngine(object):
     def found_wake_word(self, frame_data):
         return False
 
+    def update(self, chunk):
+        """
+            Feed the next chunk of the audio stream to the engine.
+
+            Engines detecting in a stream of their own get each chunk once,
+            the default is checking the chunk on its own.
+
+            Returns: True if the key phrase was heard
+        """
+        return self.found_wake_word(str(chunk))
+
+    def reset(self):
+        """ Forget the audio fed with update() so far. """
+        pass
+
+    @classmethod
+    def parameters(cls, key_phrase, config, lang):
+        """
+            Get the parameters an engine is created with, engines created
+            with the same parameters are interchangeable.
+
+            Returns: hashable tuple
+        """
+        return (cls.__name__, str(key_phrase).lower(),
+                json.dumps(config, sort_keys=True), str(lang).lower())
+
 
 class PocketsphinxHotWord(HotWordEngine):
+    PHONEMES = "HH EY . M AY K R AO F T"
+    THRESHOLD = 1e-90
+
     def __init__(self, key_phrase="hey mycroft", config=None, lang="en-us"):
         super(PocketsphinxHotWord, self).__init__(key_phrase, config, lang)
         # Hotword module imports
@@ -55,16 +86,28 @@ class PocketsphinxHotWord(HotWordEngine):
                 str(module) + " module does not match with "
                               "Hotword class pocketsphinx")
         # Hotword module params
-        self.phonemes = self.config.get("phonemes", "HH EY . M AY K R AO F T")
+        self.phonemes = self.config.get("phonemes", self.PHONEMES)
 	print("self.phonemes-->", self.phonemes)
         self.num_phonemes = len(self.phonemes.split())
 	print("self.phonemes-->", self.num_phonemes)
-        self.threshold = self.config.get("threshold", 1e-90)
+        self.threshold = self.config.get("threshold", self.THRESHOLD)
         self.sample_rate = self.listener_config.get("sample_rate", 1600)
         dict_name = self.create_dict(self.key_phrase, self.phonemes)
 	print("dict_name-->",dict_name)
         config = self.create_config(dict_name, Decoder.default_config())
-        self.decoder = Decoder(config)
+        try:
+            self.decoder = Decoder(config)
+        finally:
+            os.remove(dict_name)  # Read by the decoder
+        self.utterance_started = False
+
+    @classmethod
+    def parameters(cls, key_phrase, config, lang):
+        listener_config = Configuration.get().get("listener", {})
+        return (cls.__name__, str(key_phrase).lower(),
+                config.get("phonemes", cls.PHONEMES),
+                config.get("threshold", cls.THRESHOLD),
+                listener_config.get("sample_rate", 1600), str(lang).lower())
 
     def create_dict(self, key_phrase, phonemes):
         (fd, file_name) = tempfile.mkstemp()
@@ -90,6 +133,7 @@ class PocketsphinxHotWord(HotWordEngine):
         return config
 
     def transcribe(self, byte_data, metrics=None):
+        self.reset()
         start = time.time()
         self.decoder.start_utt()
         self.decoder.process_raw(byte_data, False, False)
@@ -103,6 +147,30 @@ class PocketsphinxHotWord(HotWordEngine):
         hyp = self.transcribe(frame_data)
         return hyp and self.key_phrase in hyp.hypstr.lower()
 
+    def update(self, chunk):
+        """
+            Feed a chunk to the open keyword spotting utterance.
+
+            The utterance is only restarted after a detection, so every
+            chunk is decoded once.
+
+            Returns: True if the key phrase was heard
+        """
+        if not self.utterance_started:
+            self.decoder.start_utt()
+            self.utterance_started = True
+        self.decoder.process_raw(str(chunk), False, False)
+        hyp = self.decoder.hyp()
+        if hyp and self.key_phrase in hyp.hypstr.lower():
+            self.reset()
+            return True
+        return False
+
+    def reset(self):
+        if self.utterance_started:
+            self.decoder.end_utt()
+            self.utterance_started = False
+
 
 class SnowboyHotWord(HotWordEngine):
     def __init__(self, key_phrase="hey mycroft", config=None, lang="en-us"):
@@ -130,6 +198,208 @@ class SnowboyHotWord(HotWordEngine):
         return wake_word == 1
 
 
+class PocketsphinxKeywordSpotter(object):
+    """
+        Spots the key phrases of many hot words with one pocketsphinx
+        decoder, searching a keyword list with a threshold per phrase.
+
+        Hot words can be added and removed while the decoder is used, the
+        new words are added to its dictionary and the keyword list is
+        replaced. Pronunciations no longer used stay in the dictionary.
+
+        Args:
+            keywords (dict):    hot word: (key phrase, phonemes, threshold)
+            sample_rate (int):  sample rate of the audio
+            lang (str):         language of the acoustic model
+    """
+    SEARCH = 'keywords'
+
+    def __init__(self, keywords, sample_rate=16000, lang="en-us"):
+        from pocketsphinx import Decoder
+        self.lang = str(lang).lower()
+        self.sample_rate = sample_rate
+        self.keywords = {}  # hot word: (key phrase, threshold)
+        self.hot_words = {}  # key phrase: hot words spotted by it
+        self.pronunciations = {}  # word: list of phonemes
+        self._add_keywords(keywords)
+        files = [self.create_dict(), self.create_keyword_list()]
+        config = self.create_config(files[0], files[1],
+                                    Decoder.default_config())
+        try:
+            self.decoder = Decoder(config)
+        finally:
+            for file_name in files:
+                os.remove(file_name)  # Read by the decoder
+        self.utterance_started = False
+        self._lock = Lock()  # The decoder is updated by another thread
+
+    def _add_keywords(self, keywords):
+        """
+            Add hot words, replacing those with the same name.
+
+            Returns: list of (dictionary word, phonemes) added
+        """
+        new_words = []
+        for hot_word in sorted(keywords):
+            key_phrase, phonemes, threshold = keywords[hot_word]
+            key_phrase = ' '.join(str(key_phrase).lower().split())
+            words = self.add_words(key_phrase, phonemes or '')
+            if words is None:
+                LOG.error('Phonemes ' + str(phonemes) + ' do not match ' +
+                          key_phrase)
+                continue
+            new_words += words
+            self.keywords[hot_word] = (key_phrase, float(threshold or 1e-90))
+        self._map_hot_words()
+        return new_words
+
+    def _map_hot_words(self):
+        self.hot_words = {}
+        for hot_word in sorted(self.keywords):
+            key_phrase = self.keywords[hot_word][0]
+            self.hot_words.setdefault(key_phrase, []).append(hot_word)
+
+    def add_words(self, key_phrase, phonemes):
+        """
+            Add the pronunciations of the words of a key phrase.
+
+            Returns: list of (dictionary word, phonemes) added, None if the
+                     phonemes don't match the words
+        """
+        words = key_phrase.split()
+        phoneme_groups = [' '.join(g.split()) for g in phonemes.split('.')]
+        if len(words) != len(phoneme_groups) or not all(phoneme_groups):
+            return None
+        added = []
+        for word, phoneme in zip(words, phoneme_groups):
+            pronunciations = self.pronunciations.setdefault(word, [])
+            if phoneme not in pronunciations:
+                pronunciations.append(phoneme)
+                added.append((self.dict_word(word, len(pronunciations)),
+                              phoneme))
+        return added
+
+    @staticmethod
+    def dict_word(word, number):
+        """ Alternative pronunciations are written as word(2) """
+        return word if number == 1 else '{}({})'.format(word, number)
+
+    def thresholds(self):
+        """ Returns: dict of the lowest threshold by key phrase """
+        thresholds = {}
+        for key_phrase, threshold in self.keywords.values():
+            thresholds[key_phrase] = min(
+                threshold, thresholds.get(key_phrase, threshold))
+        return thresholds
+
+    def create_dict(self):
+        (fd, file_name) = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            for word in sorted(self.pronunciations):
+                for i, phoneme in enumerate(self.pronunciations[word]):
+                    f.write(self.dict_word(word, i + 1) + ' ' + phoneme +
+                            '\n')
+        return file_name
+
+    def create_keyword_list(self):
+        (fd, file_name) = tempfile.mkstemp()
+        thresholds = self.thresholds()
+        with os.fdopen(fd, 'w') as f:
+            for key_phrase in sorted(thresholds):
+                f.write('{} /{}/\n'.format(key_phrase,
+                                           thresholds[key_phrase]))
+        return file_name
+
+    def create_config(self, dict_name, keyword_list, config):
+        model_file = join(RECOGNIZER_DIR, 'model', self.lang, 'hmm')
+        if not exists(model_file):
+            LOG.error('PocketSphinx model not found at ' + str(model_file))
+        config.set_string('-hmm', model_file)
+        config.set_string('-dict', dict_name)
+        config.set_string('-kws', keyword_list)
+        config.set_float('-samprate', self.sample_rate)
+        config.set_int('-nfft', 2048)
+        return config
+
+    def add(self, keywords):
+        """
+            Start spotting more hot words.
+
+            Args:
+                keywords (dict): hot word: (key phrase, phonemes, threshold)
+        """
+        with self._lock:
+            self._update_decoder(self._add_keywords(keywords))
+
+    def set_keywords(self, keywords):
+        """
+            Spot the given hot words instead of the current ones, the
+            decoder is only updated if they differ.
+
+            Args:
+                keywords (dict): hot word: (key phrase, phonemes, threshold)
+        """
+        with self._lock:
+            previous = self.keywords
+            self.keywords = {}
+            new_words = self._add_keywords(keywords)
+            if new_words or self.keywords != previous:
+                self._update_decoder(new_words)
+
+    def _update_decoder(self, new_words):
+        for i, (word, phonemes) in enumerate(new_words):
+            # The search is updated with the last word
+            self.decoder.add_word(word, phonemes, i == len(new_words) - 1)
+        self._set_keyword_list()
+
+    def remove(self, hot_words):
+        """ Stop spotting hot words. """
+        with self._lock:
+            for hot_word in hot_words:
+                self.keywords.pop(hot_word, None)
+            self._map_hot_words()
+            self._set_keyword_list()
+
+    def _set_keyword_list(self):
+        self._end_utterance()
+        keyword_list = self.create_keyword_list()
+        try:
+            self.decoder.set_kws(self.SEARCH, keyword_list)
+            self.decoder.set_search(self.SEARCH)
+        finally:
+            os.remove(keyword_list)
+
+    def update(self, chunk):
+        """
+            Feed a chunk to the open keyword spotting utterance.
+
+            Returns: list of the hot words whose key phrase was heard
+        """
+        with self._lock:
+            if not self.utterance_started:
+                self.decoder.start_utt()
+                self.utterance_started = True
+            self.decoder.process_raw(str(chunk), False, False)
+            if self.decoder.hyp() is None:
+                return []
+            heard = []
+            for segment in self.decoder.seg():
+                for hot_word in self.hot_words.get(segment.word.strip(), []):
+                    if hot_word not in heard:
+                        heard.append(hot_word)
+            self._end_utterance()
+            return heard
+
+    def reset(self):
+        with self._lock:
+            self._end_utterance()
+
+    def _end_utterance(self):
+        if self.utterance_started:
+            self.decoder.end_utt()
+            self.utterance_started = False
+
+
 class HotWordFactory(object):
     CLASSES = {
         "pocketsphinx": PocketsphinxHotWord,
@@ -137,15 +407,34 @@ class HotWordFactory(object):
     }
 
     @staticmethod
-    def create_hotword(hotword="hey mycroft", config=None, lang="en-us"):
-        LOG.info("creating " + hotword)
+    def create_hotword(hotword="hey mycroft", config=None, lang="en-us",
+                       cache=None):
+        """
+            Create the engine of a hot word.
+
+            Args:
+                hotword (str):  hot word in the config
+                config (dict):  hot words config, from the configuration
+                                if None
+                lang (str):     language
+                cache (dict):   engines by parameters, an engine created
+                                with the same parameters is reused from it
+                                and new engines are added to it
+        """
         if not config:
             config = Configuration.get().get("hotwords", {})
         module = config.get(hotword).get("module", "pocketsphinx")
         config = config.get(hotword, {"module": "pocketsphinx"})
         clazz = HotWordFactory.CLASSES.get(module)
+        key = clazz and clazz.parameters(hotword, config, lang)
+        if cache is not None and key in cache:
+            return cache[key]
+        LOG.info("creating " + hotword)
         try:
-            return clazz(hotword, config, lang=lang)
+            engine = clazz(hotword, config, lang=lang)
+            if cache is not None:
+                cache[key] = engine
+            return engine
         except (KeyboardInterrupt, SystemExit):
             raise
         except:
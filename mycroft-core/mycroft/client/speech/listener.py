@@ -13,8 +13,8 @@
 # limitations under the License.
 #
 import time
-import datetime
 from Queue import Queue, Empty
+from os.path import expanduser, join
 from threading import Thread
 
 import speech_recognition as sr
@@ -23,9 +23,14 @@ from requests import HTTPError
 from requests.exceptions import ConnectionError
 
 import mycroft.dialog
-from mycroft.client.speech.hotword_factory import HotWordFactory
+from mycroft.client.speech.hotword_catalog import HotWordCatalog
+from mycroft.client.speech.hotword_factory import (
+    HotWordFactory,
+    PocketsphinxKeywordSpotter,
+    RECOGNIZER_DIR
+)
 from mycroft.client.speech.mic import MutableMicrophone, ResponsiveRecognizer
-from mycroft.client.speech.recognizer.pocketsphinx_recognizer import PocketsphinxRecognizer
+from mycroft.client.speech.phoneme_dict import PhonemeDict, find_dict
 from mycroft.configuration import ConfigurationManager
 from mycroft.metrics import MetricsAggregator
 from mycroft.session import SessionManager
@@ -213,11 +218,23 @@ class RecognizerLoop(EventEmitter):
         EventEmitter loop running speech recognition. Local wake word
         recognizer and remote general speech recognition.
     """
+    # Configuration sections used by the loop, it's reloaded if they change
+    CONFIG_SECTIONS = ['lang', 'listener', 'hotwords', 'hot_words',
+                       'hotword_catalog', 'stt']
+    # Listener settings of the microphone, it's reopened if they change
+    AUDIO_SETTINGS = ['device_index', 'sample_rate', 'channels']
 
     def __init__(self):
         super(RecognizerLoop, self).__init__()
         self.mute_calls = 0
+        self._config_changed = False
+        self._engines = {}  # Hot word engines by their parameters
+        self.keyword_spotter = None
+        self.hot_word_catalog = None
+        self._catalog_config = None
         self._load_config()
+        ConfigurationManager.subscribe(self.CONFIG_SECTIONS,
+                                       self._on_config_changed)
 
     def _load_config(self):
         """
@@ -226,7 +243,6 @@ class RecognizerLoop(EventEmitter):
         LOG.info("*********loading configuration")
         config = ConfigurationManager.get()
         self.config_core = config
-        self._config_hash = hash(str(config))
         self.lang = config.get('lang')
         self.config = config.get('listener')
         rate = self.config.get('sample_rate')
@@ -236,47 +252,149 @@ class RecognizerLoop(EventEmitter):
                                             mute=self.mute_calls > 0)
         # FIXME - channels are not been used
         self.microphone.CHANNELS = self.config.get('channels')
-        self.wakeword_recognizer = self.create_wake_word_recognizer(rate,self.lang)
+        self.create_recognizers(rate)
+        self.state = RecognizerLoopState()
+
+    def create_recognizers(self, rate):
+        """
+            Create the wake word and hot word engines and the recognizer
+            listening for them.
+
+            Engines created before with the same parameters are reused,
+            only those whose parameters changed are created.
+        """
+        self.wakeword_recognizer = self.create_wake_word_recognizer(rate, self.lang)
         # TODO - localization
-        self.wakeup_recognizer = self.create_wakeup_recognizer(rate,self.lang)
-        self.hot_word_engines = {}
-        self.create_hot_word_engines()
         self.wakeup_recognizer = self.create_wakeup_recognizer(rate, self.lang)
+        self.hot_word_engines = {}
+        self.create_hot_word_engines(rate, self.lang)
         self.responsive_recognizer = ResponsiveRecognizer(
-            self.wakeword_recognizer, self.hot_word_engines)
-        self.state = RecognizerLoopState()
+            self.wakeword_recognizer, self.hot_word_engines,
+            self.keyword_spotter)
 
-    def create_hot_word_engines(self):
-        LOG.info("###############********creating hotword engines************************************************************************")
+        # Drop the engines no longer used
+        used = set(id(e[0]) for e in self.hot_word_engines.values())
+        used.update([id(self.wakeword_recognizer),
+                     id(self.wakeup_recognizer)])
+        self._engines = dict((k, e) for k, e in self._engines.items()
+                             if id(e) in used)
+
+    def create_hot_word_engines(self, rate, lang):
+        """
+            Create the engines detecting the configured hot words.
+
+            The key phrases of the pocketsphinx hot words are all searched
+            by one keyword spotter, instead of a decoder with its own
+            acoustic model per hot word. Other modules get an engine each.
+        """
+        LOG.info("creating hotword engines")
         hot_words = self.config_core.get("hotwords", {})
+        keywords = {}
         for word in hot_words:
-                     print("wake word creation for one word started:-"+str(datetime.datetime.now()))
-                     data = hot_words[word]
-                     print("#######################xx***********************************found wake word************************************************************************")
-                     #if not data.get("active", True):
-                         #continue
-                     engine_type = data["module"]
-                     ding = data.get("sound")
-                     utterance = data.get("utterance")
-                     listen = data.get("listen", True)
-                     # data = data["data"]
-                     LOG.info("Creating hotword engine for " + word)
-                     lang = self.config_core.get("lang", "en-us")
-		     print("@@@@@@@@@@@ lang @@@@@@@@@@@@@@@@@@@@@",lang)
-                     # rate = self.config.get("rate")
-                     hot_word = data.get("hot_word")
-                     print("@@@@@@@@@@@ hot_word @@@@@@@@@@@@@@@@@@@@@",hot_word)
-                     phonemes = data.get('phonemes')
-		     print("@@@@@@@@@@@ phonemes @@@@@@@@@@@@@@@@@@@@@",phonemes)
-                     threshold = data.get('threshold')
-                     engine = PocketsphinxRecognizer(hot_word, phonemes,
-                                                     threshold, 16000, lang)
-                     print("wake word for one word finished:-"+str(datetime.datetime.now()))
-		     if engine is None:
-				print("engine is null!!!!!!")
-                     self.hot_word_engines[word] = [engine, ding, utterance,
-                                                   engine_type]
+            data = hot_words[word]
+            if not data.get("active", True):
+                continue
+            module = data.get("module", "pocketsphinx")
+            ding = data.get("sound")
+            utterance = data.get("utterance")
+            listen = data.get("listen", True)
+            LOG.info("Creating hotword engine for " + word)
+            if module == "pocketsphinx":
+                engine = None  # The keyword spotter, created below
+                keywords[word] = (data.get("hot_word", word),
+                                  data.get("phonemes"),
+                                  data.get("threshold"))
+            else:
+                engine = HotWordFactory.create_hotword(word, hot_words, lang,
+                                                       self._engines)
+            self.hot_word_engines[word] = [engine, ding, utterance, listen]
+
+        self.hot_word_catalog = self.create_hot_word_catalog(lang)
+        catalog_keywords = {}
+        if self.hot_word_catalog:
+            self.hot_word_catalog.read()
+            catalog_keywords = dict(
+                (w, k) for w, k in self.hot_word_catalog.keywords.items()
+                if w not in hot_words)
+            keywords.update(catalog_keywords)
+
+        spotter = self.keyword_spotter
+        if not keywords:
+            self.keyword_spotter = None
+        elif spotter and (spotter.sample_rate, spotter.lang) == (
+                rate, str(lang).lower()):
+            # Only the changed key phrases are passed to the decoder
+            spotter.set_keywords(keywords)
+        else:
+            self.keyword_spotter = PocketsphinxKeywordSpotter(keywords,
+                                                              rate, lang)
+        for word in keywords:
+            if word not in catalog_keywords:
+                self.hot_word_engines[word][0] = self.keyword_spotter
+        self._add_catalog_engines(catalog_keywords)
+
+    def create_hot_word_catalog(self, lang):
+        """
+            Create the catalog of extra hot words, whose phonemes are
+            looked up in the pocketsphinx dictionary of the language.
+        """
+        config = self.config_core.get("hotword_catalog", {})
+        if not config.get("file"):
+            return None
+        if self.hot_word_catalog and self._catalog_config == (config, lang):
+            return self.hot_word_catalog
+        self._catalog_config = (config, lang)
+        dict_file = config.get("dict") or find_dict(
+            join(RECOGNIZER_DIR, 'model', lang))
+        if not dict_file:
+            LOG.warning("No pocketsphinx dictionary for " + lang +
+                        ", the hot word catalog is not used")
+            return None
+        return HotWordCatalog(expanduser(config["file"]),
+                              PhonemeDict(dict_file),
+                              config.get("threshold", 1e-20))
+
+    def _read_hot_word_catalog(self):
+        """
+            Read the catalog changes, except for hot words of the config.
 
+            Returns: (added, removed) hot words of the catalog
+        """
+        added, removed = self.hot_word_catalog.read()
+        hot_words = self.config_core.get("hotwords", {})
+        added = dict((w, k) for w, k in added.items() if w not in hot_words)
+        removed = [w for w in removed if w not in hot_words]
+        return added, removed
+
+    def _add_catalog_engines(self, keywords):
+        config = self.config_core.get("hotword_catalog", {})
+        for word in keywords:
+            self.hot_word_engines[word] = [self.keyword_spotter,
+                                           config.get("sound"), None,
+                                           config.get("listen", True)]
+
+    def update_hot_word_catalog(self):
+        """
+            Start spotting the hot words added to the catalog since the
+            last update, without creating a new decoder.
+        """
+        added, removed = self._read_hot_word_catalog()
+        if not added and not removed:
+            return
+        LOG.info("Hot word catalog changed, {} added, {} removed".format(
+            len(added), len(removed)))
+        for word in removed:
+            self.hot_word_engines.pop(word, None)
+        if self.keyword_spotter:
+            if removed:
+                self.keyword_spotter.remove(removed)
+            if added:
+                self.keyword_spotter.add(added)
+        elif added:
+            self.keyword_spotter = PocketsphinxKeywordSpotter(
+                added, self.config.get('sample_rate'), self.lang)
+            self.responsive_recognizer.keyword_spotter = self.keyword_spotter
+        self._add_catalog_engines(added)
 
     def create_wake_word_recognizer(self, rate, lang):
         # Create a local recognizer to hear the wakeup word, e.g. 'Hey Mycroft'
@@ -294,12 +412,14 @@ class RecognizerLoop(EventEmitter):
             config[word]["threshold"] = thresh
         if phonemes is None or thresh is None:
             config = None
-        return HotWordFactory.create_hotword(word, config, self.lang)
+        return HotWordFactory.create_hotword(word, config, self.lang,
+                                             self._engines)
 
     def create_wakeup_recognizer(self, rate, lang):
         LOG.info("creating stand up word engine")
         word = self.config.get("stand_up_word", "wake up")
-        return HotWordFactory.create_hotword(word, lang=self.lang)
+        return HotWordFactory.create_hotword(word, lang=self.lang,
+                                             cache=self._engines)
 
     def start_async(self):
         """
@@ -362,14 +482,23 @@ class RecognizerLoop(EventEmitter):
     def awaken(self):
         self.state.sleeping = False
 
+    def _on_config_changed(self, config):
+        self._config_changed = True
+
     def run(self):
         self.start_async()
         while self.state.running:
             try:
                 time.sleep(1)
-                if self._config_hash != hash(
-                        str(ConfigurationManager().get())):
+                if self.hot_word_catalog:
+                    try:
+                        self.update_hot_word_catalog()
+                    except Exception:
+                        LOG.exception('Could not update the hot words '
+                                      'from the catalog')
+                if self._config_changed:
                     LOG.debug('Config has changed, reloading...')
+                    self._config_changed = False
                     self.reload()
             except KeyboardInterrupt as e:
                 LOG.error(e)
@@ -379,9 +508,37 @@ class RecognizerLoop(EventEmitter):
     def reload(self):
         """
             Reload configuration and restart consumer and producer
+
+            The microphone is only reopened if its settings changed.
+            Otherwise the producer switches to a recognizer with the new
+            engines at its next listen and the consumer gets the new
+            engines, without closing the audio stream.
         """
-        self.stop()
-        # load config
-        self._load_config()
-        # restart
-        self.start_async()
+        config = ConfigurationManager.get()
+        listener = config.get('listener')
+        if any(listener.get(s) != self.config.get(s)
+               for s in self.AUDIO_SETTINGS):
+            self.stop()
+            # load config
+            self._load_config()
+            # restart
+            self.start_async()
+            return
+
+        stt_changed = (config.get('stt') != self.config_core.get('stt') or
+                       config.get('lang') != self.lang)
+        previous = self.responsive_recognizer
+        self.config_core = config
+        self.lang = config.get('lang')
+        self.config = listener
+        self.create_recognizers(listener.get('sample_rate'))
+
+        recognizer = self.responsive_recognizer
+        recognizer.energy_threshold = previous.energy_threshold
+        recognizer.ring = previous.ring
+        self.producer.recognizer = recognizer
+        previous.stop()  # Stops waiting for the wake word
+        self.consumer.wakeup_recognizer = self.wakeup_recognizer
+        self.consumer.wakeword_recognizer = self.wakeword_recognizer
+        if stt_changed:
+            self.consumer.stt = STTFactory.create()
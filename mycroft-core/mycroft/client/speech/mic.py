@@ -13,7 +13,6 @@
 # limitations under the License.
 #
 import audioop
-import collections
 import datetime
 import shutil
 from tempfile import gettempdir
@@ -32,7 +31,9 @@ from speech_recognition import (
     AudioData
 )
 
+from mycroft.client.speech.ring_buffer import RingBuffer
 from mycroft.configuration import ConfigurationManager
+from mycroft.identity import IdentityManager
 from mycroft.session import SessionManager
 from mycroft.util import (
     check_for_signal,
@@ -42,7 +43,6 @@ from mycroft.util import (
 )
 import speech_recognition as sr
 from mycroft.util.log import LOG
-import time
 
 class MutableStream(object):
     def __init__(self, wrapped_stream, format, muted=False):
@@ -52,6 +52,7 @@ class MutableStream(object):
 
         self.SAMPLE_WIDTH = pyaudio.get_sample_size(format)
         self.muted_buffer = b''.join([b'\x00' * self.SAMPLE_WIDTH])
+        self.silence = b''
 
     def mute(self):
         self.muted = True
@@ -59,25 +60,44 @@ class MutableStream(object):
     def unmute(self):
         self.muted = False
 
-    def read(self, size):
-        frames = collections.deque()
+    def _read(self, size):
+        """ Read size frames, yields the parts read from the stream. """
         remaining = size
         while remaining > 0:
             to_read = min(self.wrapped_stream.get_read_available(), remaining)
             if to_read == 0:
                 sleep(.01)
                 continue
-            result = self.wrapped_stream.read(to_read)
-            frames.append(result)
+            yield self.wrapped_stream.read(to_read)
             remaining -= to_read
 
-        if self.muted:
-            return self.muted_buffer
         input_latency = self.wrapped_stream.get_input_latency()
         if input_latency > 0.2:
             LOG.warning("High input latency: %f" % input_latency)
-        audio = b"".join(list(frames))
-        return audio
+
+    def read(self, size):
+        frames = list(self._read(size))
+        if self.muted:
+            return self.muted_buffer
+        if len(frames) == 1:
+            return frames[0]
+        return b"".join(frames)
+
+    def read_into(self, view):
+        """
+            Fill a writable memoryview with audio, silence if muted.
+
+            Args:
+                view (memoryview): buffer for a whole number of frames
+        """
+        offset = 0
+        for frames in self._read(len(view) // self.SAMPLE_WIDTH):
+            view[offset:offset + len(frames)] = frames
+            offset += len(frames)
+        if self.muted:
+            if len(self.silence) != len(view):
+                self.silence = b'\0' * len(view)
+            view[:] = self.silence
 
     def close(self):
         self.wrapped_stream.close()
@@ -158,7 +178,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
     # Time between pocketsphinx checks for the wake word
     SEC_BETWEEN_WW_CHECKS = 0.2
 
-    def __init__(self, wake_word_recognizer, hot_word_engines=None):
+    def __init__(self, wake_word_recognizer, hot_word_engines=None,
+                 keyword_spotter=None):
         if hot_word_engines is None:
                 hot_word_engines = {}
         self.config = ConfigurationManager.instance()
@@ -175,7 +196,6 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
         speech_recognition.Recognizer.__init__(self)
         self.wake_word_recognizer = wake_word_recognizer
-        self.audio = pyaudio.PyAudio()
         self.multiplier = listener_config.get('multiplier')
         self.energy_ratio = listener_config.get('energy_ratio')
         # check the config for the flag to save wake words.
@@ -189,11 +209,38 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         self.mic_level_file = os.path.join(get_ipc_directory(), "mic_level")
         self._stop_signaled = False
         self.hot_word_engines = hot_word_engines
+        # Engine shared by the hot words searched in one keyword list
+        self.keyword_spotter = keyword_spotter
+        self.ring = None
 
     @staticmethod
     def record_sound_chunk(source):
         return source.stream.read(source.CHUNK)
 
+    def _ring_for(self, source, sec_per_buffer):
+        """
+            Get the buffer for the audio of a source, it holds the saved
+            wake word and the longest phrase.
+        """
+        chunk_size = source.CHUNK * source.SAMPLE_WIDTH
+        if not self.ring or self.ring.chunk_size != chunk_size:
+            seconds = self.SAVED_WW_SEC + self.RECORDING_TIMEOUT + 1
+            self.ring = RingBuffer(chunk_size,
+                                   int(seconds / sec_per_buffer) + 1)
+        return self.ring
+
+    def _read_chunk(self, source):
+        """
+            Read a chunk from the source into the ring buffer.
+
+            Returns: buffer with the chunk, valid until overwritten
+        """
+        read_into = getattr(source.stream, 'read_into', None)
+        if read_into:
+            read_into(self.ring.next_slot())
+            return self.ring.commit()
+        return self.ring.append(self.record_sound_chunk(source))
+
     @staticmethod
     def calc_energy(sound_chunk, sample_width):
         return audioop.rms(sound_chunk, sample_width)
@@ -210,8 +257,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             sec_per_buffer (float):  Fractional number of seconds in each chunk
 
         Returns:
-            bytearray: complete audio buffer recorded, including any
-                       silence at the end of the user's utterance
+            str: complete audio buffer recorded, including any
+                 silence at the end of the user's utterance
         """
 
         num_loud_chunks = 0
@@ -243,13 +290,13 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         max_chunks_of_silence = int(self.RECORDING_TIMEOUT_WITH_SILENCE /
                                     sec_per_buffer)
 
-        # bytearray to store audio in
-        byte_data = '\0' * source.SAMPLE_WIDTH
+        # The phrase is recorded in the ring buffer
+        ring = self._ring_for(source, sec_per_buffer)
+        start = ring.position
 
         phrase_complete = False
         while num_chunks < max_chunks and not phrase_complete:
-            chunk = self.record_sound_chunk(source)
-            byte_data += chunk
+            chunk = self._read_chunk(source)
             num_chunks += 1
 
             energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
@@ -285,7 +332,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             if check_for_signal('buttonPress'):
                 phrase_complete = True
 
-        return byte_data
+        return ring.get(start)
 
     @staticmethod
     def sec_to_bytes(sec, source):
@@ -360,31 +407,24 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
     def _wait_until_wake_word(self, source, sec_per_buffer, emitter):
         """Listen continuously on source until a wake word is spoken
 
+        Every chunk is fed once to the hot word engines, which keep an
+        utterance open and spot their key phrase in the audio heard since
+        their last detection, instead of decoding the last TEST_WW_SEC of
+        audio again at every check.
 
-	Args:
+        Args:
             source (AudioSource):  Source producing the audio chunks
             sec_per_buffer (float):  Fractional number of seconds in each chunk
-       """
-        #print("source is-->",source)
-
-	num_silent_bytes = int(self.SILENCE_SEC * source.SAMPLE_RATE *
-                               source.SAMPLE_WIDTH)
-        """
-        silence = '\0' * num_silent_bytes
-
-        # bytearray to store audio in
-        byte_data = silence
-
-        buffers_per_check = self.SEC_BETWEEN_WW_CHECKS / sec_per_buffer
-        buffers_since_check = 0.0
-
-        # Max bytes for byte_data before audio is removed from the front
-        max_size = self.sec_to_bytes(self.SAVED_WW_SEC, source)
-        test_size = self.sec_to_bytes(self.TEST_WW_SEC, source)
+            emitter (EventEmitter): Emitter for the hot word notifications
         """
+        ring = self._ring_for(source, sec_per_buffer)
+        if self.keyword_spotter:
+            self.keyword_spotter.reset()
+        for engine, _, _, _ in self.hot_word_engines.values():
+            engine.reset()
 
         said_wake_word = False
-        """
+
         # Rolling buffer to track the audio energy (loudness) heard on
         # the source recently.  An average audio energy is maintained
         # based on these levels.
@@ -394,15 +434,11 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         energy_avg_samples = int(5 / sec_per_buffer)  # avg over last 5 secs
 
         counter = 0
-        """
 
         while not said_wake_word and not self._stop_signaled:
-            """
             if self._skip_wake_word():
                 break
-            chunk = self.record_sound_chunk(source)
-
-            # LOG.info("((((((check 1))))))))")
+            chunk = self._read_chunk(source)
 
             energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
             if energy < self.energy_threshold * self.multiplier:
@@ -434,124 +470,95 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                 f.close()
             counter += 1
 
-            #LOG.info("((((((check 2))))))))")
-            # At first, the buffer is empty and must fill up.  After that
-            # just drop the first chunk bytes to keep it the same size.
-            needs_to_grow = len(byte_data) < max_size
-            if needs_to_grow:
-                byte_data += chunk
-            else:  # Remove beginning of audio and add new chunk to end
-                byte_data = byte_data[len(chunk):] + chunk
-
-            buffers_since_check += 1.0
-            if buffers_since_check > buffers_per_check:
-                buffers_since_check -= buffers_per_check
-                chopped = byte_data[-test_size:] \
-                    if test_size < len(byte_data) else byte_data
-                #audio_data = chopped + silence
-                """
-            r = sr.Recognizer()
-            audio_data = self.read_wave_file("/home/sg/wavFiles/software.wav")
-            wakeWord =  r.recognize_sphinx(audio_data)
-
-            LOG.debug("*********time before check for hotwords------>>>"+str(datetime.datetime.now()))
-            said_wake_word = self.check_for_hotwords(wakeWord, emitter)
-            LOG.debug("*********time after check for hotwords------>>>"+str(datetime.datetime.now()))
-            """
-            if said_wake_word:
+            said_wake_word = self.check_for_hotwords(chunk, emitter)
+
+        if said_wake_word and self.save_wake_words:
+            self._save_wake_word(
+                ring.tail(self.sec_to_bytes(self.SAVED_WW_SEC, source)),
+                source)
+
+    def _save_wake_word(self, byte_data, source):
+        """ Save the audio of a wake word and upload it if enabled. """
+        audio = self._create_audio_data(byte_data, source)
+
+        if not isdir(self.save_wake_words_dir):
+            mkdir(self.save_wake_words_dir)
+        dr = self.save_wake_words_dir
+
+        ww_module = self.wake_word_recognizer.__class__.__name__
+
+        ww = self.wake_word_name.replace(' ', '-')
+        md = str(abs(hash(ww_module)))
+        stamp = str(int(1000 * get_time()))
+        sid = SessionManager.get().session_id
+        uid = IdentityManager.get().uuid
+
+        fn = join(dr, '.'.join([ww, md, stamp, sid, uid]) + '.wav')
+        with open(fn, 'wb') as f:
+            f.write(audio.get_wav_data())
+
+        if self.upload_config['enable'] or self.config['opt_in']:
+            t = Thread(target=self._upload_file, args=(fn,))
+            t.daemon = True
+            t.start()
+
+    def check_for_hotwords(self, chunk, emitter):
+        """
+            Feed a chunk to the hot word engines and notify the detected
+            hot words.
+
+            Args:
+                chunk:                  audio chunk read from the source
+                emitter (EventEmitter): emitter for the notifications
+
+            Returns: True if a detected hot word starts listening
+        """
+        start_listening = False
+        # The listener adds and removes hot words of the catalog
+        engines = dict(self.hot_word_engines)
+        for hotword in self._feed_hot_word_engines(chunk, engines):
+            engine, ding, utterance, listen = engines[hotword]
+            LOG.debug("Hot Word detected: " + hotword)
+            # The listener looks up which hot word was heard
+            with open("hotWordFile.txt", "w") as f:
+                f.write(unicodedata.normalize(
+                    'NFKD', unicode(hotword)).encode('ascii', 'ignore'))
+
+            # Hot Word succeeded
+            payload = {
+                'hotword': hotword,
+                'start_listening': listen,
+                'sound': ding,
+                "engine": "pocketsphinx"
+            }
+            emitter.emit("recognizer_loop:hotword", payload)
+            if utterance:
+                # send the transcribed word on for processing
                 payload = {
-                    'hotword': self.wake_word_recognizer.key_phrase,
-                    'start_listening': True,
-                    'sound': resolve_resource_file(
-                        self.config.get('sounds').get('start_listening')),
-                    "engine": "pocketsphinx"
+                    'utterances': [utterance]
                 }
-                emitter.emit("recognizer_loop:hotword", payload)
-                    # If enabled, play a wave file with a short sound
-                    # to audibly indicate recording has begun.
-                if self.config.get('confirm_listening'):
-                    file = resolve_resource_file(
-                        self.config.get('sounds').get('start_listening'))
-                    if file:
-                        play_wav(file)
-                        #sleep(10)
-                    # if a wake word is success full then record audio in temp
-                    # file.
-
-                if self.save_wake_words:
-                    audio = self._create_audio_data(byte_data, source)
-
-                    if not isdir(self.save_wake_words_dir):
-                        mkdir(self.save_wake_words_dir)
-                    dr = self.save_wake_words_dir
-
-                    ww_module = self.wake_word_recognizer.__class__.__name__
-
-                    ww = self.wake_word_name.replace(' ', '-')
-                    md = str(abs(hash(ww_module)))
-                    stamp = str(int(1000 * get_time()))
-                    sid = SessionManager.get().session_id
-                    uid = IdentityManager.get().uuid
-
-                    fn = join(dr, '.'.join([ww, md, stamp, sid, uid]) + '.wav')
-                    with open(fn, 'wb') as f:
-                        f.write(audio.get_wav_data())
-
-                    if self.upload_config['enable'] or self.config['opt_in']:
-                        t = Thread(target=self._upload_file, args=(fn,))
-                        t.daemon = True
-                        t.start()
-                        """
-
-    def check_for_hotwords(self, wakeWord, emitter):
-             print("******wakeWord passed is--->", wakeWord)
-             # check hot word
-             for hotword in self.hot_word_engines:
-                 print("*************hotword is****>", hotword)
-                 engine, ding, utterance, listen = self.hot_word_engines[hotword]
-                 #found = wakeWord == hotword
-                 LOG.error("typeof hotword::::"+str(type(hotword)))
-                 LOG.error("typeof wakeWord::::"+str(type(wakeWord)))
-                 hotword = unicodedata.normalize('NFKD', hotword).encode('ascii','ignore')
-                 LOG.error("new hotword:::"+hotword+ " res "+str(wakeWord == hotword))
-                 if wakeWord == hotword:
-                     LOG.error("Hot Word detected time: "+ str(datetime.datetime.now()))
-                     #self.finalHotWord = wakeWord
-                     fileName = "hotWordFile.txt"
-                     file = open(fileName,"w")
-                     file.write(wakeWord)
-                     file.close()
-                     # If enabled, play a wave file with a short sound to audibly
-                     # indicate hotword was detected.
-
-                     """
-                     if ding:
-                         try:
-                             file = resolve_resource_file(ding)
-                             if file:
-                                 play_wav(file)
-                         except Exception as e:
-                             print e
-                    """
-
-                     # Hot Word succeeded
-                     payload = {
-                         'hotword': hotword,
-                         'start_listening': listen,
-                         'sound': ding,
-                         "engine": "pocketsphinx"
-                     }
-                     emitter.emit("recognizer_loop:hotword", payload)
-                     if utterance:
-                     # send the transcribed word on for processing
-                         payload = {
-                             'utterances': [utterance]
-                         }
-                         emitter.emit("recognizer_loop:utterance", payload)
-                     if listen:
-                     # start listening
-                         return True
-             return False
+                emitter.emit("recognizer_loop:utterance", payload)
+            if listen:
+                # start listening
+                start_listening = True
+        return start_listening
+
+    def _feed_hot_word_engines(self, chunk, engines):
+        """
+            Feed a chunk once to every engine.
+
+            Returns: list of the hot words heard
+        """
+        heard = []
+        spotter = self.keyword_spotter
+        if spotter:
+            heard = spotter.update(chunk)
+        for hotword, (engine, _, _, _) in engines.iteritems():
+            if engine is spotter:
+                continue  # Already fed
+            if engine.update(chunk):
+                heard.append(hotword)
+        return [h for h in heard if h in engines]
 
     @staticmethod
     def _create_audio_data(raw_data, source):
@@ -589,8 +596,6 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         self.adjust_for_ambient_noise(source, 1.0)
 
         #LOG.debug("Waiting for wake word...")
-	    #LOG.debug("****source  is-->", source)
-        time.sleep(10)
         self._wait_until_wake_word(source, sec_per_buffer, emitter)
 
         if self._stop_signaled:
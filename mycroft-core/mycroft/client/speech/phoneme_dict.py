@@ -0,0 +1,195 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Phonemes of words looked up in a pocketsphinx dictionary.
+
+    The dictionary is memory-mapped instead of read. The offsets of its
+    lines are sorted by word into an index, which is stored next to the
+    looked up phonemes in a cache directory. A lookup is a binary search
+    touching a few lines of the dictionary, and words looked up before
+    don't need the dictionary at all. The index is rebuilt when the
+    dictionary changes.
+"""
+import bisect
+import json
+import marshal
+import mmap
+import os
+import re
+from array import array
+from glob import glob
+from hashlib import md5
+from os.path import basename, expanduser, isdir, join
+
+from mycroft.util.log import LOG
+
+CACHE_DIR = expanduser('~/.mycroft/phonemes')
+WORD = re.compile(r'^[ \t]*(\S+)', re.MULTILINE)  # Word of a line
+
+
+def find_dict(model_dir):
+    """
+        Find the pocketsphinx dictionary of a model.
+
+        Args:
+            model_dir (str): directory of the model of a language
+
+        Returns: path of the first .dict file in it, None if there is none
+    """
+    dicts = sorted(glob(join(model_dir, '*.dict')))
+    return dicts[0] if dicts else None
+
+
+class _Words(object):
+    """ Sequence of the words of the index, for bisect. """
+
+    def __init__(self, phoneme_dict):
+        self.phoneme_dict = phoneme_dict
+
+    def __len__(self):
+        return len(self.phoneme_dict.index)
+
+    def __getitem__(self, i):
+        return self.phoneme_dict.word_at(self.phoneme_dict.index[i])
+
+
+class PhonemeDict(object):
+    """
+        Pocketsphinx dictionary, lines of "word PH O NE MES".
+
+        Args:
+            path (str):         path of the dictionary
+            cache_dir (str):    directory for the index and the phonemes
+                                looked up
+    """
+
+    def __init__(self, path, cache_dir=CACHE_DIR):
+        self.path = path
+        name = basename(path) + '.' + md5(path).hexdigest()[:8]
+        self.index_file = join(cache_dir, name + '.index')
+        self.cache_file = join(cache_dir, name + '.json')
+        self.index = None
+        self._map = None
+        self._dirty = False
+        stat = os.stat(path)
+        self.version = [stat.st_size, stat.st_mtime]
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+            if cache.get('version') == self.version:
+                return cache['words']
+        except (IOError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _open(self):
+        """ Map the dictionary and load or build its index. """
+        if self._map is not None:
+            return
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with open(self.index_file, 'rb') as f:
+                version, offsets = marshal.load(f)
+            if version == self.version:
+                self.index = array('l')
+                self.index.fromstring(offsets)
+                return
+        except (IOError, EOFError, ValueError, TypeError):
+            pass
+        self.index = self._build_index()
+        self._write(self.index_file,
+                    marshal.dumps((self.version, self.index.tostring())))
+
+    def _build_index(self):
+        LOG.debug('Indexing ' + self.path)
+        words = {}
+        for match in WORD.finditer(self._map):
+            word = match.group(1)
+            # Alternative pronunciations, word(2), are ignored
+            if not word.endswith(')') and word not in words:
+                words[word] = match.start()
+        return array('l', [words[w] for w in sorted(words)])
+
+    def _line_at(self, offset):
+        end = self._map.find('\n', offset)
+        return self._map[offset:end if end >= 0 else len(self._map)]
+
+    def word_at(self, offset):
+        """ Returns: word of the line starting at offset """
+        parts = self._line_at(offset).split(None, 1)
+        return parts[0] if parts else ''
+
+    def lookup(self, word):
+        """
+            Get the phonemes of a word.
+
+            Args:
+                word (str): word, looked up in lower case
+
+            Returns: phonemes separated by spaces, None if the word isn't
+                     in the dictionary
+        """
+        word = word.lower()
+        if word in self.cache:
+            return self.cache[word]
+        self._open()
+        i = bisect.bisect_left(_Words(self), word)
+        phonemes = None
+        if i < len(self.index) and self.word_at(self.index[i]) == word:
+            phonemes = ' '.join(self._line_at(self.index[i]).split()[1:])
+        self.cache[word] = phonemes
+        self._dirty = True
+        return phonemes
+
+    def phonemes(self, phrase):
+        """
+            Get the phonemes of a phrase in the format of the hotwords
+            configuration, e.g. "HH EY . M AY K R AO F T".
+
+            Returns: phonemes, None if a word isn't in the dictionary
+        """
+        phonemes = [self.lookup(word) for word in phrase.split()]
+        if not phonemes or None in phonemes:
+            return None
+        return ' . '.join(phonemes)
+
+    def store(self):
+        """ Save the phonemes looked up since the last store. """
+        if self._dirty:
+            self._write(self.cache_file, json.dumps(
+                {'version': self.version, 'words': self.cache}))
+            self._dirty = False
+
+    @staticmethod
+    def _write(path, data):
+        try:
+            directory = os.path.dirname(path)
+            if not isdir(directory):
+                os.makedirs(directory)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.rename(tmp, path)
+        except (IOError, OSError) as e:
+            LOG.warning('Could not write ' + path + ': ' + repr(e))
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
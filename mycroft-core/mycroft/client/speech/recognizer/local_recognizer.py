@@ -27,6 +27,8 @@ BASEDIR = os.path.dirname(os.path.abspath(__file__))
  
  
 class LocalRecognizer(object):
+    utterance_started = False  # Keyword spotting utterance fed by update
+
     def __init__(self, key_phrase, phonemes, threshold, sample_rate=16000,
                  lang="en-us"):
         self.lang = lang
@@ -35,7 +37,10 @@ class LocalRecognizer(object):
         self.threshold = threshold
         self.phonemes = phonemes
         dict_name = self.create_dict(key_phrase, phonemes)
-        self.decoder = Decoder(self.create_config(dict_name))
+        try:
+            self.decoder = Decoder(self.create_config(dict_name))
+        finally:
+            os.remove(dict_name)  # Read by the decoder
  
     def create_dict(self, key_phrase, phonemes):
         (fd, file_name) = tempfile.mkstemp()
@@ -59,6 +64,7 @@ class LocalRecognizer(object):
         return config
  
     def transcribe(self, byte_data, metrics=None):
+        self.reset()
         start = time.time()
         self.decoder.start_utt()
         self.decoder.process_raw(byte_data, False, False)
@@ -67,6 +73,30 @@ class LocalRecognizer(object):
             metrics.timer("mycroft.stt.local.time_s", time.time() - start)
         return self.decoder.hyp()
  
+    def update(self, chunk):
+        """
+            Feed a chunk to the open keyword spotting utterance.
+
+            The utterance is only restarted after a detection, so every
+            chunk is decoded once.
+
+            Returns: True if the key phrase was heard
+        """
+        if not self.utterance_started:
+            self.decoder.start_utt()
+            self.utterance_started = True
+        self.decoder.process_raw(str(chunk), False, False)
+        hyp = self.decoder.hyp()
+        if hyp and self.key_phrase in hyp.hypstr.lower():
+            self.reset()
+            return True
+        return False
+
+    def reset(self):
+        if self.utterance_started:
+            self.decoder.end_utt()
+            self.utterance_started = False
+
     def is_recognized(self, byte_data, metrics):
         hyp = self.transcribe(byte_data, metrics)
         return hyp and self.key_phrase in hyp.hypstr.lower()
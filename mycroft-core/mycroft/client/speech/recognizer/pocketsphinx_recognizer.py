@@ -43,7 +43,10 @@ class PocketsphinxRecognizer(LocalRecognizer):
 	print("####phonemes -->",phonemes)
         dict_name = self.create_dict(key_phrase, phonemes)
 	print("####dict_name --->",dict_name)
-        self.decoder = Decoder(self.create_config(dict_name))
+        try:
+            self.decoder = Decoder(self.create_config(dict_name))
+        finally:
+            os.remove(dict_name)  # Read by the decoder
 
     def create_dict(self, key_phrase, phonemes):
         (fd, file_name) = tempfile.mkstemp()
@@ -67,6 +70,7 @@ class PocketsphinxRecognizer(LocalRecognizer):
         return config
 
     def transcribe(self, byte_data, metrics=None):
+        self.reset()
         start = time.time()
         #sr = r.recognize_sphinx()
         self.decoder.start_utt()
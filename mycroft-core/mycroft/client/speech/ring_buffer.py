@@ -0,0 +1,119 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Preallocated buffer for the audio captured by the listener.
+
+    The audio is written chunk by chunk into a bytearray allocated once,
+    overwriting the oldest audio when full. Positions are counted in bytes
+    since the buffer was created, so the audio from a position on, like the
+    start of a phrase or the wake word window, can be read back as long as
+    it hasn't been overwritten.
+
+    The capacity is a multiple of the chunk size, a chunk is never split
+    at the end of the buffer. Chunks and ranges are returned as buffer
+    objects on the bytearray, which audioop and the decoders read without
+    copying. They are only valid until the buffer wraps around, get()
+    copies a range into a string, e.g. for AudioData.
+"""
+
+
+class RingBuffer(object):
+    """
+        Circular buffer of audio chunks.
+
+        Args:
+            chunk_size (int):   bytes per chunk
+            chunks (int):       number of chunks held
+    """
+
+    def __init__(self, chunk_size, chunks):
+        self.chunk_size = chunk_size
+        self.capacity = chunk_size * chunks
+        self.data = bytearray(self.capacity)
+        self._view = memoryview(self.data)
+        self.position = 0  # Bytes written since creation
+
+    def _offset(self, position):
+        return position % self.capacity
+
+    def next_slot(self):
+        """
+            Returns: writable memoryview of the next chunk, committed with
+                     commit()
+        """
+        offset = self._offset(self.position)
+        return self._view[offset:offset + self.chunk_size]
+
+    def commit(self):
+        """
+            Add the chunk written into next_slot() to the buffer.
+
+            Returns: buffer with the chunk
+        """
+        offset = self._offset(self.position)
+        self.position += self.chunk_size
+        return buffer(self.data, offset, self.chunk_size)
+
+    def append(self, chunk):
+        """
+            Copy a chunk into the buffer, shorter chunks are padded with
+            silence and longer ones truncated.
+
+            Returns: buffer with the chunk
+        """
+        slot = self.next_slot()
+        size = min(len(chunk), self.chunk_size)
+        slot[:size] = chunk[:size]
+        if size < self.chunk_size:
+            slot[size:] = b'\0' * (self.chunk_size - size)
+        return self.commit()
+
+    def oldest(self):
+        """ Returns: position of the oldest audio held """
+        return max(0, self.position - self.capacity)
+
+    def views(self, start, end=None):
+        """
+            Get the audio between two positions without copying.
+
+            Args:
+                start (int):    first position, clipped to the oldest audio
+                end (int):      position after the last byte, the current
+                                position if None
+
+            Returns: list of one or two buffers
+        """
+        end = self.position if end is None else end
+        start = max(start, self.oldest())
+        if start >= end:
+            return []
+        first = self._offset(start)
+        length = end - start
+        if first + length <= self.capacity:
+            return [buffer(self.data, first, length)]
+        split = self.capacity - first
+        return [buffer(self.data, first, split),
+                buffer(self.data, 0, length - split)]
+
+    def get(self, start, end=None):
+        """ Copy the audio between two positions into a string. """
+        views = self.views(start, end)
+        if len(views) == 1:
+            return str(views[0])
+        return b''.join(str(v) for v in views)
+
+    def tail(self, size):
+        """ Copy the last size bytes into a string. """
+        return self.get(self.position - size)
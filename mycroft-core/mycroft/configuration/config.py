@@ -13,9 +13,14 @@
 # limitations under the License.
 #
 import inflection
+import marshal
+import os
 import re
 import json
-from os.path import exists, isfile, join, dirname, expanduser
+import tempfile
+from copy import deepcopy
+from os.path import basename, exists, isfile, join, dirname, expanduser
+from threading import Lock, RLock, Thread
 from requests import HTTPError
 
 from mycroft.util.json_helper import load_commented_json
@@ -82,6 +87,100 @@ def translate_list(config, values):
         translate_remote(config[module], v)
 
 
+class ConfigFileCache(object):
+    """
+        Parsed configuration files, by path, valid as long as the
+        modification time and size of the file are unchanged.
+
+        The parsed files are stored in a snapshot, read in one go by the
+        next process loading configuration, so the files don't need to be
+        parsed again until they change. In memory they are kept marshalled,
+        unmarshalling a fresh copy is several times faster than parsing.
+
+        Args:
+            snapshot (str): path of the snapshot file
+    """
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.files = None  # path: [mtime, size, marshalled config]
+        self.changed = False
+        self.lock = Lock()
+
+    def _load_snapshot(self):
+        self.files = {}
+        if self.snapshot and isfile(self.snapshot):
+            try:
+                with open(self.snapshot) as f:
+                    snapshot = json.load(f)
+                for path, (mtime, size, config) in snapshot.iteritems():
+                    self.files[path] = [mtime, size, marshal.dumps(config)]
+            except (IOError, ValueError) as e:
+                LOG.debug("Ignoring config snapshot: " + repr(e))
+
+    def load(self, path, parse):
+        """
+            Get the content of a configuration file.
+
+            Args:
+                path (str): file to load
+                parse:      function parsing the file if not cached
+
+            Returns: dict with a copy of the configuration
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return parse(path)
+        key = [stat.st_mtime, stat.st_size]
+        with self.lock:
+            if self.files is None:
+                self._load_snapshot()
+            cached = self.files.get(path)
+            if cached and cached[:2] == key:
+                return marshal.loads(cached[2])
+
+        config = parse(path)
+        with self.lock:
+            self.files[path] = key + [marshal.dumps(config)]
+            self.changed = True
+        return config
+
+    def store(self):
+        """ Write the snapshot if files were parsed since it was read. """
+        with self.lock:
+            if not self.changed or not self.snapshot:
+                return
+            self.changed = False
+            snapshot = {path: [mtime, size, marshal.loads(config)]
+                        for path, (mtime, size, config)
+                        in self.files.iteritems()}
+            tmp = None
+            try:
+                # Every process writes a temporary file of its own
+                fd, tmp = tempfile.mkstemp(
+                    prefix=basename(self.snapshot) + '.', suffix='.tmp',
+                    dir=dirname(self.snapshot))
+                os.fchmod(fd, 0o644)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(snapshot, f)
+                os.rename(tmp, self.snapshot)
+            except (IOError, OSError) as e:
+                LOG.debug("Could not store config snapshot: " + repr(e))
+                if tmp and exists(tmp):
+                    os.remove(tmp)
+
+
+CONFIG_SNAPSHOT = '/opt/mycroft/config_snapshot.json'
+file_cache = ConfigFileCache(CONFIG_SNAPSHOT)
+
+
+def parse_config(path):
+    """ Parse a commented json configuration file. """
+    config = load_commented_json(path)
+    LOG.debug("Configuration {} loaded".format(path))
+    return config
+
+
 class LocalConf(dict):
     """
         Config dict from file.
@@ -101,11 +200,9 @@ class LocalConf(dict):
         """
         if exists(path) and isfile(path):
             try:
-                config = load_commented_json(path)
+                config = file_cache.load(path, parse_config)
                 for key in config:
                     self.__setitem__(key, config[key])
-
-                LOG.debug("Configuration {} loaded".format(path))
             except Exception, e:
                 LOG.error("Error loading configuration '{}'".format(path))
                 LOG.error(repr(e))
@@ -129,11 +226,25 @@ class LocalConf(dict):
 class RemoteConf(LocalConf):
     """
         Config dict fetched from mycroft.ai
+
+        Args:
+            cache (str):    file the fetched settings are stored in, and
+                            loaded from if they can't be fetched
+            fetch (bool):   False to only load the settings from the cache
+
+        Attributes:
+            fetched (bool): True if the settings were fetched
+            stored (bool):  False if they couldn't be stored in the cache
     """
-    def __init__(self, cache=None):
+    def __init__(self, cache=None, fetch=True):
         super(RemoteConf, self).__init__(None)
 
-        cache = cache or '/opt/mycroft/web_config_cache.json'
+        cache = cache or WEB_CONFIG_CACHE
+        self.fetched = False
+        self.stored = True
+        if not fetch:
+            self.load_local(cache)
+            return
 
         try:
             # Here to avoid cyclic import
@@ -148,7 +259,14 @@ class RemoteConf(LocalConf):
             translate_remote(config, setting)
             for key in config:
                 self.__setitem__(key, config[key])
-            self.store(cache)
+            self.fetched = True
+            if LocalConf(cache) != self:
+                try:
+                    self.store(cache)
+                except (IOError, OSError) as e:
+                    LOG.error("Could not cache remote configuration: " +
+                              repr(e))
+                    self.stored = False
 
         except HTTPError as e:
             LOG.error("HTTPError fetching remote configuration: %s" %
@@ -161,15 +279,40 @@ class RemoteConf(LocalConf):
             self.load_local(cache)
 
 
+WEB_CONFIG_CACHE = '/opt/mycroft/web_config_cache.json'
 DEFAULT_CONFIG = join(dirname(__file__), 'mycroft.conf')
 SYSTEM_CONFIG = ''#'/etc/mycroft/mycroft.conf'
 USER_CONFIG = ''#join(expanduser('~'), '.mycroft/mycroft.conf')
 REMOTE_CONFIG = ''#"mycroft.ai"
 
 
+def get_section(config, path):
+    """
+        Get a section of the configuration by its dotted path.
+
+        Args:
+            config (dict):  configuration
+            path (str):     keys separated by dots, e.g. 'listener.channels'
+
+        Returns: the section, None if it doesn't exist
+    """
+    for key in path.split('.'):
+        if not isinstance(config, dict):
+            return None
+        config = config.get(key)
+    return config
+
+
 class Configuration(object):
     __config = {}  # Cached config
     __patch = {}  # Patch config that skills can update to override config
+    __version = 0  # Increased every time the cached config changes
+    __subscriptions = []  # [paths, callback, sections when last called]
+    __lock = Lock()
+    __load_lock = RLock()
+    __remote = None  # Last fetched remote settings
+    __refresh = None  # Thread fetching the remote settings
+    __ws = None
 
     @staticmethod
     def get(configs=None, cache=True):
@@ -183,8 +326,7 @@ class Configuration(object):
         """
         if Configuration.__config:
             return Configuration.__config
-        else:
-            return Configuration.load_config_stack(configs, cache)
+        return Configuration.load_config_stack(configs, cache)
 
     @staticmethod
     def load_config_stack(configs=None, cache=False):
@@ -198,42 +340,165 @@ class Configuration(object):
             Returns: merged dict of all configuration files
         """
         if not configs:
-            configs = [LocalConf(DEFAULT_CONFIG), RemoteConf(),
+            # The last fetched settings, if they couldn't be cached
+            remote = Configuration.__remote or RemoteConf(fetch=False)
+            configs = [LocalConf(DEFAULT_CONFIG), remote,
                        LocalConf(SYSTEM_CONFIG), LocalConf(USER_CONFIG),
-                       Configuration.__patch]
+                       deepcopy(Configuration.__patch)]
 
         # Merge all configs into one
         base = {}
         for c in configs:
             merge_dict(base, c)
+        file_cache.store()
 
         # copy into cache
         if cache:
-            Configuration.__config.clear()
-            for key in base:
-                Configuration.__config[key] = base[key]
+            with Configuration.__load_lock:
+                if base != Configuration.__config:
+                    Configuration.__config.clear()
+                    for key in base:
+                        Configuration.__config[key] = base[key]
+                    Configuration.__version += 1
+                    Configuration._notify()
             return Configuration.__config
         else:
             return base
 
+    @staticmethod
+    def refresh_remote():
+        """
+            Fetch the remote settings in the background. If the merged
+            configuration changes, the cached configuration is updated and
+            configuration.updated is sent with the changed sections.
+        """
+        with Configuration.__lock:
+            if Configuration.__refresh and Configuration.__refresh.is_alive():
+                return
+            Configuration.__refresh = Thread(target=Configuration._refresh,
+                                             name='RemoteConfRefresh')
+            Configuration.__refresh.daemon = True
+            Configuration.__refresh.start()
+
+    @staticmethod
+    def wait_for_refresh(timeout=None):
+        """
+            Wait until the running refresh of the remote settings is done.
+
+            Args:
+                timeout (float): seconds to wait at most, None to wait
+                                 until done
+
+            Returns:
+                bool: True if no refresh is running anymore
+        """
+        refresh = Configuration.__refresh
+        if refresh:
+            refresh.join(timeout)
+            return not refresh.is_alive()
+        return True
+
+    @staticmethod
+    def _refresh():
+        remote = RemoteConf()
+        if not remote.fetched:
+            return  # Keep the cached settings
+        with Configuration.__load_lock:
+            Configuration.__remote = None if remote.stored else remote
+            old = dict(Configuration.__config)
+            version = Configuration.__version
+            config = Configuration.load_config_stack(cache=True)
+            if Configuration.__version == version:
+                return
+            changed = sorted(k for k in set(old) | set(config)
+                             if old.get(k) != config.get(k))
+        LOG.info("Remote configuration changed: " + ", ".join(changed))
+        if Configuration.__ws:
+            from mycroft.messagebus.message import Message
+            Configuration.__ws.emit(Message("configuration.updated",
+                                            {"changed": changed}))
+
+    @staticmethod
+    def version():
+        """
+            Get the version of the cached configuration, increased every
+            time it changes.
+        """
+        return Configuration.__version
+
+    @staticmethod
+    def subscribe(paths, callback):
+        """
+            Call a function when sections of the cached configuration
+            change.
+
+            Args:
+                paths (str/list):   dotted path of a section, like 'tts' or
+                                    'listener.wake_word', or a list of them
+                callback:           function called with the configuration,
+                                    once per update changing any section
+        """
+        paths = [paths] if isinstance(paths, basestring) else list(paths)
+        sections = [deepcopy(get_section(Configuration.__config, p))
+                    for p in paths]
+        with Configuration.__lock:
+            Configuration.__subscriptions.append([paths, callback, sections])
+
+    @staticmethod
+    def unsubscribe(callback):
+        """ Stop calling a function subscribed to configuration changes. """
+        with Configuration.__lock:
+            Configuration.__subscriptions = [
+                s for s in Configuration.__subscriptions if s[1] != callback]
+
+    @staticmethod
+    def _notify():
+        """ Call the subscribers of the sections that have changed. """
+        config = Configuration.__config
+        changed = []
+        with Configuration.__lock:
+            for subscription in Configuration.__subscriptions:
+                paths, callback, sections = subscription
+                current = [get_section(config, p) for p in paths]
+                if current != sections:
+                    subscription[2] = deepcopy(current)
+                    changed.append(callback)
+        for callback in changed:
+            try:
+                callback(config)
+            except Exception:
+                LOG.exception('Configuration subscriber failed')
+
     @staticmethod
     def init(ws):
         """
-            Setup websocket handlers to update config.
+            Setup websocket handlers to update config and start a refresh
+            of the remote settings. Processes not connected to the
+            messagebus keep the cached remote settings.
 
             Args:
                 ws:     Websocket instance
         """
+        Configuration.__ws = ws
         ws.on("configuration.updated", Configuration.updated)
         ws.on("configuration.patch", Configuration.patch)
+        # Started with the cached remote settings, update them
+        Configuration.refresh_remote()
 
     @staticmethod
     def updated(message):
         """
             handler for configuration.updated, triggers an update
             of cached config.
+
+            The configuration is reloaded with the cached remote settings.
+            Unless the message was sent after a refresh, listing the
+            changed sections, the remote settings are refreshed as well.
         """
         Configuration.load_config_stack(cache=True)
+        data = getattr(message, 'data', None)
+        if isinstance(data, dict) and 'changed' not in data:
+            Configuration.refresh_remote()
 
     @staticmethod
     def patch(message):
@@ -246,4 +511,4 @@ class Configuration(object):
         """
         config = message.data.get("config", {})
         merge_dict(Configuration.__patch, config)
-        Connection.load_config_stack(cache=True)
+        Configuration.load_config_stack(cache=True)
@@ -13,6 +13,7 @@
 # limitations under the License.
 #
 import json
+import resource
 import threading
 import time
 
@@ -25,10 +26,34 @@ from mycroft.util.setup_base import get_version
 
 config = Configuration.get().get('server')
 
+# getrusage() target for the calling thread, RUSAGE_THREAD on Linux
+_RUSAGE_THREAD = getattr(resource, 'RUSAGE_THREAD', 1)
+
+
+def thread_cpu_time():
+    """
+        CPU time (user + system) used by the calling thread in seconds.
+        Falls back to the CPU time of the process where the usage of
+        single threads isn't available.
+    """
+    global _RUSAGE_THREAD
+    try:
+        usage = resource.getrusage(_RUSAGE_THREAD)
+    except (ValueError, resource.error):
+        _RUSAGE_THREAD = resource.RUSAGE_SELF
+        usage = resource.getrusage(_RUSAGE_THREAD)
+    return usage.ru_utime + usage.ru_stime
+
 
 class Stopwatch(object):
+    """
+    Simple time measuring class. Can be used as a context manager, in which
+    case the elapsed time of the block is available in the time attribute.
+    """
+
     def __init__(self):
         self.timestamp = None
+        self.time = None
 
     def start(self):
         self.timestamp = time.time()
@@ -45,14 +70,27 @@ class Stopwatch(object):
         self.timestamp = None
         return cur_time - start_time
 
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.time = self.stop()
+
 
 class MetricsAggregator(object):
     """
     MetricsAggregator is not threadsafe, and multiple clients writing the
     same metric "concurrently" may result in data loss.
+
+    Args:
+        max_samples (int): if set, only the latest max_samples values are
+                           kept for each timer. Useful for long running
+                           aggregators that are never flushed.
     """
 
-    def __init__(self):
+    def __init__(self, max_samples=None):
+        self.max_samples = max_samples
         self._counters = {}
         self._timers = {}
         self._levels = {}
@@ -69,6 +107,29 @@ class MetricsAggregator(object):
             self._timers[name] = []
             cur = self._timers[name] = []
         cur.append(value)
+        if self.max_samples and len(cur) > self.max_samples:
+            del cur[:-self.max_samples]
+
+    def timer_stats(self):
+        """
+            Summarize the recorded timers.
+
+            Returns: dict with count, total, mean, min, max and last value
+                     for each timer name
+        """
+        stats = {}
+        for name, values in self._timers.iteritems():
+            if not values:
+                continue
+            stats[name] = {
+                'count': len(values),
+                'total': sum(values),
+                'mean': sum(values) / len(values),
+                'min': min(values),
+                'max': max(values),
+                'last': values[-1]
+            }
+        return stats
 
     def level(self, name, value):
         self._levels[name] = value
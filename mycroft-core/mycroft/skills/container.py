@@ -19,12 +19,22 @@ from os.path import dirname, exists, isdir
 
 from mycroft.configuration import Configuration
 from mycroft.messagebus.client.ws import WebsocketClient
-from mycroft.skills.core import create_skill_descriptor, load_skill
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import create_skill_descriptor, load_skill, \
+    FallbackSkill
 from mycroft.skills.intent_service import IntentService
+from mycroft.skills.supervisor import FALLBACK_REPORT
 from mycroft.util.log import LOG
 
 
 class SkillContainer(object):
+    """
+        Process hosting one or more skills, connected to the messagebus.
+
+        Args:
+            args (list): command line arguments, see __build_params
+    """
+
     def __init__(self, args):
         params = self.__build_params(args)
 
@@ -34,24 +44,29 @@ class SkillContainer(object):
         if exists(params.lib) and isdir(params.lib):
             sys.path.append(params.lib)
 
-        sys.path.append(params.dir)
-        self.dir = params.dir
+        self.dirs = params.dirs or [dirname(__file__)]
+        for skill_dir in self.dirs:
+            sys.path.append(skill_dir)
+        self.skills = {}  # skill id: skill instance
 
         self.enable_intent = params.enable_intent
+        self.worker = params.worker
 
         self.__init_client(params)
 
     @staticmethod
     def __build_params(args):
         parser = argparse.ArgumentParser()
-        parser.add_argument("--config", default="./mycroft.conf")
-        parser.add_argument("dir", nargs='?', default=dirname(__file__))
+        parser.add_argument("--config", default=None)
+        parser.add_argument("dirs", nargs='*', metavar='dir')
         parser.add_argument("--lib", default="./lib")
         parser.add_argument("--host", default=None)
         parser.add_argument("--port", default=None)
         parser.add_argument("--use-ssl", action='store_true', default=False)
         parser.add_argument("--enable-intent", action='store_true',
                             default=False)
+        # Started by the SkillSupervisor, fallback skills are handed back
+        parser.add_argument("--worker", action='store_true', default=False)
         return parser.parse_args(args)
 
     def __init_client(self, params):
@@ -73,13 +88,39 @@ class SkillContainer(object):
         if self.enable_intent:
             IntentService(self.ws)
 
-        skill_descriptor = create_skill_descriptor(self.dir)
-        self.skill = load_skill(skill_descriptor, self.ws, hash(self.dir))
+        for skill_dir in self.dirs:
+            skill_id = hash(skill_dir)
+            skill_descriptor = create_skill_descriptor(skill_dir)
+            skill = load_skill(skill_descriptor, self.ws, skill_id)
+            if skill and self.worker and isinstance(skill, FallbackSkill):
+                # Fallbacks only run in the process handling intent failure
+                LOG.info(skill.name + ' is a fallback skill, handing back')
+                skill.shutdown()
+                self.ws.emit(Message(FALLBACK_REPORT,
+                                     {'skill_path': skill_dir}))
+            elif skill:
+                self.skills[skill_id] = skill
+
+    def handle_converse_request(self, message):
+        """ Let hosted skills answer converse requests. """
+        skill_id = int(message.data["skill_id"])
+        skill = self.skills.get(skill_id)
+        if not skill:
+            return
+        try:
+            result = skill.converse(message.data["utterances"],
+                                    message.data["lang"])
+        except BaseException:
+            LOG.error("Converse method malformed for skill " + str(skill_id))
+            result = False
+        self.ws.emit(Message("skill.converse.response", {
+            "skill_id": skill_id, "result": result}))
 
     def run(self):
         try:
             self.ws.on('message', LOG.debug)
-            self.ws.on('open', self.load_skill)
+            self.ws.once('open', self.load_skill)
+            self.ws.on('skill.converse.request', self.handle_converse_request)
             self.ws.on('error', LOG.error)
             self.ws.run_forever()
         except Exception as e:
@@ -87,8 +128,11 @@ class SkillContainer(object):
             self.stop()
 
     def stop(self):
-        if self.skill:
-            self.skill.shutdown()
+        for skill in self.skills.values():
+            try:
+                skill.shutdown()
+            except BaseException:
+                LOG.error("Failed to shutdown " + skill.name, exc_info=True)
 
 
 def main():
@@ -13,11 +13,12 @@
 # limitations under the License.
 #
 import imp
-import operator
 import sys
 import time
+from bisect import insort
 from functools import wraps
 from inspect import getargspec
+from threading import Event, Thread, local
 
 import abc
 import re
@@ -30,7 +31,10 @@ from mycroft.configuration import Configuration
 from mycroft.dialog import DialogLoader
 from mycroft.filesystem import FileSystemAccess
 from mycroft.messagebus.message import Message
+from mycroft.metrics import Stopwatch, thread_cpu_time
+from mycroft.skills.intent_stats import IntentStats
 from mycroft.skills.settings import SkillSettings
+from mycroft.skills.timer_service import TimerService
 from mycroft.util.log import LOG
 
 
@@ -165,6 +169,49 @@ def get_handler_name(handler):
     return name
 
 
+def create_handler_caller(handler, skill=None):
+    """
+        Inspect the signature of a handler once and create a function
+        calling it with the arguments it expects.
+
+        Args:
+            handler (function): handler to call
+            skill:              skill instance passed as self to handlers
+                                registered from decorators, None for bound
+                                methods and plain functions
+
+        Returns: function taking a message as only argument
+    """
+    def bad_signature(message):
+        raise TypeError('Can\'t call ' + get_handler_name(handler))
+
+    try:
+        arg_count = len(getargspec(handler).args)
+    except TypeError:
+        return bad_signature
+
+    if skill:
+        if arg_count == 2:
+            return lambda message: handler(skill, message)
+        elif arg_count == 1:
+            return lambda message: handler(skill)
+        elif arg_count == 0:
+            # Zero may indicate multiple decorators, trying the
+            # usual call signatures
+            def call_decorated(message):
+                try:
+                    handler(skill, message)
+                except TypeError:
+                    handler(skill)
+            return call_decorated
+    else:
+        if arg_count == 2:
+            return handler
+        elif arg_count == 1:
+            return lambda message: handler()
+    return bad_signature
+
+
 # Lists used when adding skill handlers using decorators
 _intent_list = []
 _intent_file_list = []
@@ -220,6 +267,10 @@ class MycroftSkill(object):
         self.reload_skill = True
         self.events = []
         self.skill_id = 0
+        # Resource accounting of the handlers registered with add_event
+        self.handler_calls = 0
+        self.handler_cpu_time = 0.0
+        self.timers = []  # Timers started with add_timer
 
     @property
     def location(self):
@@ -320,7 +371,7 @@ class MycroftSkill(object):
         _intent_list = []
         _intent_file_list = []
 
-    def add_event(self, name, handler, need_self=False):
+    def add_event(self, name, handler, need_self=False, intent=False):
         """
             Create event handler for executing intent
 
@@ -330,37 +381,28 @@ class MycroftSkill(object):
                 need_self:     optional parameter, when called from a decorated
                                intent handler the function will need the self
                                variable passed as well.
+                intent:     True for intent handlers, their time is reported
+                            as the dispatch stage of the intent stats
         """
 
         def wrapper(message):
             try:
                 # Indicate that the skill handler is starting
-                name = get_handler_name(handler)
                 self.emitter.emit(Message("mycroft.skill.handler.start",
-                                          data={'handler': name}))
-                if need_self:
-                    # When registring from decorator self is required
-                    if len(getargspec(handler).args) == 2:
-                        handler(self, message)
-                    elif len(getargspec(handler).args) == 1:
-                        handler(self)
-                    elif len(getargspec(handler).args) == 0:
-                        # Zero may indicate multiple decorators, trying the
-                        # usual call signatures
-                        try:
-                            handler(self, message)
-                        except TypeError:
-                            handler(self)
-                    else:
-                        raise TypeError
-                else:
-                    if len(getargspec(handler).args) == 2:
-                        handler(message)
-                    elif len(getargspec(handler).args) == 1:
-                        handler()
-                    else:
-                        raise TypeError
-                self.settings.store()  # Store settings if they've changed
+                                          data={'handler': handler_name}))
+                cpu_time = thread_cpu_time()
+                stopwatch = Stopwatch()
+                try:
+                    with stopwatch:
+                        call(message)
+                finally:
+                    self.handler_calls += 1
+                    self.handler_cpu_time += thread_cpu_time() - cpu_time
+                    if intent:
+                        IntentStats.timer('dispatch', stopwatch.time)
+                # Store settings if they've been used and have changed
+                if '_settings' in self.__dict__:
+                    self._settings.store_later()
             except Exception as e:
                 # TODO: Localize
                 self.speak(
@@ -371,13 +413,16 @@ class MycroftSkill(object):
                     self.name, exc_info=True)
                 # indicate completion with exception
                 self.emitter.emit(Message('mycroft.skill.handler.complete',
-                                          data={'handler': name,
+                                          data={'handler': handler_name,
                                                 'exception': e.message}))
             # Indicate that the skill handler has completed
             self.emitter.emit(Message('mycroft.skill.handler.complete',
-                                      data={'handler': name}))
+                                      data={'handler': handler_name}))
 
         if handler:
+            # When registering from decorator self is required
+            call = create_handler_caller(handler, self if need_self else None)
+            handler_name = get_handler_name(handler)
             self.emitter.on(name, wrapper)
             self.events.append((name, wrapper))
 
@@ -402,7 +447,7 @@ class MycroftSkill(object):
         intent_parser.name = str(self.skill_id) + ':' + intent_parser.name
         self.emitter.emit(Message("register_intent", intent_parser.__dict__))
         self.registered_intents.append((name, intent_parser))
-        self.add_event(intent_parser.name, handler, need_self)
+        self.add_event(intent_parser.name, handler, need_self, intent=True)
 
     def register_intent_file(self, intent_file, handler, need_self=False):
         """
@@ -436,7 +481,7 @@ class MycroftSkill(object):
             "file_name": join(self.vocab_dir, intent_file),
             "name": name
         }))
-        self.add_event(name, handler, need_self)
+        self.add_event(name, handler, need_self, intent=True)
 
     def register_entity_file(self, entity_file):
         """
@@ -603,7 +648,9 @@ class MycroftSkill(object):
         """
         # Store settings
         self.settings.store()
-        self.settings.is_alive = False
+        self.settings.shutdown()
+        for timer in self.timers:
+            timer.cancel()
         # removing events
         for e, f in self.events:
             self.emitter.remove(e, f)
@@ -689,7 +736,8 @@ class MycroftSkill(object):
             'event': self._unique_name(name),
             'data': data
         }
-        self.emitter.emit(Message('mycroft.schedule.update_event', data=data))
+        self.emitter.emit(Message('mycroft.scheduler.update_event',
+                                  data=data))
 
     def cancel_event(self, name):
         """
@@ -702,6 +750,51 @@ class MycroftSkill(object):
         data = {'event': self._unique_name(name)}
         self.emitter.emit(Message('mycroft.scheduler.remove_event', data=data))
 
+    def add_timer(self, delay, callback, args=None, repeat=None):
+        """
+            Call a function after a delay on the timer thread shared by the
+            skills. The timer is cancelled when the skill shuts down.
+
+            Args:
+                delay (float):          seconds until the call
+                callback:               function to call, should return
+                                        quickly
+                args (list, optional):  arguments for the callback
+                repeat (float, optional): seconds between further calls
+
+            Returns: TimerHandle with cancel() and reschedule(delay)
+        """
+        self.timers = [t for t in self.timers if t.is_pending()]
+        timer = TimerService.instance().schedule(delay, callback, args,
+                                                 repeat)
+        self.timers.append(timer)
+        return timer
+
+
+# Messages held back for the fallback handler the thread runs concurrently
+_fallback_run = local()
+
+
+class _FallbackEmitter(object):
+    """
+        Emitter of a fallback skill. Messages emitted by a fallback handler
+        run concurrently with others are held back, they are only sent if
+        the handler wins. Other calls are passed on to the wrapped emitter.
+    """
+
+    def __init__(self, emitter):
+        self.emitter = emitter
+
+    def emit(self, message):
+        messages = getattr(_fallback_run, 'messages', None)
+        if messages is None:
+            self.emitter.emit(message)
+        else:
+            messages.append((self.emitter, message))
+
+    def __getattr__(self, attr):
+        return getattr(self.emitter, attr)
+
 
 class FallbackSkill(MycroftSkill):
     """
@@ -711,6 +804,8 @@ class FallbackSkill(MycroftSkill):
         by their priority.
     """
     fallback_handlers = {}
+    # (priority, handler) tuples of fallback_handlers, sorted by priority
+    sorted_fallback_handlers = []
 
     def __init__(self, name=None, emitter=None):
         MycroftSkill.__init__(self, name, emitter)
@@ -718,6 +813,92 @@ class FallbackSkill(MycroftSkill):
         #  list of fallback handlers registered by this instance
         self.instance_fallback_handlers = []
 
+    def bind(self, emitter):
+        """ Register emitter with skill, see _FallbackEmitter. """
+        super(FallbackSkill, self).bind(emitter and _FallbackEmitter(emitter))
+
+    @staticmethod
+    def _call_fallback(handler, message):
+        """ Run a fallback handler, returns True if it handled message """
+        stopwatch = Stopwatch()
+        try:
+            with stopwatch:
+                handled = handler(message)
+            IntentStats.timer('fallback.' + get_handler_name(handler),
+                              stopwatch.time)
+            return bool(handled)
+        except Exception as e:
+            LOG.info('Exception in fallback: ' + str(e))
+            return False
+
+    @classmethod
+    def _run_fallbacks(cls, message, handlers):
+        """
+            Run fallback handlers one by one, in order of priority.
+
+            Returns: handler that handled the message, None if none did
+        """
+        for handler in handlers:
+            if cls._call_fallback(handler, message):
+                return handler
+        return None
+
+    @classmethod
+    def _run_fallbacks_concurrently(cls, message, handlers, config):
+        """
+            Start all fallback handlers at once and wait for their results
+            in order of priority. The first handler returning True wins,
+            the results of lower priority handlers are ignored. A handler
+            not answering within its timeout counts as not handling the
+            message.
+
+            The messages a handler emits through its skill, e.g. speak,
+            are held back and only sent for the winning handler. Handlers
+            that lost or timed out keep running in the background, so they
+            must not have other side effects and mustn't wait for answers
+            to their messages.
+
+            Args:
+                message:        intent_failure message
+                handlers:       fallback handlers sorted by priority
+                config (dict):  fallback configuration with the default
+                                "timeout" and "timeouts" per handler name
+
+            Returns: handler that handled the message, None if none did
+        """
+        default_timeout = config.get('timeout')
+        timeouts = config.get('timeouts', {})
+        runs = []
+        for handler in handlers:
+            run = {'done': Event(), 'handled': False, 'messages': []}
+
+            def call(handler=handler, run=run):
+                _fallback_run.messages = run['messages']
+                try:
+                    run['handled'] = cls._call_fallback(handler, message)
+                finally:
+                    _fallback_run.messages = None
+                run['done'].set()
+
+            thread = Thread(target=call)
+            thread.daemon = True
+            thread.start()
+            runs.append(run)
+
+        start = time.time()
+        for handler, run in zip(handlers, runs):
+            name = get_handler_name(handler)
+            timeout = timeouts.get(name, default_timeout)
+            if timeout is not None:
+                timeout = max(start + timeout - time.time(), 0)
+            if not run['done'].wait(timeout):
+                LOG.warning('Fallback {} timed out'.format(name))
+            elif run['handled']:
+                for emitter, held_back in run['messages']:
+                    emitter.emit(held_back)
+                return handler
+        return None
+
     @classmethod
     def make_intent_failure_handler(cls, ws):
         """Goes through all fallback handlers until one returns True"""
@@ -726,19 +907,20 @@ class FallbackSkill(MycroftSkill):
             # indicate fallback handling start
             ws.emit(Message("mycroft.skill.handler.start",
                             data={'handler': "fallback"}))
-            for _, handler in sorted(cls.fallback_handlers.items(),
-                                     key=operator.itemgetter(0)):
-                try:
-                    if handler(message):
-                        #  indicate completion
-                        ws.emit(Message(
-                            'mycroft.skill.handler.complete',
-                            data={'handler': "fallback",
-                                  "fallback_handler": get_handler_name(
-                                      handler)}))
-                        return
-                except Exception as e:
-                    LOG.info('Exception in fallback: ' + str(e))
+            config = Configuration.get().get('skills', {}).get('fallback', {})
+            handlers = [h for _, h in cls.sorted_fallback_handlers]
+            if config.get('concurrent', False):
+                handled_by = cls._run_fallbacks_concurrently(message,
+                                                             handlers, config)
+            else:
+                handled_by = cls._run_fallbacks(message, handlers)
+            if handled_by:
+                #  indicate completion
+                ws.emit(Message(
+                    'mycroft.skill.handler.complete',
+                    data={'handler': "fallback",
+                          "fallback_handler": get_handler_name(handled_by)}))
+                return
             ws.emit(Message('complete_intent_failure'))
             LOG.warning('No fallback could handle intent.')
             #  indicate completion with exception
@@ -763,6 +945,7 @@ class FallbackSkill(MycroftSkill):
             priority += 1
 
         cls.fallback_handlers[priority] = handler
+        insort(cls.sorted_fallback_handlers, (priority, handler))
 
     def register_fallback(self, handler, priority):
         """
@@ -783,6 +966,7 @@ class FallbackSkill(MycroftSkill):
         for priority, handler in cls.fallback_handlers.items():
             if handler == handler_to_del:
                 del cls.fallback_handlers[priority]
+                cls.sorted_fallback_handlers.remove((priority, handler))
                 return
         LOG.warning('Could not remove fallback!')
 
@@ -12,30 +12,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import json
 import time
-from Queue import Queue
+from heapq import heappush, heappop, heapify
+from itertools import count
 from threading import Thread
 
-from os.path import isfile
-
 from mycroft.messagebus.message import Message
+from mycroft.skills.schedule_journal import ScheduleJournal
+from mycroft.util.condition import BlockingCondition
 from mycroft.util.log import LOG
 
 
 class EventScheduler(Thread):
+    """
+        Emits scheduled events on the messagebus.
+
+        The pending events are kept in a heap ordered by due time and the
+        thread sleeps until the first one is due or the schedule changes.
+        events maps event names to lists of [time, repeat, data] entries.
+
+        Changes are stored as they happen in a ScheduleJournal, the thread
+        syncs the journal to disk in batches and compacts it into the
+        schedule file when it has grown.
+
+        Args:
+            emitter:                messagebus emitter
+            schedule_file (str):    file storing the schedule, None to
+                                    keep it in memory only
+    """
+
     def __init__(self, emitter, schedule_file='/opt/mycroft/schedule.json'):
         super(EventScheduler, self).__init__()
         self.events = {}
         self.emitter = emitter
         self.isRunning = True
         self.schedule_file = schedule_file
+        self.journal = None
+        self._heap = []  # (time, sequence number, event name, entry)
+        self._counter = count()
+        self._stale = 0  # Heap items of removed entries
+        self._cond = BlockingCondition()
         if self.schedule_file:
             self.load()
 
-        self.add = Queue()
-        self.remove = Queue()
-        self.update = Queue()
         self.emitter.on('mycroft.scheduler.schedule_event',
                         self.schedule_event_handler)
         self.emitter.on('mycroft.scheduler.remove_event',
@@ -46,84 +65,114 @@ class EventScheduler(Thread):
 
     def load(self):
         """
-            Load json data with active events from json file.
-        """
-        if isfile(self.schedule_file):
-            with open(self.schedule_file) as f:
-                try:
-                    json_data = json.load(f)
-                except Exception as e:
-                    LOG.error(e)
-            current_time = time.time()
-            for key in json_data:
-                event_list = json_data[key]
-                # discard non repeating events that has already happened
-                self.events[key] = [tuple(e) for e in event_list
-                                    if e[0] > current_time or e[1]]
-
-    def fetch_new_events(self):
-        """
-            Fetch new events and add to list of pending events.
-        """
-        while not self.add.empty():
-            event, sched_time, repeat, data = self.add.get(timeout=1)
-            # get current list of scheduled times for event, [] if missing
-            event_list = self.events.get(event, [])
-            # add received event and time
-            event_list.append((sched_time, repeat, data))
-            self.events[event] = event_list
-
-    def remove_events(self):
-        """
-            Remove event from event list.
-        """
-        while not self.remove.empty():
-            event = self.remove.get()
-            if event in self.events:
-                self.events.pop(event)
-
-    def update_events(self):
-        """
-            Update event list with new data.
-        """
-        while not self.remove.empty():
-            event, data = self.update.get()
-            # if there is an active event with this name
-            if len(self.events.get(event, [])) > 0:
-                time, repeat, _ = self.events[event][0]
-                self.events[event][0] = (time, repeat, data)
+            Load the active events from the schedule file and journal.
+
+            Repeating events are not restored, skills schedule them again
+            when they are loaded. The schedule file written on shutdown
+            never held them, but the journal and its compactions do, and
+            restoring them would fire them twice after a crash.
+        """
+        self.journal = ScheduleJournal(self.schedule_file)
+        current_time = time.time()
+        for key, event_list in self.journal.load().items():
+            # discard events that has already happened and repeating ones
+            for e in event_list:
+                if e[0] > current_time and not e[1]:
+                    self._add(key, list(e))
+
+    def _add(self, event, entry):
+        """ Add an entry to the schedule, the caller holds the lock. """
+        self.events.setdefault(event, []).append(entry)
+        self._push(event, entry)
+
+    def _push(self, event, entry):
+        heappush(self._heap, (entry[0], next(self._counter), event, entry))
+
+    def _is_pending(self, event, entry):
+        return any(e is entry for e in self.events.get(event, []))
+
+    def _pop_due(self, now):
+        """
+            Take the events due at the given time from the heap and
+            reschedule the repeating ones.
+
+            Returns: list of (event name, data) to emit
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            sched_time, _, event, entry = heappop(self._heap)
+            if not self._is_pending(event, entry):
+                self._stale -= 1
+                continue
+            due.append((event, entry[2]))
+            repeat = entry[1]
+            if repeat:
+                # Skip repetitions missed while not running
+                entry[0] = sched_time + repeat
+                while entry[0] <= now:
+                    entry[0] += repeat
+                self._push(event, entry)
+            else:
+                self._log('fire', event, time=sched_time)
+                entries = self.events[event]
+                entries[:] = [e for e in entries if e is not entry]
+                if not entries:
+                    del self.events[event]
+        return due
+
+    def _compact(self):
+        """ Drop heap items of removed events if they make up half. """
+        if self._stale > len(self._heap) / 2:
+            self._heap = [i for i in self._heap
+                          if self._is_pending(i[2], i[3])]
+            heapify(self._heap)
+            self._stale = 0
+
+    def _log(self, op, event, **fields):
+        """ Journal a change, the caller holds the lock. """
+        if self.journal:
+            self.journal.append(op, event, **fields)
+
+    def _maintain_journal(self):
+        """ Sync and compact the journal when due. """
+        if not self.journal:
+            return
+        sync_time = self.journal.sync_time()
+        if sync_time is not None and sync_time <= time.time():
+            self.journal.sync()
+        if self.journal.needs_compaction(self.events):
+            self.journal.compact(self.events)
+
+    def _timeout(self):
+        """ Returns: seconds until the thread has work, None if idle """
+        times = [self._heap[0][0]] if self._heap else []
+        if self.journal and self.journal.sync_time() is not None:
+            times.append(self.journal.sync_time())
+        return min(times) - time.time() if times else None
 
     def run(self):
-        while self.isRunning:
-            # Remove events
-            self.remove_events()
-            # Fetch newly scheduled events
-            self.fetch_new_events()
-            # Update events
-            self.update_events()
-
-            # Check all events
-            for event in self.events:
-                current_time = time.time()
-                e = self.events[event]
-                # Get scheduled times that has passed
-                passed = [(t, r, d) for (t, r, d) in e if t <= current_time]
-                # and remaining times that we're still waiting for
-                remaining = [(t, r, d) for t, r, d in e if t > current_time]
-                # Trigger registered methods
-                for sched_time, repeat, data in passed:
-                    self.emitter.emit(Message(event, data))
-                    # if this is a repeated event add a new trigger time
-                    if repeat:
-                        remaining.append((sched_time + repeat, repeat, data))
-                # update list of events
-                self.events[event] = remaining
-            time.sleep(0.5)
+        while True:
+            with self._cond:
+                self._maintain_journal()
+                due = self._pop_due(time.time())
+                while not due and self.isRunning:
+                    self._cond.wait(self._timeout())
+                    self._maintain_journal()
+                    due = self._pop_due(time.time())
+                if not self.isRunning:
+                    break
+            # Emit without holding the lock, handlers may (re)schedule
+            for event, data in due:
+                self.emitter.emit(Message(event, data))
 
     def schedule_event(self, event, sched_time, repeat=None, data=None):
-        """ Send event to thread using thread safe queue. """
+        """ Add event to the schedule and wake up the thread. """
         data = data or {}
-        self.add.put((event, sched_time, repeat, data))
+        with self._cond:
+            self._add(event, [sched_time, repeat, data])
+            self._log('schedule', event, time=sched_time, repeat=repeat,
+                      data=data)
+            self._cond.notify()
 
     def schedule_event_handler(self, message):
         """
@@ -149,8 +198,13 @@ class EventScheduler(Thread):
             LOG.error('Scheduled event time not provided')
 
     def remove_event(self, event):
-        """ Remove event using thread safe queue. """
-        self.remove.put(event)
+        """ Remove all entries of an event from the schedule. """
+        with self._cond:
+            if event in self.events:
+                self._stale += len(self.events.pop(event))
+                self._log('remove', event)
+                self._compact()
+                self._cond.notify()
 
     def remove_event_handler(self, message):
         """ Messagebus interface to the remove_event method. """
@@ -158,7 +212,12 @@ class EventScheduler(Thread):
         self.remove_event(event)
 
     def update_event(self, event, data):
-        self.update((event, data))
+        """ Change the data of the first entry of an event. """
+        with self._cond:
+            # if there is an active event with this name
+            if len(self.events.get(event, [])) > 0:
+                self.events[event][0][2] = data
+                self._log('update', event, data=data)
 
     def update_event_handler(self, message):
         """ Messagebus interface to the update_event method. """
@@ -168,36 +227,25 @@ class EventScheduler(Thread):
 
     def store(self):
         """
-            Write current schedule to disk.
-        """
-        with open(self.schedule_file, 'w') as f:
-            json.dump(self.events, f)
-
-    def clear_repeating(self):
-        """
-            Remove repeating events from events dict.
-        """
-        for e in self.events:
-            self.events[e] = [i for i in self.events[e] if i[1] is None]
-
-    def clear_empty(self):
-        """
-            Remove empty event entries from events dict
+            Write current schedule to disk and empty the journal.
         """
-        self.events = {k: self.events[k] for k in self.events
-                       if self.events[k] != []}
+        with self._cond:
+            if self.journal:
+                self.journal.compact(self.events)
 
     def shutdown(self):
         """ Stop the running thread. """
-        self.isRunning = False
+        with self._cond:
+            self.isRunning = False
+            self._cond.notify()
         # Remove listeners
         self.emitter.remove_all_listeners('mycroft.scheduler.schedule_event')
         self.emitter.remove_all_listeners('mycroft.scheduler.remove_event')
         self.emitter.remove_all_listeners('mycroft.scheduler.update_event')
         # Wait for thread to finish
         self.join()
-        # Prune event list in preparation for saving
-        self.clear_repeating()
-        self.clear_empty()
-        # Store all pending scheduled events
-        self.store()
+        # Write the remaining changes to disk
+        with self._cond:
+            if self.journal:
+                self.journal.close()
+        self._cond.close()
@@ -19,7 +19,10 @@ from adapt.engine import IntentDeterminationEngine
 
 from mycroft.configuration import Configuration
 from mycroft.messagebus.message import Message
+from mycroft.metrics import Stopwatch
 from mycroft.skills.core import open_intent_envelope
+from mycroft.skills.intent_stats import IntentStats
+from mycroft.skills.skill_registry import SkillRegistry, skill_id_from_intent
 from mycroft.util.log import LOG
 from mycroft.util.parse import normalize
 
@@ -143,6 +146,7 @@ class IntentService(object):
         # Converse method
         self.emitter.on('skill.converse.response',
                         self.handle_converse_response)
+        IntentStats.init(self.emitter)
         self.active_skills = []  # [skill_id , timestamp]
         self.converse_timeout = 5  # minutes to prune active_skills
 
@@ -212,36 +216,42 @@ class IntentService(object):
                               if time.time() - skill[
                                   1] <= self.converse_timeout * 60]
 
+        stopwatch = Stopwatch()
         # check if any skill wants to handle utterance
-        for skill in self.active_skills:
-            if self.do_converse(utterances, skill[0], lang):
-                # update timestamp, or there will be a timeout where
-                # intent stops conversing whether its being used or not
-                self.add_active_skill(skill[0])
-                return
+        with stopwatch:
+            handled = self._converse(utterances, lang)
+        IntentStats.timer('converse', stopwatch.time)
+        if handled:
+            return
 
         # no skill wants to handle utterance
         best_intent = None
         for utterance in utterances:
+            # normalize() changes "it's a boy" to "it is boy", etc.
+            with stopwatch:
+                normalized = normalize(utterance, lang)
+            IntentStats.timer('normalize', stopwatch.time)
             try:
-                # normalize() changes "it's a boy" to "it is boy", etc.
-                best_intent = next(self.engine.determine_intent(
-                    normalize(utterance, lang), 100,
-                    include_tags=True,
-                    context_manager=self.context_manager))
+                with stopwatch:
+                    best_intent = next(self.engine.determine_intent(
+                        normalized, 100,
+                        include_tags=True,
+                        context_manager=self.context_manager))
                 # TODO - Should Adapt handle this?
                 best_intent['utterance'] = utterance
             except StopIteration, e:
                 LOG.exception(e)
-                continue
+            IntentStats.timer('adapt', stopwatch.time)
 
         if best_intent and best_intent.get('confidence', 0.0) > 0.0:
             self.update_context(best_intent)
             reply = message.reply(
                 best_intent.get('intent_type'), best_intent)
-            self.emitter.emit(reply)
+            with stopwatch:
+                self.emitter.emit(reply)
+            IntentStats.timer('emit', stopwatch.time)
             # update active skills
-            skill_id = int(best_intent['intent_type'].split(":")[0])
+            skill_id = skill_id_from_intent(best_intent['intent_type'])
             self.add_active_skill(skill_id)
 
         else:
@@ -250,6 +260,20 @@ class IntentService(object):
                 "lang": lang
             }))
 
+    def _converse(self, utterances, lang):
+        """
+            Give active skills a chance to handle the utterance.
+
+            Returns: True if a skill handled the utterance
+        """
+        for skill in self.active_skills:
+            if self.do_converse(utterances, skill[0], lang):
+                # update timestamp, or there will be a timeout where
+                # intent stops conversing whether its being used or not
+                self.add_active_skill(skill[0])
+                return True
+        return False
+
     def handle_register_vocab(self, message):
         start_concept = message.data.get('start')
         end_concept = message.data.get('end')
@@ -265,18 +289,21 @@ class IntentService(object):
         print "Registering: " + str(message.data)
         intent = open_intent_envelope(message)
         self.engine.register_intent_parser(intent)
+        SkillRegistry.instance().add_intent(intent.name)
 
     def handle_detach_intent(self, message):
         intent_name = message.data.get('intent_name')
         new_parsers = [
             p for p in self.engine.intent_parsers if p.name != intent_name]
         self.engine.intent_parsers = new_parsers
+        SkillRegistry.instance().remove_intent(intent_name)
 
     def handle_detach_skill(self, message):
         skill_id = message.data.get('skill_id')
+        intents = SkillRegistry.instance().remove_intents(
+            skill_id_from_intent(skill_id))
         new_parsers = [
-            p for p in self.engine.intent_parsers if
-            not p.name.startswith(skill_id)]
+            p for p in self.engine.intent_parsers if p.name not in intents]
         self.engine.intent_parsers = new_parsers
 
     def handle_add_context(self, message):
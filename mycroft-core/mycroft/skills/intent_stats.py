@@ -0,0 +1,93 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Per-stage timings of the intent pipeline.
+
+    The intent service, the fallback handling and the padatious service all
+    report into one MetricsAggregator shared by the skills process. The
+    collected stats can be queried over the messagebus using the
+    'mycroft.debug.intent_stats' message, the answer is sent as
+    'mycroft.debug.intent_stats.response'.
+
+    Only the process answering the queries collects stats. Intent handlers
+    of skills hosted in worker processes aren't reported.
+"""
+from threading import Lock
+
+from mycroft.messagebus.message import Message
+from mycroft.metrics import MetricsAggregator
+
+# Number of samples kept for each stage
+MAX_SAMPLES = 1000
+PREFIX = 'mycroft.intent.'
+
+
+class IntentStats(object):
+    __metrics = None
+    __enabled = False  # True once answering queries
+    __lock = Lock()
+
+    @staticmethod
+    def get():
+        """ Get the shared aggregator, created on first use. """
+        with IntentStats.__lock:
+            if not IntentStats.__metrics:
+                IntentStats.__metrics = MetricsAggregator(MAX_SAMPLES)
+            return IntentStats.__metrics
+
+    @staticmethod
+    def timer(stage, value):
+        """
+            Record time spent in a stage of the intent pipeline.
+
+            Args:
+                stage (str):    stage name, for example 'adapt'
+                value (float):  time in seconds
+        """
+        if not IntentStats.__enabled:
+            return  # Nobody would ask for it
+        metrics = IntentStats.get()
+        with IntentStats.__lock:
+            metrics.timer(PREFIX + stage + '.time_s', value)
+
+    @staticmethod
+    def summary():
+        """ Returns: dict with stats for each recorded stage """
+        metrics = IntentStats.get()
+        with IntentStats.__lock:
+            return metrics.timer_stats()
+
+    @staticmethod
+    def clear():
+        """ Drop the collected stats, nothing is recorded until init(). """
+        with IntentStats.__lock:
+            IntentStats.__metrics = None
+            IntentStats.__enabled = False
+
+    @staticmethod
+    def init(emitter):
+        """
+            Answer intent stats queries on the messagebus and start
+            collecting stats.
+
+            Args:
+                emitter:    messagebus emitter
+        """
+        def handle_query(message):
+            emitter.emit(message.reply('mycroft.debug.intent_stats.response',
+                                       {'stages': IntentStats.summary()}))
+
+        emitter.on('mycroft.debug.intent_stats', handle_query)
+        IntentStats.__enabled = True
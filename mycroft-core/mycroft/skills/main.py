@@ -16,16 +16,18 @@ import json
 import subprocess
 import sys
 import time
+from multiprocessing.pool import ThreadPool
 from threading import Timer, Thread, Event, Lock
 
 import os
-from os.path import exists, join
+from os.path import exists, join, expanduser, basename
 
 import mycroft.dialog
 import mycroft.lock
 from mycroft import MYCROFT_ROOT_PATH
 from mycroft.api import is_paired
 from mycroft.configuration import Configuration
+from mycroft.metrics import Stopwatch
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.messagebus.message import Message
 from mycroft.skills.core import load_skill, create_skill_descriptor, \
@@ -33,6 +35,14 @@ from mycroft.skills.core import load_skill, create_skill_descriptor, \
 from mycroft.skills.event_scheduler import EventScheduler
 from mycroft.skills.intent_service import IntentService
 from mycroft.skills.padatious_service import PadatiousService
+from mycroft.skills.skill_registry import SkillRegistry
+from mycroft.skills.skill_resources import LeakTracker, account
+from mycroft.skills.skill_manifest import SkillManifest, ManifestRecorder, \
+    LazySkill
+from mycroft.skills.msm_job import MsmJob
+from mycroft.skills.supervisor import SkillSupervisor, FALLBACK_REPORT
+from mycroft.skills.timer_service import TimerService
+from mycroft.skills.skill_watcher import SkillWatcher, get_last_modified_date
 from mycroft.util import connected
 from mycroft.util.log import LOG
 
@@ -45,6 +55,22 @@ skills_config = Configuration.get().get("skills")
 BLACKLISTED_SKILLS = skills_config.get("blacklisted_skills", [])
 PRIORITY_SKILLS = skills_config.get("priority_skills", [])
 SKILLS_DIR = '/opt/mycroft/skills'
+# Seconds without changes before a changed skill is reloaded
+RELOAD_DEBOUNCE = skills_config.get("reload_debounce", 1.0)
+# Interval for checking skill changes when inotify isn't available
+POLL_INTERVAL = skills_config.get("poll_interval", 2.0)
+# Number of skills loaded concurrently
+LOAD_WORKERS = skills_config.get("load_workers", 4)
+# Register intents of unused skills from the manifest instead of loading them
+LAZY_LOADING = skills_config.get("lazy_loading", False)
+MANIFEST_FILE = expanduser(skills_config.get("manifest",
+                                             "~/.mycroft/skill_manifest.json"))
+# Number of worker processes hosting skills, 0 loads all skills in-process
+WORKERS = skills_config.get("workers", 0)
+# Skills hosted in a worker process of their own
+PINNED_SKILLS = skills_config.get("pinned_skills", [])
+# Seconds after which a running msm is killed
+MSM_TIMEOUT = skills_config.get("msm_timeout", 1800)
 
 installer_config = Configuration.get().get("SkillInstallerSkill")
 MSM_BIN = installer_config.get("path", join(MYCROFT_ROOT_PATH, 'msm', 'msm'))
@@ -114,34 +140,6 @@ def check_connection():
         thread.start()
 
 
-def _get_last_modified_date(path):
-    """
-        Get last modified date excluding compiled python files, hidden
-        directories and the settings.json file.
-
-        Arg:
-            path:   skill directory to check
-        Returns:    time of last change
-    """
-    last_date = 0
-    root_dir, subdirs, files = os.walk(path).next()
-    # get subdirs and remove hidden ones
-    subdirs = [s for s in subdirs if not s.startswith('.')]
-    for subdir in subdirs:
-        for root, _, _ in os.walk(join(path, subdir)):
-            base = os.path.basename(root)
-            # checking if is a hidden path
-            if not base.startswith(".") and not base.startswith("/."):
-                last_date = max(last_date, os.path.getmtime(root))
-
-    # check files of interest in the skill root directory
-    files = [f for f in files
-             if not f.endswith('.pyc') and f != 'settings.json']
-    for f in files:
-        last_date = max(last_date, os.path.getmtime(os.path.join(path, f)))
-    return last_date
-
-
 class SkillManager(Thread):
     """ Load, update and manage instances of Skill on this system. """
 
@@ -150,9 +148,24 @@ class SkillManager(Thread):
         self._stop_event = Event()
         self._loaded_priority = Event()
         self.next_download = time.time() - 1    # download ASAP
-        self.loaded_skills = {}
+        self.loaded_skills = SkillRegistry.instance()
         self.msm_blocked = False
+        self.msm_job = None
+        self._msm_speak = False
+        self._deferred_skills = set()  # Changed skills msm is working on
         self.ws = ws
+        self.manifest = None
+        if LAZY_LOADING:
+            self.manifest = SkillManifest(MANIFEST_FILE,
+                                          Configuration.get().get('lang'))
+        self.supervisor = None
+        self._fallback_skills = set()  # Skills kept out of the workers
+        self._fallback_reports = []  # Fallback skills reported by workers
+        if WORKERS > 0:
+            self.supervisor = SkillSupervisor(WORKERS, PINNED_SKILLS,
+                                              emitter=ws)
+            ws.on('skillmanager.workers', self.handle_workers_query)
+            ws.on(FALLBACK_REPORT, self.handle_worker_fallback)
 
         # Conversation management
         ws.on('skill.converse.request', self.handle_converse_request)
@@ -163,6 +176,13 @@ class SkillManager(Thread):
         # Update upon request
         ws.on('skillmanager.update', self.schedule_update_skills)
 
+        # Report loaded skills
+        ws.on('skillmanager.list', self.handle_list_request)
+
+        # Report resources held by skills and leaked skill instances
+        self.leak_tracker = LeakTracker()
+        ws.on('skillmanager.resources', self.handle_resources_request)
+
         # Register handlers for external MSM signals
         ws.on('msm.updating', self.block_msm)
         ws.on('msm.removing', self.block_msm)
@@ -182,6 +202,8 @@ class SkillManager(Thread):
 
     def block_msm(self, message=None):
         """ Disallow start of msm. """
+        if self.msm_job:
+            return  # Sent by the msm run by the manager itself
 
         # Make sure the external locking of __msm_lock is done in correct order
         with self.__ext_lock:
@@ -191,6 +213,8 @@ class SkillManager(Thread):
 
     def restore_msm(self, message=None):
         """ Allow start of msm if not allowed. """
+        if self.msm_job:
+            return
 
         # Make sure the external locking of __msm_lock is done in correct order
         with self.__ext_lock:
@@ -199,51 +223,72 @@ class SkillManager(Thread):
                 self.msm_blocked = False
 
     def download_skills(self, speak=False):
-        """ Invoke MSM to install default skills and/or update installed skills
+        """ Start MSM in the background to install default skills and/or
+            update installed skills. The result is handled by
+            finish_download once MSM has exited.
 
             Args:
                 speak (bool, optional): Speak the result? Defaults to False
+
+            Returns:
+                bool: True if MSM was started
         """
-        # Don't invoke msm if already running
-        if exists(MSM_BIN) and self.__msm_lock.acquire():
-            try:
-                # Invoke the MSM script to do the hard work.
-                LOG.debug("==== Invoking Mycroft Skill Manager: " + MSM_BIN)
-                p = subprocess.Popen(MSM_BIN + " default",
-                                     stderr=subprocess.STDOUT,
-                                     stdout=subprocess.PIPE, shell=True)
-                (output, err) = p.communicate()
-                res = p.returncode
-                # Always set next update to an hour from now if successful
-                if res == 0:
-                    self.next_download = time.time() + 60 * MINUTES
-
-                    if res == 0 and speak:
-                        self.ws.emit(Message("speak", {'utterance':
-                                     mycroft.dialog.get("skills updated")}))
-                    return True
-                elif not connected():
-                    LOG.error('msm failed, network connection not available')
-                    if speak:
-                        self.ws.emit(Message("speak", {
-                            'utterance': mycroft.dialog.get(
-                                "not connected to the internet")}))
-                    self.next_download = time.time() + 5 * MINUTES
-                    return False
-                elif res != 0:
-                    LOG.error(
-                        'msm failed with error {}: {}'.format(
-                            res, output))
-                    if speak:
-                        self.ws.emit(Message("speak", {
-                            'utterance': mycroft.dialog.get(
-                                "sorry I couldn't install default skills")}))
-                    self.next_download = time.time() + 5 * MINUTES
-                    return False
-            finally:
-                self.__msm_lock.release()
-        else:
+        if not exists(MSM_BIN):
             LOG.error("Unable to invoke Mycroft Skill Manager: " + MSM_BIN)
+            return False
+        # Don't invoke msm if already running or blocked
+        if self.msm_job or not self.__msm_lock.acquire(False):
+            return False
+        LOG.debug("==== Invoking Mycroft Skill Manager: " + MSM_BIN)
+        self._msm_speak = speak
+        self.msm_job = MsmJob(MSM_BIN + " default", SKILLS_DIR, self.ws,
+                              MSM_TIMEOUT)
+        try:
+            self.msm_job.start()
+        except OSError as e:
+            LOG.error('Could not start msm: ' + repr(e))
+            self.msm_job = None
+            self.__msm_lock.release()
+            return False
+        # Don't start again while running
+        self.next_download = time.time() + 60 * MINUTES
+        return True
+
+    def finish_download(self):
+        """ Handle the result of a finished MSM run.
+
+            Returns:
+                list: skill directory names changed by MSM
+        """
+        job, self.msm_job = self.msm_job, None
+        self.__msm_lock.release()
+        speak = self._msm_speak
+        res = job.returncode
+        # Always set next update to an hour from now if successful
+        if res == 0:
+            self.next_download = time.time() + 60 * MINUTES
+            if speak:
+                self.ws.emit(Message("speak", {'utterance':
+                             mycroft.dialog.get("skills updated")}))
+        elif not connected():
+            LOG.error('msm failed, network connection not available')
+            if speak:
+                self.ws.emit(Message("speak", {
+                    'utterance': mycroft.dialog.get(
+                        "not connected to the internet")}))
+            self.next_download = time.time() + 5 * MINUTES
+        else:
+            LOG.error(
+                'msm failed with error {}: {}'.format(
+                    res, '\n'.join(job.output)))
+            if speak:
+                self.ws.emit(Message("speak", {
+                    'utterance': mycroft.dialog.get(
+                        "sorry I couldn't install default skills")}))
+            self.next_download = time.time() + 5 * MINUTES
+        if job.changed:
+            LOG.info('Skills changed by msm: ' + ', '.join(job.changed))
+        return job.changed
 
     def _load_or_reload_skill(self, skill_folder):
         """
@@ -258,11 +303,11 @@ class SkillManager(Thread):
         skill["path"] = os.path.join(SKILLS_DIR, skill_folder)
 
         # check if folder is a skill (must have __init__.py)
-        if not MainModule + ".py" in os.listdir(skill["path"]):
+        if not exists(join(skill["path"], MainModule + ".py")):
             return
 
         # getting the newest modified date of skill
-        modified = _get_last_modified_date(skill["path"])
+        modified = get_last_modified_date(skill["path"])
         last_mod = skill.get("last_modified", 0)
 
         # checking if skill is loaded and wasn't modified
@@ -286,16 +331,172 @@ class SkillManager(Thread):
                     "{} references remaining. The skill "
                     "won't be cleaned from memory."
                     .format(skill['instance'].name, refs))
+            self.leak_tracker.track(skill_folder, skill["instance"])
             del skill["instance"]
 
         # (Re)load the skill from disk
-        with self.__msm_lock:  # Make sure msm isn't running
+        stopwatch = Stopwatch()
+        with stopwatch:
             skill["loaded"] = True
+            skill["instance"] = self._create_skill(skill_folder, modified)
+            skill["last_modified"] = modified
+        skill["load_time"] = stopwatch.time
+        return stopwatch.time
+
+    def _create_skill(self, skill_folder, modified):
+        """
+            Load a skill, or if lazy loading is enabled and the skill
+            hasn't changed, create a LazySkill from the manifest.
+
+            Args:
+                skill_folder (str): skill directory name
+                modified (float):   last modification date of the skill
+
+            Returns: skill instance, None if loading failed
+        """
+        skill = self.loaded_skills[skill_folder]
+
+        def load(emitter):
             desc = create_skill_descriptor(skill["path"])
-            skill["instance"] = load_skill(desc,
-                                           self.ws, skill["id"],
-                                           BLACKLISTED_SKILLS)
+            return load_skill(desc, emitter, skill["id"], BLACKLISTED_SKILLS)
+
+        if not self.manifest or skill_folder in PRIORITY_SKILLS:
+            return load(self.ws)
+
+        key = self.manifest.key(modified, skill["id"])
+        entry = self.manifest.get(skill_folder, key)
+        if entry:
+            LOG.info("Registered {} from manifest, it will be loaded on "
+                     "first use".format(skill_folder))
+            return LazySkill(skill_folder, skill["id"], entry, self.ws, load)
+
+        recorder = ManifestRecorder(self.ws)
+        instance = load(recorder)
+        self.manifest.record(skill_folder, key, instance, recorder,
+                             skill["path"])
+        return instance
+
+    def _use_worker(self, skill_folder):
+        """ Check if a skill should be hosted in a worker process. """
+        path = join(SKILLS_DIR, skill_folder)
+        return (skill_folder not in PRIORITY_SKILLS and
+                skill_folder not in BLACKLISTED_SKILLS and
+                exists(join(path, MainModule + ".py")) and
+                skill_folder not in self._fallback_skills)
+
+    def _move_fallback_skills(self):
+        """
+            Take the fallback skills reported by the workers out of them.
+
+            Returns: list of skill folders to load in this process
+        """
+        moved = []
+        while self._fallback_reports:
+            skill_folder = self._fallback_reports.pop()
+            self._fallback_skills.add(skill_folder)
+            if self.supervisor.release(skill_folder):
+                skill = self.loaded_skills[skill_folder]
+                skill["loaded"] = False
+                skill.pop("worker", None)
+                moved.append(skill_folder)
+        return moved
+
+    def _load_in_workers(self, skill_folders):
+        """ Host new and changed skills in the worker processes. """
+        changed = {}
+        for skill_folder in skill_folders:
+            skill = self.loaded_skills[skill_folder]
+            skill["path"] = join(SKILLS_DIR, skill_folder)
+            modified = get_last_modified_date(skill["path"])
+            if skill.get("loaded") and modified <= skill["last_modified"]:
+                continue
+            skill["loaded"] = True
+            skill["worker"] = True
             skill["last_modified"] = modified
+            changed[skill_folder] = skill["path"]
+        if changed:
+            self.supervisor.load(changed)
+
+    def _load_skills(self, skill_folders):
+        """
+            Load or reload skills concurrently using up to LOAD_WORKERS
+            threads and report the time spent loading each skill. If
+            worker processes are enabled, skills are handed to those
+            instead when possible.
+
+            Args:
+                skill_folders (list): skill directory names to check
+        """
+        def load(skill_folder):
+            try:
+                return self._load_or_reload_skill(skill_folder)
+            except Exception:
+                LOG.exception('Failed to load ' + skill_folder)
+
+        skill_folders = self._defer_msm_skills(skill_folders)
+        if not skill_folders:
+            return
+        # Create the entries up front, the workers only modify their own
+        for skill_folder in skill_folders:
+            if skill_folder not in self.loaded_skills:
+                self.loaded_skills[skill_folder] = {
+                    "id": hash(os.path.join(SKILLS_DIR, skill_folder))
+                }
+
+        stopwatch = Stopwatch()
+        if self.supervisor:
+            hosted = [f for f in skill_folders if self._use_worker(f)]
+            self._load_in_workers(hosted)
+            skill_folders = [f for f in skill_folders if f not in hosted]
+        with stopwatch:
+            workers = min(LOAD_WORKERS, len(skill_folders))
+            if workers > 1:
+                pool = ThreadPool(workers)
+                try:
+                    load_times = pool.map(load, skill_folders)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                load_times = [load(f) for f in skill_folders]
+
+        if self.manifest:
+            self.manifest.save()
+
+        loaded = sorted([(t, f) for t, f in zip(load_times, skill_folders)
+                         if t is not None], reverse=True)
+        if loaded:
+            LOG.info('Loaded {} skills in {:.2f} s: {}'.format(
+                len(loaded), stopwatch.time,
+                ', '.join('{} {:.2f} s'.format(f, t) for t, f in loaded)))
+
+    def _defer_msm_skills(self, skill_folders):
+        """
+            Hold back reloading skills MSM is working on until it's done.
+
+            Args:
+                skill_folders (list): changed skill directory names
+
+            Returns:
+                list: skills to load now, including skills held back
+                      earlier that MSM is done with
+        """
+        skill_folders = set(skill_folders) | self._deferred_skills
+        if self.msm_blocked:
+            busy = skill_folders  # External MSM, skills are unknown
+        elif self.msm_job:
+            busy = skill_folders & self.msm_job.busy()
+        else:
+            busy = set()
+        self._deferred_skills = busy
+        return sorted(skill_folders - busy)
+
+    def _list_skill_folders(self):
+        """ Returns: list of all skill directory names in SKILLS_DIR """
+        if not exists(SKILLS_DIR):
+            return []
+        return [folder for folder in os.listdir(SKILLS_DIR)
+                if os.path.isdir(os.path.join(SKILLS_DIR, folder))]
 
     def load_skill_list(self, skills_to_load):
         """ Load the specified list of skills from disk
@@ -303,45 +504,54 @@ class SkillManager(Thread):
             Args:
                 skills_to_load (list): list of skill directory names to load
         """
-        if exists(SKILLS_DIR):
-            # checking skills dir and getting all priority skills there
-            skill_list = [folder for folder in filter(
-                lambda x: os.path.isdir(os.path.join(SKILLS_DIR, x)),
-                os.listdir(SKILLS_DIR)) if folder in skills_to_load]
-            for skill_folder in skill_list:
-                self._load_or_reload_skill(skill_folder)
+        # checking skills dir and getting all priority skills there
+        skill_list = [folder for folder in self._list_skill_folders()
+                      if folder in skills_to_load]
+        self._load_skills(skill_list)
 
     def run(self):
         """ Load skills and update periodically from disk and internet """
 
-        # Load priority skills first, in order (very first time this will
-        # occur before MSM has run)
+        # Load priority skills first (very first time this will occur
+        # before MSM has run), the rest is loaded in the first iteration
+        # below
         self.load_skill_list(PRIORITY_SKILLS)
         self._loaded_priority.set()
 
-        # Scan the file folder that contains Skills.  If a Skill is updated,
-        # unload the existing version from memory and reload from the disk.
+        # Watch the file folder that contains Skills. Start watching before
+        # the initial load to not miss any changes.
+        watcher = SkillWatcher.create(SKILLS_DIR, RELOAD_DEBOUNCE,
+                                      POLL_INTERVAL)
+        changed = self._list_skill_folders()
+
+        # If a Skill is updated, unload the existing version from memory
+        # and reload from the disk.
         while not self._stop_event.is_set():
-            # Update skills once an hour
-            if time.time() >= self.next_download:
+            # Update skills once an hour, reloading the changed skills
+            # once MSM is done
+            if self.msm_job and self.msm_job.is_done():
+                changed = list(set(changed) | set(self.finish_download()))
+            elif time.time() >= self.next_download:
                 self.download_skills()
 
-            # Look for recently changed skill(s) needing a reload
-            if exists(SKILLS_DIR):
-                # checking skills dir and getting all skills there
-                list = filter(lambda x: os.path.isdir(
-                    os.path.join(SKILLS_DIR, x)), os.listdir(SKILLS_DIR))
-
-                for skill_folder in list:
-                    self._load_or_reload_skill(skill_folder)
-
-            # remember the date of the last modified skill
-            modified_dates = map(lambda x: x.get("last_modified"),
-                                 self.loaded_skills.values())
-
-            # Pause briefly before beginning next scan
-            time.sleep(2)
-
+            if self.supervisor:
+                changed = list(set(changed) |
+                               set(self._move_fallback_skills()))
+            self._load_skills(changed)
+            if self.supervisor:
+                self.supervisor.check()
+
+            # Sleep until something changes, waking up regularly to
+            # notice stop and update requests
+            timeout = min(max(self.next_download - time.time(), 0), 1.0)
+            changed = watcher.wait(timeout)
+
+        watcher.stop()
+        if self.msm_job:
+            self.msm_job.kill()
+            self.msm_job.join()
+        if self.supervisor:
+            self.supervisor.stop()
         # Do a clean shutdown of all skills
         for skill in self.loaded_skills:
             try:
@@ -368,27 +578,53 @@ class SkillManager(Thread):
         utterances = message.data["utterances"]
         lang = message.data["lang"]
 
-        # loop trough skills list and call converse for skill with skill_id
-        for skill in self.loaded_skills:
-            if self.loaded_skills[skill]["id"] == skill_id:
-                try:
-                    instance = self.loaded_skills[skill]["instance"]
-                except BaseException:
-                    LOG.error("converse requested but skill not loaded")
-                    self.ws.emit(Message("skill.converse.response", {
-                        "skill_id": 0, "result": False}))
-                    return
-                try:
-                    result = instance.converse(utterances, lang)
-                    self.ws.emit(Message("skill.converse.response", {
-                        "skill_id": skill_id, "result": result}))
-                    return
-                except BaseException:
-                    LOG.error(
-                        "Converse method malformed for skill " + str(skill_id))
+        # call converse for skill with skill_id
+        skill = self.loaded_skills.by_id(skill_id)
+        if skill:
+            if skill.get("worker"):
+                return  # The worker process answers
+            try:
+                instance = skill["instance"]
+            except BaseException:
+                LOG.error("converse requested but skill not loaded")
+                self.ws.emit(Message("skill.converse.response", {
+                    "skill_id": 0, "result": False}))
+                return
+            try:
+                result = instance.converse(utterances, lang)
+                self.ws.emit(Message("skill.converse.response", {
+                    "skill_id": skill_id, "result": result}))
+                return
+            except BaseException:
+                LOG.error(
+                    "Converse method malformed for skill " + str(skill_id))
         self.ws.emit(Message("skill.converse.response",
                              {"skill_id": 0, "result": False}))
 
+    def handle_list_request(self, message):
+        """ Report id, load time, handler counts and memory of skills. """
+        skills = self.loaded_skills.describe(
+            exclude=[self.ws, Configuration.get()])
+        self.ws.emit(message.reply('skillmanager.list.response',
+                                   {'skills': skills}))
+
+    def handle_resources_request(self, message):
+        """ Report listeners, threads, CPU time and leaks of skills. """
+        skills = account(self.loaded_skills, self.ws, self.leak_tracker,
+                         exclude=[self.ws, Configuration.get()])
+        self.ws.emit(message.reply('skillmanager.resources.response',
+                                   {'skills': skills}))
+
+    def handle_worker_fallback(self, message):
+        """ Load a fallback skill a worker couldn't host in-process. """
+        path = message.data.get('skill_path', '')
+        self._fallback_reports.append(basename(path.rstrip(os.sep)))
+
+    def handle_workers_query(self, message):
+        """ Report skills, CPU and memory usage of the workers. """
+        self.ws.emit(message.reply('skillmanager.workers.response',
+                                   {'workers': self.supervisor.stats()}))
+
 
 def main():
     global ws
@@ -432,6 +668,7 @@ if __name__ == "__main__":
         if skill_manager:
             skill_manager.stop()
             skill_manager.join()
+        TimerService.instance().shutdown()
 
     finally:
         sys.exit()
@@ -0,0 +1,156 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Running the Mycroft Skill Manager (msm) in the background.
+
+    Each line msm prints is sent as a 'msm.progress' message. The skills
+    msm reports working on are tracked so the SkillManager can hold back
+    reloading them until msm is done, while reloading other skills as
+    usual. Once msm exits the skill directories changed since the start
+    are reported with 'msm.finished'. msm is killed if it runs too long.
+"""
+import signal
+import subprocess
+from threading import Thread, Timer, Lock
+
+import os
+from os.path import basename, exists, isdir, join
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.skill_watcher import get_last_modified_date
+from mycroft.util.log import LOG
+
+# msm output announcing work on a skill: prefix, suffix
+SKILL_ANNOUNCEMENTS = [("Updating ", "..."),
+                       ("Installing from: ", ""),
+                       ("Removing '", "'...")]
+
+
+def skill_of_line(line):
+    """
+        Get the skill folder name from an msm output line.
+
+        Returns: folder name or None if the line doesn't announce a skill
+    """
+    for prefix, suffix in SKILL_ANNOUNCEMENTS:
+        if line.startswith(prefix) and line.endswith(suffix):
+            name = line[len(prefix):len(line) - len(suffix)].rstrip('/')
+            name = basename(name)
+            if name.endswith('.git'):
+                name = name[:-len('.git')]
+            return name or None
+    return None
+
+
+def snapshot(skills_dir):
+    """ Returns: dict with the last modification date by skill folder """
+    if not exists(skills_dir):
+        return {}
+    return {folder: get_last_modified_date(join(skills_dir, folder))
+            for folder in os.listdir(skills_dir)
+            if isdir(join(skills_dir, folder))}
+
+
+class MsmJob(object):
+    """
+        msm running in a subprocess supervised by a background thread.
+
+        Args:
+            command (str):      msm command line, run by the shell
+            skills_dir (str):   directory with the skills msm manages
+            emitter:            messagebus emitter for progress messages
+            timeout (float):    seconds after which msm is killed
+    """
+
+    def __init__(self, command, skills_dir, emitter, timeout):
+        self.command = command
+        self.skills_dir = skills_dir
+        self.emitter = emitter
+        self.timeout = timeout
+        self.returncode = None
+        self.output = []
+        self.changed = []
+        self.timed_out = False
+        self._busy = set()
+        self._before = {}
+        self._process = None
+        self._thread = None
+        self._lock = Lock()
+
+    def start(self):
+        self._before = snapshot(self.skills_dir)
+        self._process = subprocess.Popen(self.command,
+                                         stderr=subprocess.STDOUT,
+                                         stdout=subprocess.PIPE, shell=True,
+                                         preexec_fn=os.setsid)
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        watchdog = Timer(self.timeout, self._expire)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            for line in iter(self._process.stdout.readline, ''):
+                line = line.rstrip()
+                self.output.append(line)
+                skill = skill_of_line(line)
+                if skill:
+                    with self._lock:
+                        self._busy.add(skill)
+                self.emitter.emit(Message('msm.progress', {
+                    'line': line, 'skill': skill}))
+            self._process.wait()
+        finally:
+            watchdog.cancel()
+
+        after = snapshot(self.skills_dir)
+        self.changed = sorted(folder for folder in set(after) |
+                              set(self._before)
+                              if after.get(folder) !=
+                              self._before.get(folder))
+        self.returncode = self._process.returncode
+        self.emitter.emit(Message('msm.finished', {
+            'returncode': self.returncode, 'changed': self.changed}))
+
+    def _expire(self):
+        LOG.error('msm did not finish in {} s, killing it'.format(
+            self.timeout))
+        self.timed_out = True
+        self.kill()
+
+    def busy(self):
+        """ Returns: set of skill folders msm has worked on so far """
+        with self._lock:
+            return set(self._busy)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def is_done(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    def kill(self):
+        """ Kill msm and the commands it started. """
+        try:
+            if self._process and self._process.poll() is None:
+                os.killpg(self._process.pid, signal.SIGKILL)
+        except OSError:
+            pass  # Already exited
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
@@ -21,7 +21,10 @@ from pkg_resources import get_distribution
 
 from mycroft.configuration import Configuration
 from mycroft.messagebus.message import Message
+from mycroft.metrics import Stopwatch
 from mycroft.skills.core import FallbackSkill
+from mycroft.skills.intent_stats import IntentStats
+from mycroft.skills.skill_registry import SkillRegistry
 from mycroft.util.log import LOG
 
 
@@ -29,6 +32,9 @@ PADATIOUS_VERSION = '0.3.6'  # Also update in requirements.txt
 
 
 class PadatiousService(FallbackSkill):
+    # Matches below this confidence are left to other fallbacks
+    MIN_CONFIDENCE = 0.5
+
     def __init__(self, emitter):
         FallbackSkill.__init__(self)
         self.config = Configuration.get()['padatious']
@@ -91,21 +97,38 @@ class PadatiousService(FallbackSkill):
 
     def register_intent(self, message):
         self._register_object(message, 'intent', self.container.load_intent)
+        SkillRegistry.instance().add_intent(message.data['name'])
 
     def register_entity(self, message):
         self._register_object(message, 'entity', self.container.load_entity)
 
-    def handle_fallback(self, message):
-        utt = message.data.get('utterance')
-        LOG.debug("Padatious fallback attempt: " + utt)
+    def calc_intent(self, utt):
+        """
+            Match an utterance against the trained Padatious intents,
+            waiting for any ongoing training to finish.
+
+            Args:
+                utt (str): utterance to match
 
+            Returns: padatious MatchData with name, matches and conf
+        """
         if not self.finished_training_event.is_set():
             LOG.debug('Waiting for training to finish...')
             self.finished_training_event.wait()
 
-        data = self.container.calc_intent(utt)
+        stopwatch = Stopwatch()
+        with stopwatch:
+            data = self.container.calc_intent(utt)
+        IntentStats.timer('padatious', stopwatch.time)
+        return data
+
+    def handle_fallback(self, message):
+        utt = message.data.get('utterance')
+        LOG.debug("Padatious fallback attempt: " + utt)
+
+        data = self.calc_intent(utt)
 
-        if data.conf < 0.5:
+        if data.conf < self.MIN_CONFIDENCE:
             return False
 
         data.matches['utterance'] = utt
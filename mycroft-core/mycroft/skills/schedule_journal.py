@@ -0,0 +1,204 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Crash-safe storage of the EventScheduler's schedule.
+
+    Every change of the schedule is appended to a journal as a line of
+    json, numbered with a sequence number. The journal is written and
+    synced to disk in batches and from time to time compacted into a
+    snapshot of the whole schedule, which records the sequence number of
+    the last change it contains. Loading reads the snapshot and replays
+    the newer changes from the journal, ignoring a line cut off by a
+    crash.
+
+    Snapshots written before the journal existed, containing only the
+    events, are read as well.
+"""
+import json
+import time
+
+import os
+from os.path import dirname, exists
+
+from mycroft.util.log import LOG
+
+
+def apply_change(events, change):
+    """
+        Apply a journaled change to a schedule.
+
+        Args:
+            events (dict):  event name: list of [time, repeat, data]
+            change (dict):  journal entry
+    """
+    op = change['op']
+    event = change['event']
+    if op == 'schedule':
+        events.setdefault(event, []).append(
+            [change['time'], change['repeat'], change['data']])
+    elif op == 'remove':
+        events.pop(event, None)
+    elif op == 'update':
+        if events.get(event):
+            events[event][0][2] = change['data']
+    elif op == 'fire':
+        entries = events.get(event, [])
+        for i, entry in enumerate(entries):
+            if entry[0] == change['time']:
+                del entries[i]
+                break
+        if not entries:
+            events.pop(event, None)
+
+
+class ScheduleJournal(object):
+    """
+        Snapshot and journal of a schedule.
+
+        Args:
+            path (str):             snapshot file, the journal is stored
+                                    next to it with the extension .journal
+            sync_interval (float):  seconds changes may stay unsynced
+            compact_changes (int):  minimum journal length triggering
+                                    compaction
+    """
+
+    def __init__(self, path, sync_interval=1.0, compact_changes=1000):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.sync_interval = sync_interval
+        self.compact_changes = compact_changes
+        self.seq = 0
+        self.changes = 0  # Journal entries since the snapshot
+        self._file = None
+        self._unsynced_since = None
+
+    def load(self):
+        """
+            Read the snapshot, replay the journal and open the journal
+            for appending.
+
+            Returns: dict with the schedule, event name: list of entries
+        """
+        events = {}
+        if exists(self.path):
+            try:
+                with open(self.path) as f:
+                    snapshot = json.load(f)
+                if isinstance(snapshot.get('seq'), int) and \
+                        isinstance(snapshot.get('events'), dict):
+                    self.seq = snapshot['seq']
+                    events = snapshot['events']
+                else:
+                    events = snapshot
+            except (IOError, ValueError) as e:
+                LOG.error('Could not read schedule {}: {}'.format(self.path,
+                                                                  repr(e)))
+        if exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        break  # Cut off by a crash
+                    if change['seq'] > self.seq:
+                        apply_change(events, change)
+                        self.seq = change['seq']
+                        self.changes += 1
+        self._open()
+        return events
+
+    def _open(self):
+        try:
+            if not exists(dirname(self.journal_path)):
+                os.makedirs(dirname(self.journal_path))
+            self._file = open(self.journal_path, 'a')
+        except (IOError, OSError) as e:
+            LOG.error('Schedule changes will not be stored: ' + repr(e))
+            self._file = None
+
+    def append(self, op, event, **fields):
+        """ Write a change to the journal, it's flushed by sync(). """
+        if not self._file:
+            return
+        self.seq += 1
+        fields.update({'seq': self.seq, 'op': op, 'event': event})
+        try:
+            self._file.write(json.dumps(fields) + '\n')
+        except (IOError, ValueError) as e:
+            LOG.error('Could not write schedule journal: ' + repr(e))
+            return
+        self.changes += 1
+        if self._unsynced_since is None:
+            self._unsynced_since = time.time()
+
+    def sync_time(self):
+        """ Returns: time the journal must be synced, None if synced """
+        if self._unsynced_since is None:
+            return None
+        return self._unsynced_since + self.sync_interval
+
+    def sync(self):
+        """ Write the appended changes to disk. """
+        if self._file and self._unsynced_since is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced_since = None
+
+    def needs_compaction(self, events):
+        """
+            Check if the journal has grown larger than a snapshot of the
+            schedule, keeping the cost of compaction proportional to the
+            changes made.
+
+            Args:
+                events (dict): current schedule
+        """
+        entries = sum(len(e) for e in events.values())
+        return self.changes >= max(self.compact_changes, entries)
+
+    def compact(self, events):
+        """
+            Write a snapshot of the schedule and empty the journal.
+
+            Args:
+                events (dict): current schedule
+        """
+        tmp = self.path + '.tmp'
+        try:
+            if not exists(dirname(self.path)):
+                os.makedirs(dirname(self.path))
+            with open(tmp, 'w') as f:
+                json.dump({'seq': self.seq, 'events': events}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as e:
+            LOG.error('Could not write schedule snapshot: ' + repr(e))
+            return
+        # The snapshot contains all journaled changes
+        if self._file:
+            self._file.close()
+        with open(self.journal_path, 'w'):
+            pass
+        self._unsynced_since = None
+        self.changes = 0
+        self._open()
+
+    def close(self):
+        if self._file:
+            self.sync()
+            self._file.close()
+            self._file = None
@@ -13,7 +13,7 @@
 # limitations under the License.
 #
 from datetime import datetime
-from threading import Timer, Lock
+from threading import Lock
 from time import mktime
 
 import abc
@@ -22,6 +22,7 @@ from adapt.intent import IntentBuilder
 
 from mycroft.skills import time_rules
 from mycroft.skills.core import MycroftSkill
+from mycroft.skills.timer_service import TimerService
 from mycroft.util.log import LOG
 
 
@@ -68,13 +69,12 @@ class ScheduledSkill(MycroftSkill):
             t = times[0]
             now = self.get_utc_time()
             delay = max(float(t) - now, 1)
-            self.timer = Timer(delay, self.notify, [t])
-            self.timer.daemon = True
-            self.start()
+            self.timer = TimerService.instance().schedule(delay, self.notify,
+                                                          [t])
 
     def start(self):
-        if self.timer:
-            self.timer.start()
+        """ Timers are started by schedule(), kept for compatibility. """
+        pass
 
     def cancel(self):
         if self.timer:
@@ -111,10 +111,7 @@ class ScheduledSkill(MycroftSkill):
 
     def shutdown(self):
         super(ScheduledSkill, self).shutdown()
-        # if timer method is running wait for it to complete
         self.cancel()
-        if self.timer and self.timer.isAlive():
-            self.timer.join()
         self.timer = None
 
 
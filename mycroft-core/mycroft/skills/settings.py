@@ -25,13 +25,29 @@
         s.store()
 """
 
+import hashlib
 import json
-from threading import Timer
-from os.path import isfile, join, expanduser
+import os
+import stat
+from os.path import isfile, join
+from threading import Thread, Lock
 
-from mycroft.api import DeviceApi
+from mycroft.skills.settings_sync import SettingsSync
+from mycroft.skills.timer_service import TimerService
 from mycroft.util.log import LOG
-from mycroft.configuration import ConfigurationManager
+
+STORE_DELAY = 2.0  # Seconds changes are collected before being stored
+
+
+def hash_meta(settings_meta, device_uuid):
+    """
+        Hash settings metadata for a device, identifying it in the backend.
+        The hash of canonical json is the same in every run, unlike hash().
+
+        Returns: hex digest of the SHA-1 hash
+    """
+    data = json.dumps(settings_meta, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data + str(device_uuid)).hexdigest()
 
 
 class SkillSettings(dict):
@@ -39,35 +55,68 @@ class SkillSettings(dict):
         to file, serialized as json. It also syncs to the backend for
         skill settings
 
+        Assigning and removing values is tracked as it happens. Lists and
+        dicts are stored as they are and can be changed in place, their
+        content is compared to what was last stored when storing, so only
+        settings holding lists or dicts cost a serialization. store_later()
+        writes all changes made within STORE_DELAY seconds
+        at once, store() writes them right away. The file is replaced
+        atomically, a crash leaves either the old or the new settings.
+
         Args:
             settings_file (str): Path to storage file
     """
 
     def __init__(self, directory, name):
         super(SkillSettings, self).__init__()
-        self.api = DeviceApi()
+        self.sync = SettingsSync.instance()
+        self.api = self.sync.api
         self._device_identity = self.api.identity.uuid
-        self.config = ConfigurationManager.get()
         self.name = name
         # set file paths
+        self._directory = directory
         self._settings_path = join(directory, 'settings.json')
         self._meta_path = join(directory, 'settingsmeta.json')
+        # Hidden, the skill watcher doesn't reload the skill for it
+        self._tmp_path = join(directory, '.settings.json.tmp')
         self._api_path = "/" + self._device_identity + "/skill"
         self.is_alive = True
-        self.loaded_hash = hash(str(self))
+        self._identifier = None
+        self._meta_thread = None
+        self._dirty = False
+        self._containers = None  # json of the stored list and dict values
+        self._store_lock = Lock()
+        self._store_timer = None
+
+        self.load_skill_settings()
+        self._mark_stored()  # Content matches settings.json
 
-        # if settingsmeta.json exists
-        # this block of code is a control flow for
-        # different scenarios that may arises with settingsmeta
+        # if settingsmeta.json exists it's uploaded in the background,
+        # the skill is loaded with the local settings meanwhile
         if isfile(self._meta_path):
             LOG.info("settingsmeta.json exist for {}".format(self.name))
             settings_meta = self._load_settings_meta()
-            hashed_meta = hash(str(settings_meta)+str(self._device_identity))
+            hashed_meta = hash_meta(settings_meta, self._device_identity)
+            self._meta_thread = Thread(target=self._upload_settings_meta,
+                                       args=(settings_meta, hashed_meta),
+                                       name='SettingsMeta-' + self.name)
+            self._meta_thread.daemon = True
+            self._meta_thread.start()
+
+    def _upload_settings_meta(self, settings_meta, hashed_meta):
+        """ Make sure the backend has the current settingsmeta.json and
+            start receiving settings changes. This control flow handles
+            the different scenarios that may arise with settingsmeta.
+
+            Args:
+                settings_meta (dict): content of settingsmeta.json
+                hashed_meta (str): hash of the settings meta and device
+        """
+        try:
             # check if hash is different from the saved hashed
             if self._is_new_hash(hashed_meta):
                 LOG.info("looks like settingsmeta.json " +
                          "has changed for {}".format(self.name))
-                # TODO: once the delete api for device is created uncomment
                 if self._uuid_exist():
                     try:
                         LOG.info("a uuid exist for {}".format(self.name) +
@@ -99,16 +148,32 @@ class SkillSettings(dict):
                         settings_meta, hashed_meta)
                     self._save_uuid(new_uuid)
                     self._save_hash(hashed_meta)
+        except Exception as e:
+            LOG.error("Could not upload settingsmeta.json of {}: {}".format(
+                self.name, repr(e)))
 
-            t = Timer(60, self._poll_skill_settings, [hashed_meta])
-            t.daemon = True
-            t.start()
+        if self.is_alive:
+            self._identifier = str(hashed_meta)
+            self.sync.register(self, self._identifier)
+            if not self.is_alive:  # Shut down while registering
+                self.sync.unregister(self)
 
-        self.load_skill_settings()
+    def _containers_json(self):
+        """ Returns: json of the list and dict values """
+        try:
+            return json.dumps(dict((k, v) for k, v in self.iteritems()
+                                   if isinstance(v, (list, dict))),
+                              sort_keys=True)
+        except (TypeError, ValueError):
+            return None  # Not serializable, reported when storing
+
+    def _mark_stored(self):
+        self._dirty = False
+        self._containers = self._containers_json()
 
     @property
     def _is_stored(self):
-        return hash(str(self)) == self.loaded_hash
+        return not self._dirty and self._containers == self._containers_json()
 
     def __getitem__(self, key):
         """ Get key """
@@ -116,8 +181,38 @@ class SkillSettings(dict):
 
     def __setitem__(self, key, value):
         """ Add/Update key. """
+        if key not in self or self[key] != value:
+            self._dirty = True
         return super(SkillSettings, self).__setitem__(key, value)
 
+    def __delitem__(self, key):
+        """ Remove key. """
+        self._dirty = True
+        return super(SkillSettings, self).__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).iteritems():
+            self.__setitem__(key, value)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.__setitem__(key, default)
+        return self[key]
+
+    def pop(self, key, *args):
+        if key in self:
+            self._dirty = True
+        return super(SkillSettings, self).pop(key, *args)
+
+    def popitem(self):
+        self._dirty = True
+        return super(SkillSettings, self).popitem()
+
+    def clear(self):
+        if self:
+            self._dirty = True
+        return super(SkillSettings, self).clear()
+
     def _load_settings_meta(self):
         """ loads settings metadata from skills path """
         with open(self._meta_path) as f:
@@ -129,7 +224,7 @@ class SkillSettings(dict):
 
             Args:
                 param1 (dict): dictionary of the current settings meta data
-                param1 (int): hashed settings meta data
+                param1 (str): hashed settings meta data
 
             Returns:
                 uuid (str): a unique id for the setting meta data
@@ -137,7 +232,7 @@ class SkillSettings(dict):
         try:
             settings_meta["identifier"] = str(hashed_meta)
             self._put_metadata(settings_meta)
-            settings = self._get_remote_settings()
+            settings = self._get_remote_settings(max_age=0)
             skill_identity = str(hashed_meta)
             uuid = None
             # TODO: note uuid should be returned from the put request
@@ -154,9 +249,7 @@ class SkillSettings(dict):
             Returns:
                 uuid (str): uuid of the previous settingsmeta
         """
-        directory = self.config.get("skills")["directory"]
-        directory = join(directory, self.name)
-        directory = expanduser(directory)
+        directory = self._directory
         uuid_file = join(directory, 'uuid')
         if isfile(uuid_file):
             with open(uuid_file, 'r') as f:
@@ -170,9 +263,7 @@ class SkillSettings(dict):
                 param1 (str): uuid of new seetingsmeta
         """
         LOG.info("saving uuid {}".format(str(uuid)))
-        directory = self.config.get("skills")["directory"]
-        directory = join(directory, self.name)
-        directory = expanduser(directory)
+        directory = self._directory
         uuid_file = join(directory, 'uuid')
         with open(uuid_file, 'w') as f:
             f.write(str(uuid))
@@ -181,12 +272,10 @@ class SkillSettings(dict):
         """ saves hashed_meta to path
 
             Args:
-                param1 (int): hashed of new seetingsmeta
+                param1 (str): hashed of new seetingsmeta
         """
         LOG.info("saving hash {}".format(str(hashed_meta)))
-        directory = self.config.get("skills")["directory"]
-        directory = join(directory, self.name)
-        directory = expanduser(directory)
+        directory = self._directory
         hash_file = join(directory, 'hash')
         with open(hash_file, 'w') as f:
             f.write(str(hashed_meta))
@@ -197,9 +286,7 @@ class SkillSettings(dict):
             Returns:
                 bool: True if uuid file exist False otherwise
         """
-        directory = self.config.get("skills")["directory"]
-        directory = join(directory, self.name)
-        directory = expanduser(directory)
+        directory = self._directory
         uuid_file = join(directory, 'uuid')
         return isfile(uuid_file)
 
@@ -209,14 +296,12 @@ class SkillSettings(dict):
             case of first load, then the create it and return True
 
             Args:
-                param1 (int): hash of metadata and uuid of device
+                param1 (str): hash of metadata and uuid of device
 
             Returns:
                 bool: True if hash is new False otherwise
         """
-        directory = self.config.get("skills")["directory"]
-        directory = join(directory, self.name)
-        directory = expanduser(directory)
+        directory = self._directory
         hash_file = join(directory, 'hash')
         if isfile(hash_file):
             with open(hash_file, 'r') as f:
@@ -224,38 +309,26 @@ class SkillSettings(dict):
             return False if current_hash == str(hashed_meta) else True
         return True
 
-    def _poll_skill_settings(self, hashed_meta):
-        """ If identifier exists for this skill poll to backend to
-            request settings and store it if it changes
-            TODO: implement as websocket
+    def update_remote(self, values):
+        """ Apply settings changed through home.mycroft.ai and store
+            them, called by the SettingsSync of the skills process.
 
             Args:
-                param1 (int): the hashed identifier
-
+                values (dict): setting values by field name
         """
-        LOG.info("getting settings from home.mycroft.ai")
-        try:
-            # update settings
-            settings = self._get_remote_settings()
-            skill_identity = str(hashed_meta)
-            for skill_setting in settings:
-                if skill_setting['identifier'] == skill_identity:
-                    sections = skill_setting['skillMetadata']['sections']
-                    for section in sections:
-                        for field in section["fields"]:
-                            self.__setitem__(field["name"], field["value"])
-
-            # store value if settings has changed from backend
-            self.store()
-
-        except Exception as e:
-            LOG.error(e)
-
-        if self.is_alive:
-            # continues to poll settings every 60 seconds
-            t = Timer(60, self._poll_skill_settings, [hashed_meta])
-            t.daemon = True
-            t.start()
+        LOG.debug("updating settings of {} from home.mycroft.ai".format(
+            self.name))
+        for key, value in values.iteritems():
+            self.__setitem__(key, value)
+        self.store()
+
+    def shutdown(self):
+        """ Store pending changes and stop receiving settings from the
+            backend.
+        """
+        self.is_alive = False
+        self.sync.unregister(self)
+        self.store()
 
     def load_skill_settings(self):
         """ If settings.json exist, open and read stored values into self """
@@ -270,20 +343,20 @@ class SkillSettings(dict):
                     # metadata to be able to edit later.
                     LOG.error(e)
 
-    def _get_remote_settings(self):
-        """ Get skill settings for this device from backend """
-        settings = self.api.request({
-            "method": "GET",
-            "path": self._api_path
-        })
-        settings = [skills for skills in settings if skills is not None]
-        return settings
+    def _get_remote_settings(self, max_age=None):
+        """ Get skill settings for this device from backend, a download
+            made by another skill during the last max_age seconds is reused
+
+            Args:
+                max_age (float): accepted age, the sync interval if None
+        """
+        return self.sync.remote_settings(max_age)
 
     def _put_metadata(self, settings_meta):
         """ PUT settingsmeta to backend to be configured in home.mycroft.ai.
             used in plcae of POST and PATCH
         """
-        return self.api.request({
+        return self.sync.request({
             "method": "PUT",
             "path": self._api_path,
             "json": settings_meta
@@ -295,7 +368,7 @@ class SkillSettings(dict):
             Args:
                 param1 (str): unique id of the skill
         """
-        return self.api.request({
+        return self.sync.request({
             "method": "DELETE",
             "path": self._api_path + "/{}".format(uuid)
         })
@@ -306,7 +379,49 @@ class SkillSettings(dict):
             Args:
                 force:  Force write despite no change
         """
-        if force or not self._is_stored:
-            with open(self._settings_path, 'w') as f:
-                json.dump(self, f)
-            self.loaded_hash = hash(str(self))
+        with self._store_lock:
+            if self._store_timer:
+                self._store_timer.cancel()
+                self._store_timer = None
+            if force or not self._is_stored:
+                self._write()
+
+    def store_later(self):
+        """ Store changes within STORE_DELAY seconds, together with the
+            changes made until then.
+        """
+        with self._store_lock:
+            if self._is_stored or self._store_timer or not self.is_alive:
+                return
+            self._store_timer = TimerService.instance().schedule(
+                STORE_DELAY, self._store_pending)
+
+    def _store_pending(self):
+        with self._store_lock:
+            self._store_timer = None
+            if not self._is_stored:
+                self._write()
+
+    def _write(self):
+        """ Replace settings.json by the current settings, the caller
+            holds the store lock.
+        """
+        tmp = self._tmp_path
+        try:
+            # Changes from now on are stored next time
+            self._mark_stored()
+            data = json.dumps(dict(self))
+            with open(tmp, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if isfile(self._settings_path):
+                # Keep the permissions of the replaced file
+                mode = os.stat(self._settings_path).st_mode
+                os.chmod(tmp, stat.S_IMODE(mode))
+            os.rename(tmp, self._settings_path)
+        except (IOError, OSError, TypeError, ValueError, RuntimeError) as e:
+            # RuntimeError if changed by another thread while serialized
+            self._dirty = True
+            LOG.error("Could not store settings of {}: {}".format(self.name,
+                                                                  repr(e)))
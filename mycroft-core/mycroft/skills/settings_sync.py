@@ -0,0 +1,205 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Synchronization of skill settings with home.mycroft.ai.
+
+    The backend returns the settings of all skills of the device at once.
+    Instead of each SkillSettings downloading them, the SettingsSync of
+    the skills process fetches them once per interval, using the ETag of
+    the previous response to skip unchanged settings, and passes the
+    values that changed to the SkillSettings they belong to. Skills are
+    identified by the identifier sent with their settingsmeta.json.
+"""
+import time
+from threading import Lock, Thread
+
+from mycroft.api import DeviceApi
+from mycroft.skills.timer_service import TimerService
+from mycroft.util.log import LOG
+
+SYNC_INTERVAL = 60  # Seconds between downloads of the settings
+
+
+def settings_values(skill_settings):
+    """
+        Get the values from the settings of a skill as returned by the
+        backend.
+
+        Returns: dict with the values by field name
+    """
+    values = {}
+    for section in skill_settings['skillMetadata']['sections']:
+        for field in section['fields']:
+            if 'name' in field and 'value' in field:
+                values[field['name']] = field['value']
+    return values
+
+
+class SettingsSync(object):
+    """
+        Downloads the skill settings for all SkillSettings of the process.
+
+        Args:
+            interval (float):   seconds between downloads
+            api:                DeviceApi, created when first used if None
+    """
+    __instance = None
+    __lock = Lock()
+
+    def __init__(self, interval=SYNC_INTERVAL, api=None):
+        self.interval = interval
+        self._api = api
+        self.skills = {}  # identifier: SkillSettings
+        self.settings = []  # Skill settings of the last download
+        self.values = {}  # identifier: values of the last download
+        self.etag = None
+        self.fetched = 0  # Time of the last download
+        self._timer = None
+        self._thread = None
+        self._lock = Lock()  # Protects the registrations and downloads
+        self._fetch_lock = Lock()  # Keeps downloads in order
+        self._api_lock = Lock()
+
+    @staticmethod
+    def instance():
+        """ Get the settings sync shared by the skills process. """
+        with SettingsSync.__lock:
+            if SettingsSync.__instance is None:
+                SettingsSync.__instance = SettingsSync()
+            return SettingsSync.__instance
+
+    @property
+    def api(self):
+        with self._api_lock:
+            if self._api is None:
+                self._api = DeviceApi()
+            return self._api
+
+    def request(self, params):
+        """ Send a request to the backend using the shared DeviceApi. """
+        api = self.api
+        with self._api_lock:
+            return api.request(params)
+
+    def register(self, settings, identifier):
+        """
+            Start passing backend changes to a SkillSettings.
+
+            Args:
+                settings (SkillSettings):   settings to update
+                identifier (str):           identifier of the skill's
+                                            settingsmeta in the backend
+        """
+        with self._lock:
+            self.skills[identifier] = settings
+            values = self.values.get(identifier)
+            if not self._timer:
+                self._timer = TimerService.instance().schedule(
+                    self.interval, self._start_sync, repeat=self.interval)
+        if values:
+            # Already downloaded while the skill was being loaded
+            settings.update_remote(values)
+
+    def unregister(self, settings):
+        with self._lock:
+            for identifier, s in self.skills.items():
+                if s is settings:
+                    del self.skills[identifier]
+            if not self.skills and self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _start_sync(self):
+        """ Download in a thread of its own, not on the timer thread. """
+        if self._thread and self._thread.is_alive():
+            return  # Previous download still running
+        self._thread = Thread(target=self.sync)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def remote_settings(self, max_age=None):
+        """
+            Get the settings of all skills, downloading them if the last
+            download is older than max_age seconds. Registered skills
+            whose values changed are updated.
+
+            Args:
+                max_age (float): accepted age, defaults to the interval
+
+            Returns: list of skill settings as returned by the backend
+        """
+        max_age = self.interval if max_age is None else max_age
+        if time.time() - self.fetched > max_age:
+            self._update(self.fetch())
+        return self.settings
+
+    def fetch(self):
+        """
+            Download the settings if they have changed since the last
+            download.
+
+            Returns: list of identifiers of skills whose values changed
+        """
+        # Registrations don't wait for the backend, only the results
+        # are swapped in holding the lock
+        with self._fetch_lock:
+            settings, etag = self._get(self.etag)
+            fetched = time.time()
+            if settings is not None:
+                settings = [s for s in settings if s is not None]
+                values = {}
+                for skill_settings in settings:
+                    identifier = skill_settings.get('identifier')
+                    try:
+                        values[identifier] = settings_values(skill_settings)
+                    except (KeyError, TypeError):
+                        continue
+            with self._lock:
+                self.fetched = fetched
+                if settings is None:
+                    return []  # Not modified
+                self.etag = etag
+                self.settings = settings
+                changed = [i for i in values
+                           if values[i] != self.values.get(i)]
+                self.values = values
+                return changed
+
+    def _get(self, etag):
+        api = self.api
+        with self._api_lock:
+            return api.get_skill_settings(etag)
+
+    def sync(self):
+        """ Download the settings and update the changed skills. """
+        LOG.debug("getting settings from home.mycroft.ai")
+        try:
+            changed = self.fetch()
+        except Exception as e:
+            LOG.error('Could not get skill settings: ' + repr(e))
+            return
+        self._update(changed)
+
+    def _update(self, changed):
+        """ Pass the changed values to the registered skills. """
+        with self._lock:
+            updates = [(self.skills[i], self.values[i]) for i in changed
+                       if i in self.skills]
+        for settings, values in updates:
+            try:
+                settings.update_remote(values)
+            except Exception:
+                LOG.exception('Could not update settings of ' +
+                              settings.name)
@@ -0,0 +1,280 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Lazy loading of skills.
+
+    When a skill is loaded the vocabulary, regex, intent and padatious
+    registrations it sends are recorded in a manifest together with the
+    last modification date of the skill. On later starts, skills with an
+    up to date manifest entry are represented by a LazySkill which replays
+    the registrations without importing the skill. The skill is imported
+    and initialized when one of its intents is triggered for the first time.
+
+    Only skills that do nothing but register intents and handle them are
+    loaded lazily. Skills without intents, fallback skills, scheduled
+    skills, skills implementing converse, skills with web settings and
+    skills listening to other messages are always loaded directly.
+"""
+import json
+from threading import Lock
+
+import os
+from os.path import exists, dirname, join
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import MycroftSkill, FallbackSkill
+from mycroft.skills.scheduled_skills import ScheduledSkill
+from mycroft.util.log import LOG
+
+# Messages registering vocabulary and intents with the intent services
+REGISTRATION_EVENTS = ['register_vocab', 'register_intent',
+                       'padatious:register_intent',
+                       'padatious:register_entity']
+INTENT_EVENTS = ['register_intent', 'padatious:register_intent']
+
+
+def _message_key(message_type, data):
+    return json.dumps({'type': message_type, 'data': data}, sort_keys=True)
+
+
+class ManifestRecorder(object):
+    """
+        Emitter wrapper recording the registration messages of a skill.
+
+        All other calls are passed on to the wrapped emitter.
+
+        Args:
+            emitter:        messagebus emitter to wrap
+            local_events:   event names handled by the owner of the
+                            recorder instead of the messagebus
+            known:          registration messages (as in messages) that
+                            have already been sent and are not sent again
+    """
+
+    def __init__(self, emitter, local_events=None, known=None):
+        self.emitter = emitter
+        self.recording = True
+        self.messages = []
+        self.other_messages = False
+        self.local_events = set(local_events or [])
+        self.local_handlers = {}
+        self._known = set(_message_key(m['type'], m['data'])
+                          for m in known or [])
+
+    def emit(self, message):
+        if self.recording:
+            if message.type in REGISTRATION_EVENTS:
+                data = json.loads(json.dumps(message.data))
+                self.messages.append({'type': message.type, 'data': data})
+                if _message_key(message.type, data) in self._known:
+                    return
+            else:
+                self.other_messages = True
+        self.emitter.emit(message)
+
+    def on(self, event, f):
+        if event in self.local_events:
+            self.local_handlers.setdefault(event, []).append(f)
+        else:
+            self.emitter.on(event, f)
+
+    def remove(self, event, f):
+        if f in self.local_handlers.get(event, []):
+            self.local_handlers[event].remove(f)
+        else:
+            self.emitter.remove(event, f)
+
+    def __getattr__(self, attr):
+        return getattr(self.emitter, attr)
+
+
+def intent_names(messages):
+    """ Returns: names of the intents registered by the messages """
+    return [m['data']['name'] for m in messages
+            if m['type'] in INTENT_EVENTS]
+
+
+def is_lazy_loadable(instance, recorder, skill_path):
+    """
+        Check if a skill can be replaced by its manifest until one of its
+        intents is used.
+
+        Args:
+            instance:           the loaded skill
+            recorder:           ManifestRecorder the skill was loaded with
+            skill_path (str):   skill directory
+
+        Returns: True if the skill can be loaded lazily
+    """
+    if not isinstance(instance, MycroftSkill):
+        return False
+    if isinstance(instance, (FallbackSkill, ScheduledSkill)):
+        return False
+    if type(instance).converse.im_func is not MycroftSkill.converse.im_func:
+        return False
+    if recorder.other_messages:
+        return False
+    if exists(join(skill_path, 'settingsmeta.json')):
+        return False
+    intents = intent_names(recorder.messages)
+    if not intents:
+        return False  # Nothing would ever load the skill
+    events = set(intents + ['mycroft.stop'])
+    return all(name in events for name, _ in instance.events or [])
+
+
+class SkillManifest(object):
+    """
+        Registrations of all lazily loadable skills, stored as json.
+
+        Args:
+            path (str): manifest file
+            lang (str): language the skills are loaded for
+    """
+
+    def __init__(self, path, lang):
+        self.path = path
+        self.lang = lang
+        self.entries = {}
+        self.dirty = False
+        self._lock = Lock()
+        try:
+            if exists(path):
+                with open(path) as f:
+                    self.entries = json.load(f)
+        except (IOError, ValueError):
+            LOG.warning('Ignoring unreadable skill manifest ' + path)
+
+    def key(self, modified, skill_id):
+        """ Returns: string identifying a version of a skill """
+        return '{}:{}:{}'.format(modified, skill_id, self.lang)
+
+    def get(self, skill_folder, key):
+        """ Returns: manifest entry of the skill if up to date else None """
+        with self._lock:
+            entry = self.entries.get(skill_folder)
+        if entry and entry.get('key') == key:
+            return entry
+        return None
+
+    def record(self, skill_folder, key, instance, recorder, skill_path):
+        """
+            Store the registrations of a freshly loaded skill, or remove
+            its entry if it can't be loaded lazily.
+        """
+        recorder.recording = False
+        with self._lock:
+            if is_lazy_loadable(instance, recorder, skill_path):
+                self.entries[skill_folder] = {
+                    'key': key,
+                    'name': instance.name,
+                    'messages': recorder.messages
+                }
+                self.dirty = True
+            elif skill_folder in self.entries:
+                del self.entries[skill_folder]
+                self.dirty = True
+
+    def save(self):
+        """ Write the manifest if it has changed. """
+        with self._lock:
+            if not self.dirty:
+                return
+            try:
+                if not exists(dirname(self.path)):
+                    os.makedirs(dirname(self.path))
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(self.entries, f)
+                os.rename(tmp, self.path)
+                self.dirty = False
+            except (IOError, OSError) as e:
+                LOG.warning('Could not save skill manifest: ' + repr(e))
+
+
+class LazySkill(object):
+    """
+        Stand-in for a skill that hasn't been imported yet.
+
+        The registrations from the manifest are sent to the intent services
+        and the intents are handled by the LazySkill. When an intent is
+        triggered the skill is loaded and the message is passed on to the
+        skill's handler. The skill's intent handlers are kept local to avoid
+        messages being handled twice or lost while the skill is loading.
+
+        mycroft.stop isn't handled until the skill is loaded, there's
+        nothing to stop before one of its intents has been triggered. Once
+        loaded the skill registers its own stop handler.
+
+        Args:
+            skill_folder (str): name of the skill directory
+            skill_id (int):     id of the skill
+            entry (dict):       manifest entry of the skill
+            emitter:            messagebus emitter
+            load (callable):    function loading the skill using the emitter
+                                passed as argument, returns the skill
+    """
+
+    def __init__(self, skill_folder, skill_id, entry, emitter, load):
+        self.name = entry.get('name', skill_folder)
+        self.skill_folder = skill_folder
+        self.skill_id = skill_id
+        self.reload_skill = True
+        self.emitter = emitter
+        self.instance = None
+        self._messages = entry['messages']
+        self._load = load
+        self._lock = Lock()
+        self._recorder = None
+        self._intents = intent_names(self._messages)
+
+        for m in self._messages:
+            self.emitter.emit(Message(m['type'], m['data']))
+        for name in self._intents:
+            self.emitter.on(name, self.handle_intent)
+
+    def activate(self):
+        """ Import and initialize the skill if not already done. """
+        with self._lock:
+            if self.instance:
+                return self.instance
+            LOG.info('Activating ' + self.skill_folder)
+            self._recorder = ManifestRecorder(self.emitter, self._intents,
+                                              self._messages)
+            self.instance = self._load(self._recorder)
+            self._recorder.recording = False
+            return self.instance
+
+    def handle_intent(self, message):
+        self.activate()
+        handlers = self._recorder.local_handlers.get(message.type, [])
+        for handler in list(handlers):
+            handler(message)
+
+    def converse(self, utterances, lang='en-us'):
+        if self.instance:
+            return self.instance.converse(utterances, lang)
+        return False
+
+    def shutdown(self):
+        for name in self._intents:
+            self.emitter.remove(name, self.handle_intent)
+        with self._lock:
+            if self.instance:
+                self.instance.shutdown()
+                self.instance = None
+            else:
+                self.emitter.emit(Message('detach_skill', {
+                    'skill_id': str(self.skill_id) + ':'}))
@@ -0,0 +1,179 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Registry of the skills in the skills process.
+
+    The SkillRegistry maps skill folder names to the SkillManager's skill
+    entries (dicts with id, path, instance, ...) and keeps indexes to look
+    up skills by skill id and by the intents registered for them. Intent
+    names are prefixed with the skill id, "<skill_id>:<intent>".
+"""
+import gc
+import logging
+import sys
+import types
+from threading import Lock
+
+from mycroft.util.log import LOG
+
+
+def skill_id_from_intent(intent_name):
+    """
+        Get the skill id from an intent name prefixed with the skill id.
+
+        Returns: skill id (int) or None if the name has no valid prefix
+    """
+    prefix, sep, _ = intent_name.partition(':')
+    try:
+        return int(prefix) if sep else None
+    except ValueError:
+        return None
+
+
+# Objects shared between skills, not counted in a skill's memory
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, types.CodeType, types.ClassType,
+                 logging.Logger)
+
+
+def approximate_size(obj, exclude=None, max_objects=10000):
+    """
+        Approximate the memory held by an object by summing the sizes of
+        all objects reachable from it. Modules, classes, functions and the
+        excluded objects are not followed.
+
+        Args:
+            obj:                object to measure
+            exclude (list):     shared objects to skip, like the emitter
+            max_objects (int):  limit of objects to visit
+
+        Returns: size in bytes
+    """
+    seen = set(id(o) for o in exclude or [])
+    pending = [obj]
+    size = 0
+    while pending and len(seen) < max_objects:
+        o = pending.pop()
+        if id(o) in seen or isinstance(o, _SHARED_TYPES):
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o, 0)
+        pending.extend(gc.get_referents(o))
+    return size
+
+
+class SkillRegistry(dict):
+    """
+        Skill entries by folder name, with indexes by skill id and intent.
+
+        Entries must contain the skill "id" when added and it must not
+        change afterwards.
+    """
+    __instance = None
+    __lock = Lock()
+
+    def __init__(self):
+        super(SkillRegistry, self).__init__()
+        self._folders = {}  # skill id: folder
+        self._intents = {}  # skill id: set of intent names
+
+    @staticmethod
+    def instance():
+        """ Get the registry shared by the skills process. """
+        with SkillRegistry.__lock:
+            if SkillRegistry.__instance is None:
+                SkillRegistry.__instance = SkillRegistry()
+            return SkillRegistry.__instance
+
+    def __setitem__(self, folder, entry):
+        super(SkillRegistry, self).__setitem__(folder, entry)
+        self._folders[entry['id']] = folder
+
+    def __delitem__(self, folder):
+        entry = self[folder]
+        super(SkillRegistry, self).__delitem__(folder)
+        self._folders.pop(entry['id'], None)
+
+    def clear(self):
+        super(SkillRegistry, self).clear()
+        self._folders.clear()
+        self._intents.clear()
+
+    def folder_of(self, skill_id):
+        """ Returns: folder name of the skill with the id, None if unknown """
+        return self._folders.get(skill_id)
+
+    def by_id(self, skill_id):
+        """ Returns: entry of the skill with the id, None if unknown """
+        folder = self._folders.get(skill_id)
+        return self.get(folder) if folder is not None else None
+
+    def by_intent(self, intent_name):
+        """ Returns: entry of the skill owning the intent, None if unknown """
+        skill_id = skill_id_from_intent(intent_name)
+        return self.by_id(skill_id) if skill_id is not None else None
+
+    def add_intent(self, intent_name):
+        """ Index an intent registered by a skill. """
+        skill_id = skill_id_from_intent(intent_name)
+        if skill_id is not None:
+            self._intents.setdefault(skill_id, set()).add(intent_name)
+
+    def remove_intent(self, intent_name):
+        skill_id = skill_id_from_intent(intent_name)
+        self._intents.get(skill_id, set()).discard(intent_name)
+
+    def intents_of(self, skill_id):
+        """ Returns: set of intent names registered for the skill """
+        return self._intents.get(skill_id, set())
+
+    def remove_intents(self, skill_id):
+        """ Forget all intents of a skill, returns the removed names. """
+        return self._intents.pop(skill_id, set())
+
+    def describe(self, exclude=None):
+        """
+            Summarize all skills for reporting.
+
+            Args:
+                exclude (list): shared objects not counted in the memory
+                                footprint of the skills, like the emitter
+
+            Returns: dict with a description of each skill by folder
+        """
+        skills = {}
+        for folder, entry in self.items():
+            instance = entry.get('instance')
+            description = {
+                'id': entry['id'],
+                'name': getattr(instance, 'name', folder),
+                'loaded': bool(entry.get('loaded')),
+                'worker': bool(entry.get('worker')),
+                'load_time': entry.get('load_time'),
+                'intents': len(self.intents_of(entry['id'])),
+                'handlers': len(getattr(instance, 'events', None) or []),
+                'fallbacks': len(getattr(instance,
+                                         'instance_fallback_handlers', [])),
+                'memory': None
+            }
+            if instance is not None:
+                try:
+                    description['memory'] = approximate_size(instance,
+                                                             exclude)
+                except Exception as e:
+                    LOG.warning('Could not measure {}: {}'.format(folder,
+                                                                  repr(e)))
+            skills[folder] = description
+        return skills
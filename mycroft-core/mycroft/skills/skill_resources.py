@@ -0,0 +1,272 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Resource accounting of skills and detection of leaking skills.
+
+    For each skill the messagebus listeners, threads and timers (threading
+    timers and TimerService timers) started by the skill are attributed to
+    it, together with the CPU time spent in its handlers and the
+    approximate memory it holds. Skill instances that are still alive
+    after they were unloaded are reported as leaked, with the memory they
+    retain and the types of the objects referring to them.
+
+    The report is sent as 'skillmanager.resources.response' when
+    'skillmanager.resources' is emitted. Running this module prints it:
+
+        python -m mycroft.skills.skill_resources
+"""
+import gc
+import json
+import sys
+import threading
+import time
+import types
+import weakref
+
+from mycroft.skills.core import MainModule
+from mycroft.skills.skill_registry import approximate_size
+from mycroft.skills.timer_service import TimerService
+from mycroft.util.log import LOG
+
+
+def _callables(obj):
+    """ Yield the callable of a listener or thread and wrapped objects. """
+    if isinstance(obj, threading.Thread):
+        # Timers keep their function, other threads their target
+        target = getattr(obj, 'function', None) or \
+            getattr(obj, '_Thread__target', None)
+        if target:
+            yield target
+        for arg in getattr(obj, 'args', None) or \
+                getattr(obj, '_Thread__args', None) or []:
+            yield arg
+    else:
+        yield obj
+
+
+class SkillOwners(object):
+    """
+        Attributes objects to skill folders, by the skill instance, the
+        skill settings or the skill module they belong to.
+
+        Args:
+            registry:   SkillRegistry with the loaded skills
+    """
+
+    def __init__(self, registry):
+        self.objects = {}  # id of skill objects: folder
+        self.modules = {}  # skill module name: folder
+        for folder, entry in registry.items():
+            self.modules[folder + MainModule] = folder
+            instance = entry.get('instance')
+            for obj in (instance, getattr(instance, 'instance', None)):
+                if obj is None:
+                    continue
+                self.objects[id(obj)] = folder
+                settings = obj.__dict__.get('_settings')
+                if settings is not None:
+                    self.objects[id(settings)] = folder
+
+    def owner(self, obj):
+        """
+            Find the skill an object, function or thread belongs to.
+
+            Returns: tuple (folder, stale) or (None, False) if unknown.
+                     stale is True if the object belongs to an instance
+                     of the skill which isn't loaded anymore.
+        """
+        for f in _callables(obj):
+            candidates = [getattr(f, '__self__', None)]
+            candidates += [c.cell_contents for c in
+                           getattr(f, '__closure__', None) or []
+                           if _has_contents(c)]
+            for candidate in candidates:
+                if candidate is None:
+                    continue
+                if id(candidate) in self.objects:
+                    return self.objects[id(candidate)], False
+                module = getattr(type(candidate), '__module__', None)
+                if module in self.modules:
+                    return self.modules[module], True
+            module = getattr(f, '__module__', None)
+            if module in self.modules:
+                return self.modules[module], False
+        return None, False
+
+
+def _has_contents(cell):
+    try:
+        cell.cell_contents
+        return True
+    except ValueError:  # Empty cell
+        return False
+
+
+def emitter_listeners(emitter):
+    """ Returns: list of (event, listener) registered on a bus client """
+    events = getattr(getattr(emitter, 'emitter', None), '_events', {})
+    return [(event, f) for event, listeners in events.items()
+            for f in listeners]
+
+
+class LeakTracker(object):
+    """ Keeps weak references to unloaded skill instances. """
+
+    def __init__(self):
+        self._unloaded = []  # (folder, name, unload time, weakref)
+
+    def track(self, folder, instance):
+        """ Remember an instance that should be freed after unloading. """
+        try:
+            ref = weakref.ref(instance)
+        except TypeError:
+            return
+        self._unloaded.append((folder, getattr(instance, 'name', folder),
+                               time.time(), ref))
+
+    def leaks(self, exclude=None):
+        """
+            Collect garbage and report unloaded instances still alive.
+
+            Args:
+                exclude (list): shared objects not counted as retained
+
+            Returns: list of dicts describing the leaked instances
+        """
+        gc.collect()
+        self._unloaded = [u for u in self._unloaded if u[3]() is not None]
+        leaks = []
+        for folder, name, unloaded, ref in self._unloaded:
+            instance = ref()
+            if instance is None:
+                continue
+            referrers = [type(r).__name__ for r in gc.get_referrers(instance)
+                         if not isinstance(r, types.FrameType)]
+            leaks.append({
+                'folder': folder,
+                'name': name,
+                'unloaded': unloaded,
+                'memory': approximate_size(instance, exclude),
+                'referrers': sorted(referrers)
+            })
+            del instance
+        return leaks
+
+
+def account(registry, emitter, tracker, exclude=None):
+    """
+        Build the resource report of all skills.
+
+        Args:
+            registry:       SkillRegistry with the loaded skills
+            emitter:        messagebus client the skills are connected to
+            tracker:        LeakTracker with the unloaded skills
+            exclude (list): shared objects not counted in skill memory
+
+        Returns: dict with the resource usage by skill folder
+    """
+    owners = SkillOwners(registry)
+    skills = {}
+    for folder, entry in registry.items():
+        instance = entry.get('instance')
+        instance = getattr(instance, 'instance', instance)  # Lazy skills
+        skills[folder] = {
+            'listeners': 0,
+            'stale_listeners': 0,
+            'threads': [],
+            'timers': 0,
+            'handler_calls': getattr(instance, 'handler_calls', 0),
+            'handler_cpu_time': getattr(instance, 'handler_cpu_time', 0.0),
+            'memory': approximate_size(instance, exclude)
+            if instance is not None else None,
+            'leaked_instances': []
+        }
+
+    for _, listener in emitter_listeners(emitter):
+        folder, stale = owners.owner(listener)
+        if folder in skills:
+            key = 'stale_listeners' if stale else 'listeners'
+            skills[folder][key] += 1
+
+    for thread in threading.enumerate():
+        folder, _ = owners.owner(thread)
+        if folder in skills:
+            if isinstance(thread, threading._Timer):
+                skills[folder]['timers'] += 1
+            else:
+                skills[folder]['threads'].append(thread.name)
+
+    for timer in TimerService.instance().pending():
+        folder, _ = owners.owner(timer.callback)
+        if folder in skills:
+            skills[folder]['timers'] += 1
+
+    for leak in tracker.leaks(exclude):
+        skill = skills.setdefault(leak['folder'], {'leaked_instances': []})
+        skill['leaked_instances'].append(leak)
+    return skills
+
+
+def print_report(skills, out=sys.stdout):
+    out.write('{:30} {:>9} {:>6} {:>7} {:>6} {:>8} {:>10} {:>6}\n'.format(
+        'skill', 'listeners', 'stale', 'threads', 'timers', 'calls',
+        'cpu (s)', 'leaks'))
+    for folder in sorted(skills):
+        s = skills[folder]
+        out.write('{:30} {:>9} {:>6} {:>7} {:>6} {:>8} {:>10.3f} '
+                  '{:>6}\n'.format(folder[:30], s.get('listeners', 0),
+                                   s.get('stale_listeners', 0),
+                                   len(s.get('threads', [])),
+                                   s.get('timers', 0),
+                                   s.get('handler_calls', 0),
+                                   s.get('handler_cpu_time', 0.0),
+                                   len(s['leaked_instances'])))
+    for folder in sorted(skills):
+        for leak in skills[folder]['leaked_instances']:
+            out.write('\n{} ({}) unloaded {:.0f} s ago still holds about '
+                      '{} kB, referred to by: {}\n'.format(
+                          leak['name'], folder,
+                          time.time() - leak['unloaded'],
+                          leak['memory'] / 1024,
+                          ', '.join(leak['referrers'])))
+
+
+def main():
+    """ Request the resource report from the skills process and print it. """
+    from websocket import create_connection
+    from mycroft.configuration import Configuration
+    from mycroft.messagebus.client.ws import WebsocketClient
+    from mycroft.messagebus.message import Message
+
+    config = Configuration.get().get("websocket")
+    url = WebsocketClient.build_url(config.get("host"), config.get("port"),
+                                    config.get("route"), config.get("ssl"))
+    ws = create_connection(url)
+    ws.send(Message('skillmanager.resources').serialize())
+    ws.settimeout(10)
+    try:
+        while True:
+            message = json.loads(ws.recv())
+            if message.get('type') == 'skillmanager.resources.response':
+                print_report(message['data']['skills'])
+                break
+    except Exception as e:
+        LOG.error('No answer from the skills process: ' + repr(e))
+    finally:
+        ws.close()
+
+
+if __name__ == '__main__':
+    main()
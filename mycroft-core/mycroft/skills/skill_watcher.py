@@ -0,0 +1,217 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Detection of changed skills.
+
+    The SkillWatcher reports skill folders whose content has changed once
+    no further changes have been seen for a debounce period. inotify (through
+    pyinotify) is used when available, otherwise the skill folders are
+    polled for their last modification date.
+
+    Files the framework writes into the skill folders at runtime, the
+    settings, the settingsmeta hash and uuid and compiled python files, are
+    ignored, as are hidden files. Directory modification dates aren't taken
+    into account, so a removed file is only noticed by the inotify watcher.
+"""
+import time
+from abc import ABCMeta, abstractmethod
+
+import os
+from os.path import join, exists, isdir, relpath, dirname
+
+from mycroft.util.log import LOG
+
+
+# Files written by SkillSettings next to settings.json
+RUNTIME_FILES = ('hash', 'uuid')
+
+
+def is_relevant(rel_path):
+    """
+        Check if a path relative to the skills directory can affect a skill.
+        Compiled python files, hidden files/directories and the files written
+        by the skill settings are ignored.
+
+        Args:
+            rel_path (str): path relative to the skills directory
+
+        Returns: True if a change of the path should trigger a reload
+    """
+    parts = rel_path.split(os.sep)
+    if rel_path in ('', '.') or any(p.startswith('.') for p in parts):
+        return False
+    if parts[-1].endswith('.pyc'):
+        return False
+    if len(parts) == 2 and (parts[1] in RUNTIME_FILES or
+                            parts[1].startswith('settings.json')):
+        return False
+    return True
+
+
+def get_last_modified_date(path):
+    """
+        Get last modified date of the files of a skill that can affect it,
+        see is_relevant().
+
+        Arg:
+            path:   skill directory to check
+        Returns:    time of last change
+    """
+    last_date = 0
+    skills_dir = dirname(path.rstrip(os.sep))
+    for root, subdirs, files in os.walk(path):
+        # skip hidden directories
+        subdirs[:] = [s for s in subdirs if not s.startswith('.')]
+        for f in files:
+            if is_relevant(relpath(join(root, f), skills_dir)):
+                last_date = max(last_date, os.path.getmtime(join(root, f)))
+    return last_date
+
+
+class SkillWatcher(object):
+    """
+        Base class for skill change detection.
+
+        Args:
+            skills_dir (str):   directory containing the skill folders
+            debounce (float):   seconds without changes before a changed
+                                skill is reported
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, skills_dir, debounce=1.0):
+        self.skills_dir = skills_dir
+        self.debounce = debounce
+        self._pending = {}  # skill folder: time of latest change
+
+    def changed(self, rel_path):
+        """ Register a change of a path relative to the skills directory. """
+        if is_relevant(rel_path):
+            self._pending[rel_path.split(os.sep)[0]] = time.time()
+
+    def _ready(self):
+        """ Pop the skill folders that haven't changed for a while. """
+        now = time.time()
+        ready = [f for f, t in self._pending.items()
+                 if now - t >= self.debounce]
+        for folder in ready:
+            del self._pending[folder]
+        return ready
+
+    def _timeout(self, timeout):
+        """ Shorten timeout to the end of the earliest debounce period. """
+        if self._pending:
+            first = min(self._pending.values()) + self.debounce
+            timeout = min(timeout, max(first - time.time(), 0))
+        return timeout
+
+    @abstractmethod
+    def wait(self, timeout):
+        """
+            Wait for skill changes.
+
+            Args:
+                timeout (float): maximum number of seconds to wait
+
+            Returns: list of changed skill folders, may be empty
+        """
+        pass
+
+    def stop(self):
+        pass
+
+    @staticmethod
+    def create(skills_dir, debounce=1.0, poll_interval=2.0):
+        """
+            Create an inotify based watcher, falling back to polling if
+            inotify isn't available.
+        """
+        try:
+            return InotifySkillWatcher(skills_dir, debounce)
+        except Exception as e:
+            LOG.warning('Can\'t watch {} for changes ({}), falling back to '
+                        'polling'.format(skills_dir, repr(e)))
+            return PollingSkillWatcher(skills_dir, debounce, poll_interval)
+
+
+class PollingSkillWatcher(SkillWatcher):
+    """
+        Watcher checking the last modification date of all skill folders
+        every poll_interval seconds.
+    """
+
+    def __init__(self, skills_dir, debounce=1.0, poll_interval=2.0):
+        super(PollingSkillWatcher, self).__init__(skills_dir, debounce)
+        self.poll_interval = poll_interval
+        self._modified = {}
+        self._last_poll = 0
+        self._poll(report=False)
+
+    def _poll(self, report=True):
+        self._last_poll = time.time()
+        if not exists(self.skills_dir):
+            return
+        for folder in os.listdir(self.skills_dir):
+            path = join(self.skills_dir, folder)
+            if folder.startswith('.') or not isdir(path):
+                continue
+            try:
+                modified = get_last_modified_date(path)
+            except OSError:
+                continue  # Removed while polling
+            if modified != self._modified.get(folder):
+                if report:
+                    self.changed(folder)
+                self._modified[folder] = modified
+
+    def wait(self, timeout):
+        next_poll = self._last_poll + self.poll_interval - time.time()
+        delay = self._timeout(min(timeout, max(next_poll, 0)))
+        time.sleep(delay)
+        if time.time() >= self._last_poll + self.poll_interval:
+            self._poll()
+        return self._ready()
+
+
+class InotifySkillWatcher(SkillWatcher):
+    """ Watcher reacting on inotify events in the skills directory. """
+
+    def __init__(self, skills_dir, debounce=1.0):
+        super(InotifySkillWatcher, self).__init__(skills_dir, debounce)
+        import pyinotify
+        if not isdir(skills_dir):
+            raise OSError('{} does not exist'.format(skills_dir))
+        mask = (pyinotify.IN_CLOSE_WRITE | pyinotify.IN_CREATE |
+                pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM |
+                pyinotify.IN_MOVED_TO)
+        self._wm = pyinotify.WatchManager()
+        self._notifier = pyinotify.Notifier(self._wm, self._handle_event)
+        watches = self._wm.add_watch(skills_dir, mask, rec=True,
+                                     auto_add=True, quiet=False)
+        if watches.get(skills_dir, -1) < 0:
+            raise OSError('Failed to watch ' + skills_dir)
+
+    def _handle_event(self, event):
+        self.changed(relpath(event.pathname, self.skills_dir))
+
+    def wait(self, timeout):
+        timeout = self._timeout(timeout)
+        if self._notifier.check_events(int(timeout * 1000)):
+            self._notifier.read_events()
+            self._notifier.process_events()
+        return self._ready()
+
+    def stop(self):
+        self._notifier.stop()
@@ -0,0 +1,222 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Hosting of skills in worker processes.
+
+    The SkillSupervisor distributes skills over a number of SkillContainer
+    processes, each connected to the messagebus on its own. Pinned skills
+    get a worker process of their own so a CPU-heavy or leaking skill can't
+    slow down or take down the others. Workers that exit are restarted.
+
+    Fallback handlers are called from within the process handling intent
+    failures, so fallback skills can't be hosted in a worker. A worker
+    loading a fallback skill shuts it down again and reports it with a
+    FALLBACK_REPORT message, the skill manager then loads it itself.
+"""
+import signal
+import subprocess
+import sys
+import time
+
+import psutil
+
+from mycroft import MYCROFT_ROOT_PATH
+from mycroft.messagebus.message import Message
+from mycroft.util.log import LOG
+
+# Sent by a worker for each fallback skill it found, data: skill_path
+FALLBACK_REPORT = 'skillmanager.worker.fallback'
+
+
+class SkillWorker(object):
+    """
+        A SkillContainer process hosting a set of skills.
+
+        Args:
+            name (str):     name used in logs and reports
+            pinned (bool):  True if the worker is dedicated to one skill
+    """
+    command = [sys.executable, '-m', 'mycroft.skills.container', '--worker']
+
+    def __init__(self, name, pinned=False):
+        self.name = name
+        self.pinned = pinned
+        self.skills = {}  # skill folder: skill path
+        self.process = None
+        self.restarts = 0
+        self.started = 0
+        self._ps = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.command + sorted(self.skills.values()),
+            cwd=MYCROFT_ROOT_PATH)
+        self.started = time.time()
+        self._ps = None
+        LOG.info('Started {} (pid {}) with {}'.format(
+            self.name, self.process.pid, ', '.join(sorted(self.skills))))
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self, timeout=5.0):
+        """
+            Interrupt the worker to shut down its skills, kill if hung.
+
+            Returns: False if the skills weren't shut down, the worker had
+                     exited by itself or had to be killed
+        """
+        if not self.is_alive():
+            crashed = self.process is not None
+            self.process = None
+            return not crashed
+        self.process.send_signal(signal.SIGINT)
+        end = time.time() + timeout
+        while self.process.poll() is None and time.time() < end:
+            time.sleep(0.1)
+        clean = self.process.poll() is not None
+        if not clean:
+            LOG.warning('Killing unresponsive ' + self.name)
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        return clean
+
+    def stats(self):
+        """ Returns: dict with pid, skills, cpu and memory usage """
+        stats = {
+            'name': self.name,
+            'pid': None,
+            'skills': sorted(self.skills),
+            'pinned': self.pinned,
+            'restarts': self.restarts,
+            'cpu_percent': None,
+            'rss': None
+        }
+        if self.is_alive():
+            stats['pid'] = self.process.pid
+            try:
+                if not self._ps:
+                    self._ps = psutil.Process(self.process.pid)
+                # CPU usage since the previous call
+                stats['cpu_percent'] = self._ps.cpu_percent(interval=None)
+                stats['rss'] = self._ps.memory_info().rss
+            except psutil.Error:
+                self._ps = None
+        return stats
+
+
+class SkillSupervisor(object):
+    """
+        Distributes skills over worker processes and keeps them running.
+
+        Args:
+            num_workers (int):      number of workers for unpinned skills
+            pinned_skills (list):   skill folders getting their own worker
+            restart_delay (float):  minimum seconds between starting a
+                                    worker and restarting it after a crash
+            emitter:                messagebus emitter, used to detach the
+                                    intents of skills that didn't shut down
+    """
+
+    def __init__(self, num_workers, pinned_skills=None, restart_delay=5.0,
+                 emitter=None):
+        self.workers = [SkillWorker('skill-worker-{}'.format(i))
+                        for i in range(num_workers)]
+        self.pinned_skills = pinned_skills or []
+        self.restart_delay = restart_delay
+        self.emitter = emitter
+
+    def worker_of(self, skill_folder):
+        """ Returns: the worker hosting the skill or None """
+        for worker in self.workers:
+            if skill_folder in worker.skills:
+                return worker
+        return None
+
+    def _assign(self, skill_folder):
+        """ Pick a worker for a skill not hosted yet. """
+        if skill_folder in self.pinned_skills:
+            worker = SkillWorker('skill-worker-' + skill_folder, pinned=True)
+            self.workers.append(worker)
+            return worker
+        shared = [w for w in self.workers if not w.pinned]
+        return min(shared, key=lambda w: len(w.skills))
+
+    def load(self, skills):
+        """
+            Host new skills and reload changed ones, restarting each
+            affected worker once.
+
+            Args:
+                skills (dict): skill folder: skill path
+        """
+        affected = []
+        for skill_folder, path in skills.items():
+            worker = self.worker_of(skill_folder) or self._assign(skill_folder)
+            worker.skills[skill_folder] = path
+            if worker not in affected:
+                affected.append(worker)
+        for worker in affected:
+            self._stop_worker(worker)
+            if worker.skills:
+                worker.start()
+
+    def release(self, skill_folder):
+        """
+            Stop hosting a skill the worker has already shut down, e.g. a
+            fallback skill. The worker isn't restarted.
+
+            Returns: True if the skill was hosted
+        """
+        worker = self.worker_of(skill_folder)
+        if worker:
+            del worker.skills[skill_folder]
+        return worker is not None
+
+    def _detach(self, worker):
+        """ Remove the intents of the skills of a dead worker. """
+        if not self.emitter:
+            return
+        for path in worker.skills.values():
+            # Skill ids are the hash of the skill path, as in the container
+            self.emitter.emit(Message('detach_skill',
+                                      {'skill_id': str(hash(path)) + ':'}))
+
+    def _stop_worker(self, worker):
+        if not worker.stop():
+            self._detach(worker)
+
+    def check(self):
+        """ Restart workers that have exited. """
+        for worker in self.workers:
+            if not worker.skills or worker.is_alive():
+                continue
+            if time.time() - worker.started < self.restart_delay:
+                continue
+            code = worker.process.returncode if worker.process else None
+            LOG.error('{} exited with code {}, restarting'.format(
+                worker.name, code))
+            self._stop_worker(worker)
+            worker.restarts += 1
+            worker.start()
+
+    def stats(self):
+        """ Returns: list with stats of each worker """
+        return [w.stats() for w in self.workers if w.skills]
+
+    def stop(self):
+        for worker in self.workers:
+            self._stop_worker(worker)
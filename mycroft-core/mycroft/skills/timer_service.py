@@ -0,0 +1,198 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Timers of the skills process.
+
+    Instead of a threading.Timer thread per timer, all timers of the
+    process are kept in a heap served by a single thread, which sleeps
+    until the first timer is due or the timers change. Callbacks are run
+    on that thread and should return quickly, long running work belongs
+    in a thread of its own.
+
+    Example:
+        from mycroft.skills.timer_service import TimerService
+
+        timer = TimerService.instance().schedule(60, poll, repeat=60)
+        timer.reschedule(10)
+        timer.cancel()
+"""
+import time
+from heapq import heappush, heappop, heapify
+from itertools import count
+from threading import Thread, Lock
+
+from mycroft.util.condition import BlockingCondition
+from mycroft.util.log import LOG
+
+
+class TimerHandle(object):
+    """
+        A timer registered with the TimerService.
+
+        Attributes:
+            callback:       function called when the timer is due
+            args (list):    arguments of the callback
+            repeat (float): seconds between calls, None to call once
+            when (float):   time of the next call, None when not pending
+    """
+
+    def __init__(self, service, callback, args, repeat):
+        self.service = service
+        self.callback = callback
+        self.args = args or []
+        self.repeat = repeat
+        self.when = None
+        self.seq = None  # Sequence number of the current heap item
+
+    def cancel(self):
+        """ Stop the timer, a running callback is not interrupted. """
+        self.service.cancel(self)
+
+    def reschedule(self, delay):
+        """ Move the next call to delay seconds from now. """
+        self.service.reschedule(self, delay)
+
+    def is_pending(self):
+        return self.when is not None
+
+
+class TimerService(Thread):
+    """
+        Calls registered callbacks when their timer is due.
+
+        The thread is started with the first timer.
+    """
+    __instance = None
+    __lock = Lock()
+
+    def __init__(self):
+        super(TimerService, self).__init__(name='TimerService')
+        self.daemon = True
+        self._heap = []  # (time, sequence number, handle)
+        self._counter = count()
+        self._stale = 0  # Heap items of cancelled or rescheduled timers
+        self._cond = BlockingCondition()
+        self._running = True
+
+    @staticmethod
+    def instance():
+        """ Get the timer service shared by the process. """
+        with TimerService.__lock:
+            if TimerService.__instance is None:
+                TimerService.__instance = TimerService()
+            return TimerService.__instance
+
+    def schedule(self, delay, callback, args=None, repeat=None):
+        """
+            Register a callback to be called after a delay.
+
+            Args:
+                delay (float):  seconds until the first call
+                callback:       function to call
+                args (list):    arguments for the callback
+                repeat (float): seconds between further calls, None to
+                                call the callback once
+
+            Returns: TimerHandle to cancel or reschedule the timer
+        """
+        handle = TimerHandle(self, callback, args, repeat)
+        self.reschedule(handle, delay)
+        return handle
+
+    def reschedule(self, handle, delay):
+        with self._cond:
+            self._push(handle, time.time() + delay)
+            if not self.is_alive() and self._running:
+                self.start()
+            self._cond.notify()
+
+    def cancel(self, handle):
+        with self._cond:
+            # The heap item is dropped when popped or compacted
+            pending = handle.seq is not None
+            handle.when = None
+            handle.seq = None
+            if pending:
+                self._stale += 1
+                self._compact()
+
+    def _push(self, handle, when):
+        if handle.seq is not None:
+            self._stale += 1  # Replaces the pending item
+        handle.when = when
+        handle.seq = next(self._counter)
+        heappush(self._heap, (when, handle.seq, handle))
+        self._compact()
+
+    def _compact(self):
+        """ Drop stale heap items if they make up half of the heap. """
+        if self._stale > len(self._heap) / 2:
+            self._heap = [i for i in self._heap if i[2].seq == i[1]]
+            heapify(self._heap)
+            self._stale = 0
+
+    def pending(self):
+        """ Returns: list of the pending timers """
+        with self._cond:
+            return [h for _, seq, h in self._heap if h.seq == seq]
+
+    def _pop_due(self):
+        """ Returns: the first due timer or None, the caller holds the lock """
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            when, seq, handle = heappop(self._heap)
+            if handle.seq != seq:
+                self._stale -= 1
+                continue  # Cancelled or rescheduled
+            handle.seq = None
+            if handle.repeat:
+                # Skip calls missed while the callbacks were busy
+                when += handle.repeat
+                while when <= now:
+                    when += handle.repeat
+                self._push(handle, when)
+            else:
+                handle.when = None
+            return handle
+        return None
+
+    def run(self):
+        while True:
+            with self._cond:
+                handle = self._pop_due()
+                while handle is None and self._running:
+                    if self._heap:
+                        self._cond.wait(self._heap[0][0] - time.time())
+                    else:
+                        self._cond.wait()
+                    handle = self._pop_due()
+                if not self._running:
+                    break
+            try:
+                handle.callback(*handle.args)
+            except Exception:
+                LOG.exception('Timer callback {} failed'.format(
+                    getattr(handle.callback, '__name__', handle.callback)))
+
+    def shutdown(self):
+        """ Stop the thread, pending timers are dropped. """
+        with self._cond:
+            self._running = False
+            self._heap = []
+            self._stale = 0
+            self._cond.notify()
+        if self.is_alive():
+            self.join()
+        self._cond.close()
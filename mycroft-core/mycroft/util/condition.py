@@ -0,0 +1,100 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Condition variable for a single waiting thread with a timed wait that
+    really sleeps.
+
+    threading.Condition.wait(timeout) on python 2 polls the lock, sleeping
+    at most 50 ms at a time, so a thread waiting for an hour wakes up about
+    20 times a second. BlockingCondition waits in select() on a pipe
+    instead, notify() writes to the pipe.
+"""
+import errno
+import fcntl
+import os
+import select
+from threading import Lock
+
+
+class BlockingCondition(object):
+    """
+        Lock with wait() and notify() for one waiting thread. Used as a
+        context manager like threading.Condition, the lock isn't reentrant.
+        Waits may end early, callers check their condition in a loop.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._read, self._write = os.pipe()
+        for fd in (self._read, self._write):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+            fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.FD_CLOEXEC)
+        self._closed = False
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._lock.release()
+
+    def wait(self, timeout=None):
+        """
+            Release the lock until notified or timeout seconds have passed,
+            the caller holds the lock.
+
+            Args:
+                timeout (float): seconds to wait at most, None to wait
+                                 until notified
+        """
+        if timeout is not None:
+            timeout = max(timeout, 0)
+        self._lock.release()
+        try:
+            # A notify() after releasing the lock is already in the pipe
+            select.select([self._read], [], [], timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+        finally:
+            self._lock.acquire()
+        self._drain()
+
+    def _drain(self):
+        try:
+            while os.read(self._read, 4096):
+                pass
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def notify(self):
+        """ Wake up the waiting thread, the caller holds the lock. """
+        if self._closed:
+            return
+        try:
+            os.write(self._write, b'.')
+        except OSError as e:
+            if e.errno != errno.EAGAIN:  # Pipe full, already notified
+                raise
+
+    def close(self):
+        """ Release the pipe, notify() does nothing from now on. """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                os.close(self._read)
+                os.close(self._write)
@@ -0,0 +1,118 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Benchmark of the audio buffering of the listener.
+
+    Compares appending chunks to strings, as the recognizer used to do,
+    with the RingBuffer: recording a phrase of the longest length, keeping
+    the rolling wake word window and reading chunks delivered by the
+    stream in parts. Reported are the CPU time and the bytes of new
+    strings per second of audio, apart from those returned by the stream.
+
+    Usage:
+        python -m test.integrationtests.client.capture_benchmark [seconds]
+"""
+import sys
+import time
+
+from mycroft.client.speech.ring_buffer import RingBuffer
+
+RATE = 16000
+WIDTH = 2
+CHUNK = 1024
+CHUNK_BYTES = CHUNK * WIDTH
+PARTS = 4  # Parts the stream delivers a chunk in
+WINDOW_SEC = 10  # Wake word window when saving wake words
+
+
+def chunks(seconds):
+    part = b'\x01\x02' * (CHUNK // PARTS)
+    return [[part] * PARTS for _ in range(int(seconds * RATE / CHUNK))]
+
+
+def strings_phrase(parts):
+    allocated = 0
+    byte_data = '\0' * WIDTH
+    for chunk_parts in parts:
+        chunk = b''.join(list(chunk_parts))
+        byte_data += chunk
+        allocated += len(chunk) + len(byte_data)
+    return allocated
+
+
+def strings_window(parts):
+    allocated = 0
+    max_size = WINDOW_SEC * RATE * WIDTH
+    byte_data = '\0' * WIDTH
+    for chunk_parts in parts:
+        chunk = b''.join(list(chunk_parts))
+        allocated += len(chunk)
+        if len(byte_data) < max_size:
+            byte_data += chunk
+            allocated += len(byte_data)
+        else:
+            byte_data = byte_data[len(chunk):] + chunk
+            allocated += 2 * len(byte_data)
+    return allocated
+
+
+def ring_fill(ring, parts):
+    for chunk_parts in parts:
+        slot = ring.next_slot()
+        offset = 0
+        for part in chunk_parts:
+            slot[offset:offset + len(part)] = part
+            offset += len(part)
+        ring.commit()
+
+
+def ring_phrase(parts):
+    ring = RingBuffer(CHUNK_BYTES, len(parts) + 1)
+    start = ring.position
+    ring_fill(ring, parts)
+    return len(ring.get(start))
+
+
+def ring_window(parts):
+    ring = RingBuffer(CHUNK_BYTES, WINDOW_SEC * RATE // CHUNK)
+    ring_fill(ring, parts)
+    return 0
+
+
+def measure(method, parts):
+    start = time.clock()
+    allocated = method(parts)
+    return time.clock() - start, allocated
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    seconds = float(args[0]) if args else 10.0
+    phrase = chunks(10.0)  # RECORDING_TIMEOUT
+    window = chunks(seconds * 3)
+    for name, method, parts in [
+            ('phrase, strings', strings_phrase, phrase),
+            ('phrase, ring', ring_phrase, phrase),
+            ('wake word window, strings', strings_window, window),
+            ('wake word window, ring', ring_window, window)]:
+        audio_sec = len(parts) * float(CHUNK) / RATE
+        cpu, allocated = measure(method, parts)
+        print '{}: {:.3f} ms cpu, {:.0f} kB allocated per second of ' \
+              'audio'.format(name, cpu / audio_sec * 1000,
+                             allocated / audio_sec / 1024)
+
+
+if __name__ == '__main__':
+    main()
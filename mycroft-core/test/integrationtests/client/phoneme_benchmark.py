@@ -0,0 +1,115 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Benchmark of the phoneme lookup for the hot word catalog.
+
+    Uses a generated dictionary the size of the pocketsphinx en-us one,
+    or the dictionary given. Compares reading the whole dictionary for a
+    lookup with the PhonemeDict when it builds its index, when it loads
+    the stored index and when the words were looked up before, and
+    measures adding a topic to a catalog of thousands of hot words.
+
+    Usage:
+        python -m test.integrationtests.client.phoneme_benchmark [dict]
+"""
+import random
+import shutil
+import sys
+import tempfile
+import time
+from os.path import join
+
+from mycroft.client.speech.hotword_catalog import HotWordCatalog
+from mycroft.client.speech.phoneme_dict import PhonemeDict
+
+WORDS = 135000
+PHONEMES = ['AA', 'AE', 'AH', 'AO', 'EH', 'ER', 'IH', 'IY', 'UW', 'B', 'D',
+            'F', 'K', 'L', 'M', 'N', 'P', 'R', 'S', 'T', 'V', 'Z']
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+TOPICS = 5000
+
+
+def create_dict(path):
+    random.seed(0)
+    words = set()
+    while len(words) < WORDS:
+        words.add(''.join(random.choice(LETTERS)
+                          for _ in range(random.randint(3, 10))))
+    with open(path, 'w') as f:
+        for word in sorted(words):
+            f.write(word + ' ' + ' '.join(random.choice(PHONEMES)
+                                          for _ in word) + '\n')
+    return sorted(words)
+
+
+def read_dict(path, phrase):
+    """ Look up a phrase reading the whole dictionary. """
+    pronunciations = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            pronunciations.setdefault(parts[0], ' '.join(parts[1:]))
+    return ' . '.join(pronunciations[w] for w in phrase.split())
+
+
+def measure(method, *args):
+    start = time.time()
+    method(*args)
+    return (time.time() - start) * 1000
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    directory = tempfile.mkdtemp()
+    try:
+        if args:
+            dict_file = args[0]
+            with open(dict_file) as f:
+                words = [l.split()[0] for l in f if l.strip()]
+        else:
+            dict_file = join(directory, 'test.dict')
+            words = create_dict(dict_file)
+        words = [w for w in words if not w.endswith(')')]
+        cache_dir = join(directory, 'cache')
+        phrase = ' '.join(words[len(words) // 3::len(words) // 3][:2])
+
+        print 'read dictionary: {:.1f} ms'.format(
+            measure(read_dict, dict_file, phrase))
+        print 'build index: {:.1f} ms'.format(
+            measure(PhonemeDict(dict_file, cache_dir).phonemes, phrase))
+        phoneme_dict = PhonemeDict(dict_file, cache_dir)
+        print 'stored index: {:.2f} ms'.format(
+            measure(phoneme_dict.phonemes, phrase))
+        phoneme_dict.store()
+        phoneme_dict = PhonemeDict(dict_file, cache_dir)
+        print 'looked up before: {:.3f} ms'.format(
+            measure(phoneme_dict.phonemes, phrase))
+
+        catalog_file = join(directory, 'hotwords.txt')
+        with open(catalog_file, 'w') as f:
+            for i in range(TOPICS):
+                f.write(words[i * 7] + ' ' + words[i * 11] + '\n')
+        catalog = HotWordCatalog(catalog_file, phoneme_dict)
+        print 'read catalog of {} topics: {:.1f} ms'.format(
+            TOPICS, measure(catalog.read))
+        with open(catalog_file, 'a') as f:
+            f.write(phrase + '\n')
+        print 'add a topic: {:.2f} ms'.format(measure(catalog.read))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Microbenchmark of the overhead MycroftSkill.add_event adds to each
+    handler call.
+
+    Every handler is registered on an emitter doing nothing and called
+    directly through the registered wrapper. The time of a direct call of
+    the handler is subtracted to get the dispatch overhead.
+
+    Usage:
+        python -m test.integrationtests.skills.dispatch_benchmark [calls]
+"""
+import sys
+import timeit
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import MycroftSkill
+
+
+class NullEmitter(object):
+    """ Emitter keeping the registered handlers, emitting nothing. """
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, f):
+        self.handlers[event] = f
+
+    def remove(self, event, f):
+        pass
+
+    def emit(self, message):
+        pass
+
+
+class BenchmarkSkill(MycroftSkill):
+    def handle_message(self, message):
+        pass
+
+    def handle_no_message(self):
+        pass
+
+
+def decorated_handler(self, message):
+    pass
+
+
+def measure(f, calls):
+    """ Returns: seconds per call of f """
+    message = Message('benchmark')
+    return timeit.timeit(lambda: f(message), number=calls) / calls
+
+
+def run(calls=100000):
+    """
+        Measure the dispatch overhead of the different handler types.
+
+        Returns: list of tuples (handler type, overhead in seconds per call)
+    """
+    emitter = NullEmitter()
+    skill = BenchmarkSkill()
+    skill.bind(emitter)
+    skill.add_event('message', skill.handle_message)
+    skill.add_event('no_message', skill.handle_no_message)
+    skill.add_event('decorated', decorated_handler, need_self=True)
+
+    direct = measure(skill.handle_message, calls)
+    return [(name, measure(emitter.handlers[name], calls) - direct)
+            for name in ('message', 'no_message', 'decorated')]
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    calls = int(args[0]) if args else 100000
+    for name, overhead in run(calls):
+        print '{:12} {:8.2f} us/call'.format(name, overhead * 1e6)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Offline intent benchmark and accuracy harness.
+
+    Loads a directory of skills without a messagebus, feeds a corpus of
+    utterances through the Adapt IntentService and the PadatiousService and
+    reports the matched intent, confidence and latency for each utterance
+    as well as the total throughput and accuracy.
+
+    The corpus is a json file containing a list of entries using the same
+    keys as the skill intent tests:
+
+        [
+            {"utterance": "what's the weather like", "intent_type": "Current"},
+            {"utterance": "tell me a joke"}
+        ]
+
+    intent_type is optional, entries without it are excluded from the
+    accuracy. It may be given as "IntentName" or "SkillName:IntentName".
+
+    Usage:
+        python -m test.integrationtests.skills.intent_benchmark \\
+            /opt/mycroft/skills corpus.json --min-accuracy 0.9
+
+    The exit code is non-zero if one of the --min-accuracy or
+    --max-latency gates fails.
+"""
+import argparse
+import json
+import sys
+import time
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.intent_service import IntentService
+from mycroft.skills.padatious_service import PadatiousService
+from test.integrationtests.skills.skill_tester import \
+    RegistrationOnlyEmitter, load_skills, unload_skills
+
+
+class BenchmarkEmitter(RegistrationOnlyEmitter):
+    """ Registration only emitter remembering all emitted messages. """
+
+    def __init__(self):
+        super(BenchmarkEmitter, self).__init__(allow_events_to_execute=False)
+        self.emitted = []
+
+    def emit(self, event, *args, **kwargs):
+        self.emitted.append(event)
+        super(BenchmarkEmitter, self).emit(event, *args, **kwargs)
+
+
+class BenchmarkPadatiousService(PadatiousService):
+    """ PadatiousService training once, after all skills are loaded. """
+
+    def wait_and_train(self):
+        pass
+
+    def train(self):
+        self.container.train()
+        self.finished_training_event.set()
+
+
+class IntentBenchmark(object):
+    def __init__(self, skills_root, lang='en-us'):
+        self.lang = lang
+        self.emitter = BenchmarkEmitter()
+        self.intent_service = IntentService(self.emitter)
+        self.padatious = BenchmarkPadatiousService(self.emitter)
+        if not hasattr(self.padatious, 'container'):
+            self.padatious = None
+        self.skills = [s for s in load_skills(self.emitter, skills_root)
+                       if s]
+        self.skill_names = {str(s.skill_id): s.name for s in self.skills}
+        if self.padatious:
+            self.padatious.train()
+
+    def _intent_name(self, intent_type):
+        """ Replace the skill id prefix with the name of the skill. """
+        skill_id, _, name = intent_type.partition(':')
+        return self.skill_names.get(skill_id, skill_id) + ':' + name
+
+    def match(self, utterance):
+        """
+            Find the intent for an utterance.
+
+            Returns: tuple (engine, intent name, confidence)
+        """
+        # Don't let converse requests wait for answers that never come
+        self.intent_service.active_skills = []
+        self.emitter.emitted = []
+        self.intent_service.handle_utterance(Message(
+            'recognizer_loop:utterance',
+            {'utterances': [utterance], 'lang': self.lang}))
+        for message in self.emitter.emitted:
+            if message.type == 'intent_failure':
+                break
+            if 'intent_type' in message.data:
+                return ('adapt', self._intent_name(message.type),
+                        message.data.get('confidence', 0.0))
+
+        if self.padatious:
+            data = self.padatious.calc_intent(utterance)
+            if data.name and data.conf >= self.padatious.MIN_CONFIDENCE:
+                return ('padatious', self._intent_name(data.name), data.conf)
+        return (None, None, 0.0)
+
+    @staticmethod
+    def is_correct(expected, matched):
+        if not matched:
+            return False
+        if ':' not in expected:
+            matched = matched.split(':', 1)[1]
+        # Padatious intents are named after their .intent file
+        return matched.lower() in (expected.lower(),
+                                   expected.lower() + '.intent')
+
+    def run(self, corpus):
+        """
+            Run all entries in the corpus.
+
+            Args:
+                corpus (list): list of dicts with utterance and, optionally,
+                               the expected intent_type
+
+            Returns: list of result dicts, one per utterance
+        """
+        results = []
+        for entry in corpus:
+            utterance = entry['utterance']
+            expected = entry.get('intent_type')
+            start = time.time()
+            engine, intent, conf = self.match(utterance)
+            latency = time.time() - start
+            result = {
+                'utterance': utterance,
+                'expected': expected,
+                'intent': intent,
+                'engine': engine,
+                'confidence': conf,
+                'latency': latency
+            }
+            if expected:
+                result['correct'] = self.is_correct(expected, intent)
+            results.append(result)
+        return results
+
+    def shutdown(self):
+        unload_skills(self.skills)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(results):
+    """ Aggregate throughput, latency and accuracy of a benchmark run. """
+    latencies = [r['latency'] for r in results]
+    labeled = [r for r in results if 'correct' in r]
+    total = sum(latencies)
+    summary = {
+        'utterances': len(results),
+        'total_time': total,
+        'throughput': len(results) / total if total else 0.0,
+        'latency_mean': total / len(results) if results else 0.0,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_max': max(latencies) if latencies else 0.0,
+        'labeled': len(labeled),
+        'accuracy': None
+    }
+    if labeled:
+        correct = len([r for r in labeled if r['correct']])
+        summary['accuracy'] = float(correct) / len(labeled)
+    return summary
+
+
+def print_report(results, summary, out=sys.stdout):
+    for r in results:
+        status = ''
+        if 'correct' in r:
+            status = 'OK  ' if r['correct'] else 'FAIL'
+        out.write('{:4} {:8.2f} ms  {:4.2f}  {:10} {:40} {}\n'.format(
+            status, r['latency'] * 1000, r['confidence'], r['engine'] or '-',
+            r['intent'] or '-', r['utterance']))
+    out.write('\n')
+    out.write('Utterances: {}\n'.format(summary['utterances']))
+    out.write('Throughput: {:.1f} utterances/s\n'.format(
+        summary['throughput']))
+    out.write('Latency:    mean {:.2f} ms, p50 {:.2f} ms, p95 {:.2f} ms, '
+              'max {:.2f} ms\n'.format(summary['latency_mean'] * 1000,
+                                       summary['latency_p50'] * 1000,
+                                       summary['latency_p95'] * 1000,
+                                       summary['latency_max'] * 1000))
+    if summary['accuracy'] is not None:
+        out.write('Accuracy:   {:.1%} of {} labeled utterances\n'.format(
+            summary['accuracy'], summary['labeled']))
+
+
+def check_gates(summary, min_accuracy=None, max_latency=None):
+    """
+        Check the benchmark result against the requested limits.
+
+        Args:
+            min_accuracy (float): lowest accepted accuracy (0.0 - 1.0)
+            max_latency (float):  highest accepted p95 latency in ms
+
+        Returns: list of failure descriptions, empty if all gates passed
+    """
+    failures = []
+    accuracy = summary['accuracy']
+    if min_accuracy is not None and (accuracy or 0.0) < min_accuracy:
+        failures.append('accuracy {} below {}'.format(accuracy, min_accuracy))
+    p95 = summary['latency_p95'] * 1000
+    if max_latency is not None and p95 > max_latency:
+        failures.append('p95 latency {:.2f} ms above {} ms'.format(
+            p95, max_latency))
+    return failures
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Offline intent benchmark and accuracy harness')
+    parser.add_argument('skills', help='directory containing the skills')
+    parser.add_argument('corpus', help='json file with the utterances')
+    parser.add_argument('--lang', default='en-us')
+    parser.add_argument('--json', default=None,
+                        help='write the full report as json to this file')
+    parser.add_argument('--min-accuracy', type=float, default=None)
+    parser.add_argument('--max-latency', type=float, default=None,
+                        help='highest accepted p95 latency in ms')
+    params = parser.parse_args(args)
+
+    with open(params.corpus) as f:
+        corpus = json.load(f)
+
+    benchmark = IntentBenchmark(params.skills, params.lang)
+    try:
+        results = benchmark.run(corpus)
+    finally:
+        benchmark.shutdown()
+
+    summary = summarize(results)
+    print_report(results, summary)
+    if params.json:
+        with open(params.json, 'w') as f:
+            json.dump({'results': results, 'summary': summary}, f, indent=2)
+
+    failures = check_gates(summary, params.min_accuracy, params.max_latency)
+    for failure in failures:
+        print 'FAILED: ' + failure
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
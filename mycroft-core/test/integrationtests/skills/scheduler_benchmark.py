@@ -0,0 +1,127 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+    Benchmark of the EventScheduler with many scheduled events.
+
+    The events are spread evenly over a time span, a tenth of them
+    repeating, and half of the one-shot events are removed again before
+    they are due. Reported are the time needed to schedule the events,
+    the CPU time used by the process during a second before the first
+    event is due, the lateness of the emitted events and the CPU time
+    used while emitting them.
+
+    Usage:
+        python -m test.integrationtests.skills.scheduler_benchmark \
+            [events] [seconds]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from threading import Lock
+
+from mycroft.skills.event_scheduler import EventScheduler
+
+
+class TimingEmitter(object):
+    """ Emitter recording the time each event is emitted. """
+
+    def __init__(self):
+        self.emitted = []
+        self.lock = Lock()
+
+    def on(self, event, f):
+        pass
+
+    def remove_all_listeners(self, event):
+        pass
+
+    def emit(self, message):
+        with self.lock:
+            self.emitted.append((time.time(), message))
+
+
+def cpu_time():
+    t = os.times()
+    return t[0] + t[1]
+
+
+def run(events=10000, span=5.0):
+    """
+        Schedule the events over span seconds and wait for all of them.
+
+        Returns: dict with the measurements
+    """
+    tmp = tempfile.mkdtemp()
+    emitter = TimingEmitter()
+    scheduler = EventScheduler(emitter, os.path.join(tmp, 'schedule.json'))
+    try:
+        start = time.time() + 1.5
+        due = {}
+        stopwatch = time.time()
+        for i in range(events):
+            name = 'event{}'.format(i)
+            due[name] = start + span * i / events
+            repeat = span if i % 10 == 0 else None
+            scheduler.schedule_event(name, due[name], repeat)
+        schedule_time = time.time() - stopwatch
+        for i in range(1, events, 20):
+            scheduler.remove_event('event{}'.format(i))
+
+        idle_cpu = cpu_time()
+        time.sleep(1.0)
+        idle_cpu = cpu_time() - idle_cpu
+
+        cpu = cpu_time()
+        time.sleep(start + span + 0.2 - time.time())
+        cpu = cpu_time() - cpu
+    finally:
+        scheduler.shutdown()
+        shutil.rmtree(tmp)
+
+    with emitter.lock:
+        # First emission of each event
+        emitted = {}
+        for t, message in emitter.emitted:
+            emitted.setdefault(message.type, t)
+    lateness = sorted(t - due[name] for name, t in emitted.items())
+    return {
+        'scheduled': events,
+        'emitted': len(emitted),
+        'schedule_time': schedule_time,
+        'idle_cpu_time': idle_cpu,
+        'cpu_time': cpu,
+        'mean_lateness': sum(lateness) / len(lateness),
+        'max_lateness': lateness[-1]
+    }
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    events = int(args[0]) if args else 10000
+    span = float(args[1]) if len(args) > 1 else 5.0
+    result = run(events, span)
+    print 'scheduled {scheduled} events in {schedule_time:.3f} s'.format(
+        **result)
+    print 'emitted {emitted} events, lateness mean {0:.2f} ms, ' \
+          'max {1:.2f} ms'.format(result['mean_lateness'] * 1000,
+                                  result['max_lateness'] * 1000, **result)
+    print 'cpu time idle {idle_cpu_time:.3f} s, while emitting ' \
+          '{cpu_time:.3f} s'.format(**result)
+
+
+if __name__ == '__main__':
+    main()
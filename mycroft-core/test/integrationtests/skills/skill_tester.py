@@ -65,24 +65,34 @@ def unload_skills(skills):
 
 
 class RegistrationOnlyEmitter(object):
-    def __init__(self):
+    """ Emitter running skills and intent services without a messagebus.
+
+        Args:
+            allow_events_to_execute (bool): if False only the registration
+                                            events are connected, preventing
+                                            intent handlers from executing
+    """
+    REGISTRATION_EVENTS = [
+        'register_intent',
+        'register_vocab',
+        'padatious:register_intent',
+        'padatious:register_entity',
+        'recognizer_loop:utterance'
+    ]
+
+    def __init__(self, allow_events_to_execute=True):
         self.emitter = EventEmitter()
+        self.allow_events_to_execute = allow_events_to_execute
 
     def on(self, event, f):
-        allow_events_to_execute = True
-
-        if allow_events_to_execute:
+        if self.allow_events_to_execute:
             # don't filter events, just run them all
             print "Event: "+str(event)
             self.emitter.on(event, f)
         else:
             # filter to just the registration events,
             # preventing them from actually executing
-            if event in [
-                'register_intent',
-                'register_vocab',
-                'recognizer_loop:utterance'
-            ]:
+            if event in self.REGISTRATION_EVENTS:
                 print "Event: " + str(event)
                 self.emitter.on(event, f)
 
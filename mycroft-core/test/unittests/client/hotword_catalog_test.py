@@ -0,0 +1,155 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join
+
+import mock
+
+from mycroft.client.speech.hotword_catalog import HotWordCatalog
+from mycroft.client.speech.phoneme_dict import PhonemeDict, find_dict
+
+DICT = """mycroft M AY K R AO F T
+hey HH EY
+a AH
+software S AO F T W EH R
+a(2) EY
+learning L ER N IH NG
+machine M AH SH IY N
+"""
+
+
+class PhonemeDictTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.dict_file = join(self.dir, 'en-us.dict')
+        with open(self.dict_file, 'w') as f:
+            f.write(DICT)
+        self.cache_dir = join(self.dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_find_dict(self):
+        self.assertEqual(find_dict(self.dir), self.dict_file)
+        self.assertEqual(find_dict(self.cache_dir), None)
+
+    def test_lookup(self):
+        phoneme_dict = PhonemeDict(self.dict_file, self.cache_dir)
+        self.assertEqual(phoneme_dict.lookup('Hey'), 'HH EY')
+        self.assertEqual(phoneme_dict.lookup('a'), 'AH')
+        self.assertEqual(phoneme_dict.lookup('machine'), 'M AH SH IY N')
+        self.assertEqual(phoneme_dict.lookup('missing'), None)
+        self.assertEqual(phoneme_dict.phonemes('hey  mycroft'),
+                         'HH EY . M AY K R AO F T')
+        self.assertEqual(phoneme_dict.phonemes('hey missing'), None)
+
+    def test_cache(self):
+        phoneme_dict = PhonemeDict(self.dict_file, self.cache_dir)
+        phoneme_dict.lookup('software')
+        phoneme_dict.store()
+        phoneme_dict.close()
+
+        # Looked up words don't need the dictionary
+        phoneme_dict = PhonemeDict(self.dict_file, self.cache_dir)
+        with mock.patch.object(phoneme_dict, '_open') as _open:
+            self.assertEqual(phoneme_dict.lookup('software'),
+                             'S AO F T W EH R')
+            self.assertFalse(_open.called)
+        # Others use the stored index
+        with mock.patch.object(PhonemeDict, '_build_index') as build:
+            self.assertEqual(phoneme_dict.lookup('learning'),
+                             'L ER N IH NG')
+            self.assertFalse(build.called)
+
+    def test_changed_dict(self):
+        phoneme_dict = PhonemeDict(self.dict_file, self.cache_dir)
+        phoneme_dict.lookup('hey')
+        phoneme_dict.store()
+        with open(self.dict_file, 'w') as f:
+            f.write('hey HH EY EY\n')
+        phoneme_dict = PhonemeDict(self.dict_file, self.cache_dir)
+        self.assertEqual(phoneme_dict.lookup('hey'), 'HH EY EY')
+        self.assertEqual(phoneme_dict.lookup('software'), None)
+
+
+class HotWordCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = join(self.dir, 'hotwords.txt')
+        phoneme_dict = mock.Mock()
+        phoneme_dict.phonemes.side_effect = \
+            lambda p: None if 'missing' in p else p.upper()
+        self.catalog = HotWordCatalog(self.path, phoneme_dict, 1e-20)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, data, mode='a'):
+        with open(self.path, mode) as f:
+            f.write(data)
+
+    def test_read(self):
+        self.assertEqual(self.catalog.read(), ({}, []))
+        self.write('# Topics\nMachine  Learning\nsoftware\t1e-30\nmissing\n')
+        self.assertEqual(self.catalog.read(), ({
+            'machine learning': ('machine learning', 'MACHINE LEARNING',
+                                 1e-20),
+            'software': ('software', 'SOFTWARE', 1e-30)
+        }, []))
+        self.assertEqual(self.catalog.read(), ({}, []))
+
+    def test_append(self):
+        self.write('software\n')
+        self.catalog.read()
+        self.write('machine')
+        self.assertEqual(self.catalog.read(), ({}, []))
+        with mock.patch.object(self.catalog, 'parse',
+                               wraps=self.catalog.parse) as parse:
+            self.write(' learning\n')
+            added, removed = self.catalog.read()
+            # Only the new line is parsed
+            parse.assert_called_once_with('machine learning')
+        self.assertEqual(list(added), ['machine learning'])
+        self.assertEqual(sorted(self.catalog.keywords),
+                         ['machine learning', 'software'])
+
+    def test_rewrite(self):
+        self.write('software\nmachine\n')
+        self.catalog.read()
+        # Truncated and written again larger, same inode
+        self.write('hey mycroft\nmachine learning\n', 'w')
+        added, removed = self.catalog.read()
+        self.assertEqual(sorted(added), ['hey mycroft', 'machine learning'])
+        self.assertEqual(sorted(removed), ['machine', 'software'])
+        self.assertEqual(sorted(self.catalog.keywords),
+                         ['hey mycroft', 'machine learning'])
+        # Appending is still detected after the rewrite
+        with mock.patch.object(self.catalog, 'parse',
+                               wraps=self.catalog.parse) as parse:
+            self.write('software\n')
+            self.assertEqual(list(self.catalog.read()[0]), ['software'])
+            parse.assert_called_once_with('software')
+
+    def test_remove(self):
+        self.write('software\nmachine learning\n')
+        self.catalog.read()
+        os.remove(self.path)
+        self.write('software\n', 'w')
+        self.assertEqual(self.catalog.read(), ({}, ['machine learning']))
+        os.remove(self.path)
+        self.assertEqual(self.catalog.read(), ({}, ['software']))
@@ -0,0 +1,125 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import sys
+import tempfile
+import unittest
+from copy import deepcopy
+from os.path import exists
+
+import mock
+
+from mycroft.client.speech.listener import RecognizerLoop
+from mycroft.configuration import Configuration
+
+
+def hot_word(phrase, phonemes):
+    return {'hot_word': phrase, 'module': 'pocketsphinx',
+            'phonemes': phonemes, 'threshold': 1e-20}
+
+
+class RecognizerLoopReloadTest(unittest.TestCase):
+    def setUp(self):
+        config = deepcopy(Configuration.get())
+        config['hotwords'] = {
+            'hey mycroft': hot_word('hey mycroft', 'HH EY . M AY K R AO F T'),
+            'wake up': hot_word('wake up', 'W EY K . AH P'),
+            'software': hot_word('software', 'S AO F T W EH R')
+        }
+        config['listener'].update({'phonemes': None, 'threshold': None,
+                                   'sample_rate': 16000})
+        config['hotword_catalog'] = {'file': None}
+        self.config = config
+
+        self.decoder = mock.Mock(side_effect=lambda c: mock.MagicMock())
+        self.files = []
+        mkstemp = tempfile.mkstemp
+
+        def create_file():
+            fd, name = mkstemp()
+            self.files.append(name)
+            return fd, name
+
+        self.patches = [
+            mock.patch.dict(sys.modules, {
+                'pocketsphinx': mock.Mock(Decoder=self.decoder)}),
+            mock.patch.object(Configuration, 'get',
+                              side_effect=lambda *args: self.config),
+            mock.patch('mycroft.client.speech.listener.MutableMicrophone'),
+            mock.patch('tempfile.mkstemp', side_effect=create_file)
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.loop = RecognizerLoop()
+        self.loop.producer = mock.Mock()
+        self.loop.consumer = mock.Mock()
+        self.loop.start_async = mock.Mock()
+
+    def set_listener(self, **settings):
+        # A reloaded configuration is a new dict
+        self.config['listener'] = dict(self.config['listener'], **settings)
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def test_unchanged_engines(self):
+        loop = self.loop
+        decoders = self.decoder.call_count
+        spotter = loop.keyword_spotter
+        wake_word = loop.wakeword_recognizer
+        previous = loop.responsive_recognizer
+
+        self.config['hotwords']['software']['threshold'] = 1e-30
+        loop.reload()
+        # No decoder created, the keyword list is replaced
+        self.assertEqual(self.decoder.call_count, decoders)
+        self.assertIs(loop.keyword_spotter, spotter)
+        self.assertIs(loop.wakeword_recognizer, wake_word)
+        self.assertEqual(spotter.decoder.set_kws.call_count, 1)
+        self.assertEqual(spotter.keywords['software'][1], 1e-30)
+
+        # The audio stream is kept, the producer gets the new engines
+        self.assertFalse(loop.producer.stop.called)
+        self.assertFalse(loop.start_async.called)
+        self.assertTrue(previous._stop_signaled)
+        self.assertIs(loop.producer.recognizer, loop.responsive_recognizer)
+        self.assertIs(loop.consumer.wakeword_recognizer, wake_word)
+
+        # Nothing changed, nothing is passed to the decoder
+        loop.reload()
+        self.assertEqual(spotter.decoder.set_kws.call_count, 1)
+
+    def test_changed_engine(self):
+        loop = self.loop
+        decoders = self.decoder.call_count
+        wake_word = loop.wakeword_recognizer
+        self.set_listener(stand_up_word='software')
+        loop.reload()
+        self.assertEqual(self.decoder.call_count, decoders + 1)
+        self.assertEqual(loop.wakeup_recognizer.key_phrase, 'software')
+        self.assertIs(loop.wakeword_recognizer, wake_word)
+        self.assertEqual(len(loop._engines), 2)
+
+    def test_audio_settings(self):
+        self.set_listener(sample_rate=8000)
+        self.loop.reload()
+        self.assertTrue(self.loop.producer.stop.called)
+        self.assertTrue(self.loop.start_async.called)
+        # Engines for the new sample rate
+        self.assertEqual(self.loop.keyword_spotter.sample_rate, 8000)
+
+    def test_temp_files(self):
+        self.assertTrue(self.files)
+        self.assertFalse([f for f in self.files if exists(f)])
@@ -0,0 +1,126 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import audioop
+import unittest
+
+import mock
+from speech_recognition import AudioSource
+
+from mycroft.client.speech.mic import MutableStream, ResponsiveRecognizer
+from mycroft.client.speech.ring_buffer import RingBuffer
+
+LOUD = b'\x00\x40' * 1024
+QUIET = b'\x00\x00' * 1024
+
+
+class MockStream(object):
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, chunk_size):
+        return self.chunks.pop(0)
+
+
+class MockSource(AudioSource):
+    def __init__(self, stream):
+        self.stream = stream
+        self.CHUNK = 1024
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+
+
+class PyAudioStream(object):
+    """ Stream returning less audio per read than requested. """
+    def __init__(self, data):
+        self.data = data
+
+    def get_read_available(self):
+        return min(300, len(self.data) // 2)
+
+    def read(self, frames):
+        result, self.data = self.data[:frames * 2], self.data[frames * 2:]
+        return result
+
+    def get_input_latency(self):
+        return 0.01
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_wrap_around(self):
+        ring = RingBuffer(4, 3)
+        for chunk in [b'aaaa', b'bbbb', b'cccc', b'dddd']:
+            self.assertEqual(str(ring.append(chunk)), chunk)
+        self.assertEqual(ring.position, 16)
+        self.assertEqual(ring.oldest(), 4)
+        self.assertEqual(ring.get(0), b'bbbbccccdddd')
+        self.assertEqual(ring.tail(6), b'ccdddd')
+        # Ranges over the end of the storage are two views
+        self.assertEqual([str(v) for v in ring.views(8)],
+                         [b'cccc', b'dddd'])
+
+    def test_views_are_zero_copy(self):
+        ring = RingBuffer(4, 2)
+        chunk = ring.append(b'\x00\x10\x00\x10')
+        self.assertEqual(audioop.rms(chunk, 2), 4096)
+        ring.append(b'xxxx')
+        ring.append(b'yyyy')  # Overwrites the first chunk
+        self.assertEqual(str(chunk), b'yyyy')
+
+    def test_padding(self):
+        ring = RingBuffer(4, 2)
+        self.assertEqual(str(ring.append(b'ab')), b'ab\x00\x00')
+        self.assertEqual(str(ring.append(b'abcdef')), b'abcd')
+
+
+class MutableStreamTest(unittest.TestCase):
+    def test_read_into(self):
+        data = b''.join(chr(i % 256) for i in range(2048))
+        with mock.patch('pyaudio.get_sample_size', create=True,
+                        return_value=2):
+            stream = MutableStream(PyAudioStream(data), 8)
+        ring = RingBuffer(2048, 2)
+        stream.read_into(ring.next_slot())
+        self.assertEqual(str(ring.commit()), data)
+
+        stream.wrapped_stream = PyAudioStream(data)
+        stream.mute()
+        stream.read_into(ring.next_slot())
+        self.assertEqual(str(ring.commit()), b'\0' * 2048)
+
+
+class RecordPhraseTest(unittest.TestCase):
+    def setUp(self):
+        wake_word = mock.Mock()
+        wake_word.num_phonemes = 10
+        self.recognizer = ResponsiveRecognizer(wake_word)
+        self.recognizer.energy_threshold = 100
+
+    @mock.patch('mycroft.client.speech.mic.check_for_signal',
+                return_value=False)
+    def test_record_phrase(self, _):
+        chunks = [LOUD] * 20 + [QUIET] * 20
+        source = MockSource(MockStream(chunks))
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        phrase = self.recognizer._record_phrase(source, sec_per_buffer)
+        self.assertTrue(phrase.startswith(LOUD * 20 + QUIET))
+        self.assertEqual(len(phrase) % len(LOUD), 0)
+        self.assertTrue(QUIET * 20 not in phrase)
+
+        # The next phrase reuses the buffer
+        ring = self.recognizer.ring
+        source.stream = MockStream([QUIET] * 5 + [LOUD] * 20 + [QUIET] * 20)
+        phrase = self.recognizer._record_phrase(source, sec_per_buffer)
+        self.assertIs(self.recognizer.ring, ring)
+        self.assertTrue(phrase.startswith(QUIET * 5 + LOUD * 20))
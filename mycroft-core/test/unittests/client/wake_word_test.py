@@ -0,0 +1,304 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import mock
+from speech_recognition import AudioSource
+
+from mycroft.client.speech.hotword_factory import (
+    HotWordEngine,
+    PocketsphinxHotWord,
+    PocketsphinxKeywordSpotter
+)
+from mycroft.client.speech.mic import ResponsiveRecognizer
+
+CHUNK = b'\x00\x01' * 1024
+
+
+class MockDecoder(object):
+    """ Keyword spotting decoder hearing the key phrase after some audio. """
+
+    def __init__(self, config, detect_after=10):
+        self.detect_after = detect_after * len(CHUNK)
+        self.paths = {}  # Files of the config, removed once read
+        self.files = {}
+        for call in config.set_string.call_args_list:
+            name, value = call[0]
+            if name in ('-dict', '-kws'):
+                self.paths[name] = value
+                with open(value) as f:
+                    self.files[name] = f.read()
+        self.fed = []  # Chunks fed per utterance
+        self.in_utterance = False
+
+    @staticmethod
+    def default_config():
+        return mock.Mock()
+
+    def start_utt(self):
+        assert not self.in_utterance
+        self.in_utterance = True
+        self.fed.append([])
+
+    def process_raw(self, data, no_search, full_utt):
+        assert self.in_utterance
+        self.fed[-1].append(data)
+
+    def end_utt(self):
+        assert self.in_utterance
+        self.in_utterance = False
+
+    def hyp(self):
+        if sum(len(d) for d in self.fed[-1]) >= self.detect_after:
+            return mock.Mock(hypstr='hey mycroft')
+        return None
+
+
+class MockKeywordDecoder(MockDecoder):
+    """ Decoder spotting the key phrases set in heard. """
+
+    def __init__(self, config):
+        super(MockKeywordDecoder, self).__init__(config, 1)
+        self.config = config
+        self.heard = []
+        self.words = []
+        self.keyword_list = None
+
+    def add_word(self, word, phonemes, update):
+        self.words.append((word, phonemes, update))
+
+    def set_kws(self, name, keyword_list):
+        assert not self.in_utterance
+        with open(keyword_list) as f:
+            self.keyword_list = f.read()
+
+    def set_search(self, name):
+        pass
+
+    def hyp(self):
+        if self.heard:
+            return mock.Mock(hypstr=' '.join(self.heard))
+        return None
+
+    def seg(self):
+        return [mock.Mock(word=w) for w in self.heard]
+
+
+class MockStream(object):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.reads = 0
+
+    def read(self, chunk_size):
+        self.reads += 1
+        return self.chunks
+
+
+class MockSource(AudioSource):
+    def __init__(self):
+        self.stream = MockStream(CHUNK)
+        self.CHUNK = 1024
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+
+
+def create_engine():
+    pocketsphinx = mock.Mock(Decoder=MockDecoder)
+    with mock.patch.dict(sys.modules, {'pocketsphinx': pocketsphinx}):
+        return PocketsphinxHotWord('hey mycroft', {})
+
+
+class StrHotWord(HotWordEngine):
+    """ Engine detecting in frames that must be str, like snowboy. """
+
+    def found_wake_word(self, frame_data):
+        assert type(frame_data) is str
+        return frame_data == CHUNK
+
+
+class HotWordEngineTest(unittest.TestCase):
+    def test_update(self):
+        engine = StrHotWord('hey mycroft', {})
+        self.assertTrue(engine.update(bytearray(CHUNK)))
+        self.assertTrue(engine.update(buffer(CHUNK)))
+        self.assertFalse(engine.update(bytearray(len(CHUNK))))
+
+
+class PocketsphinxHotWordTest(unittest.TestCase):
+    def test_update(self):
+        engine = create_engine()
+        decoder = engine.decoder
+        for i in range(25):
+            heard = engine.update(buffer(CHUNK))
+            self.assertEqual(heard, i in (9, 19))
+        # One utterance per detection, every chunk decoded once
+        self.assertEqual([len(u) for u in decoder.fed], [10, 10, 5])
+        self.assertTrue(decoder.in_utterance)
+        engine.reset()
+        self.assertFalse(decoder.in_utterance)
+
+    def test_dict_removed(self):
+        decoder = create_engine().decoder
+        self.assertEqual(decoder.files['-dict'],
+                         'hey HH EY \nmycroft  M AY K R AO F T\n')
+        self.assertFalse(os.path.exists(decoder.paths['-dict']))
+
+    def test_transcribe_ends_stream(self):
+        engine = create_engine()
+        engine.update(CHUNK)
+        self.assertTrue(engine.found_wake_word(CHUNK * 10))
+        self.assertFalse(engine.decoder.in_utterance)
+
+
+def create_spotter(keywords):
+    pocketsphinx = mock.Mock(Decoder=MockKeywordDecoder)
+    with mock.patch.dict(sys.modules, {'pocketsphinx': pocketsphinx}):
+        spotter = PocketsphinxKeywordSpotter(keywords)
+    return spotter, spotter.decoder.files
+
+
+class PocketsphinxKeywordSpotterTest(unittest.TestCase):
+    def setUp(self):
+        self.spotter, self.files = create_spotter({
+            'hey mycroft': ('Hey  Mycroft', 'HH EY . M AY K R AO F T', 1e-40),
+            'mycroft': ('mycroft', 'M AY K R OW F T', None),
+            'software': ('software', 'S AO F T W EH R', 1e-20),
+            'broken': ('two words', 'T UW', 1e-20)
+        })
+
+    def test_keyword_list(self):
+        paths = self.spotter.decoder.paths.values()
+        self.assertFalse([p for p in paths if os.path.exists(p)])
+        self.assertEqual(self.files['-dict'],
+                         'hey HH EY\n'
+                         'mycroft M AY K R AO F T\n'
+                         'mycroft(2) M AY K R OW F T\n'
+                         'software S AO F T W EH R\n')
+        self.assertEqual(self.files['-kws'],
+                         'hey mycroft /1e-40/\n'
+                         'mycroft /1e-90/\n'
+                         'software /1e-20/\n')
+
+    def test_update(self):
+        decoder = self.spotter.decoder
+        self.assertEqual(self.spotter.update(CHUNK), [])
+        decoder.heard = ['software']
+        self.assertEqual(self.spotter.update(CHUNK), ['software'])
+        self.assertFalse(decoder.in_utterance)
+        decoder.heard = []
+        self.spotter.update(CHUNK)
+        self.assertEqual([len(u) for u in decoder.fed], [2, 1])
+
+    def test_add_remove(self):
+        spotter = self.spotter
+        decoder = spotter.decoder
+        spotter.update(CHUNK)
+        spotter.add({'machine learning': ('machine learning',
+                                          'M AH SH IY N . L ER N IH NG',
+                                          1e-30),
+                     'software 2': ('software', 'S AO F T W EH R', 1e-10)})
+        self.assertFalse(decoder.in_utterance)
+        self.assertEqual(decoder.words,
+                         [('machine', 'M AH SH IY N', False),
+                          ('learning', 'L ER N IH NG', True)])
+        self.assertEqual(decoder.keyword_list,
+                         'hey mycroft /1e-40/\n'
+                         'machine learning /1e-30/\n'
+                         'mycroft /1e-90/\n'
+                         'software /1e-20/\n')
+        decoder.heard = ['software']
+        self.assertEqual(spotter.update(CHUNK), ['software', 'software 2'])
+
+        spotter.remove(['software', 'machine learning'])
+        self.assertEqual(decoder.keyword_list,
+                         'hey mycroft /1e-40/\n'
+                         'mycroft /1e-90/\n'
+                         'software /1e-10/\n')
+        self.assertEqual(spotter.update(CHUNK), ['software 2'])
+
+
+class WaitUntilWakeWordTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)  # hotWordFile.txt is written here
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    @mock.patch('mycroft.client.speech.mic.check_for_signal',
+                return_value=False)
+    def test_chunks_fed_once(self, _):
+        engine = create_engine()
+        recognizer = ResponsiveRecognizer(
+            mock.Mock(num_phonemes=10),
+            {u'hey mycroft': [engine, 'ding.wav', None, True]})
+        recognizer.energy_threshold = 100
+        emitter = mock.Mock()
+        source = MockSource()
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+
+        recognizer._wait_until_wake_word(source, sec_per_buffer, emitter)
+        self.assertEqual(source.stream.reads, 10)
+        self.assertEqual([len(u) for u in engine.decoder.fed], [10])
+        emitter.emit.assert_called_once_with(
+            'recognizer_loop:hotword',
+            {'hotword': u'hey mycroft', 'start_listening': True,
+             'sound': 'ding.wav', 'engine': 'pocketsphinx'})
+        with open('hotWordFile.txt') as f:
+            self.assertEqual(f.read(), 'hey mycroft')
+
+        # The next wait starts a new utterance
+        recognizer._wait_until_wake_word(source, sec_per_buffer, emitter)
+        self.assertEqual(source.stream.reads, 20)
+        self.assertEqual([len(u) for u in engine.decoder.fed], [10, 10])
+
+    def test_hot_words_mapped(self):
+        spotter = create_spotter({
+            'hey mycroft': ('hey mycroft', 'HH EY . M AY K R AO F T', None),
+            'software': ('software', 'S AO F T W EH R', None)
+        })[0]
+        other = mock.Mock()
+        other.update.return_value = True
+        recognizer = ResponsiveRecognizer(
+            mock.Mock(num_phonemes=10),
+            {'hey mycroft': [spotter, 'ding.wav', None, True],
+             'software': [spotter, None, 'what is software', False],
+             'snowboy': [other, None, None, False]},
+            spotter)
+        emitter = mock.Mock()
+        spotter.decoder.heard = ['software']
+        self.assertFalse(recognizer.check_for_hotwords(CHUNK, emitter))
+        emitter.emit.assert_any_call(
+            'recognizer_loop:utterance', {'utterances': ['what is software']})
+        hotwords = [c[0][1]['hotword'] for c in emitter.emit.call_args_list
+                    if c[0][0] == 'recognizer_loop:hotword']
+        self.assertEqual(sorted(hotwords), ['snowboy', 'software'])
+        # The shared decoder is fed once
+        self.assertEqual([len(u) for u in spotter.decoder.fed], [1])
+
+        emitter.reset_mock()
+        spotter.decoder.heard = ['hey mycroft']
+        other.update.return_value = False
+        self.assertTrue(recognizer.check_for_hotwords(CHUNK, emitter))
+        emitter.emit.assert_called_once_with(
+            'recognizer_loop:hotword',
+            {'hotword': 'hey mycroft', 'start_listening': True,
+             'sound': 'ding.wav', 'engine': 'pocketsphinx'})
@@ -1,6 +1,34 @@
+import json
 import mock
+import os
+import shutil
+import tempfile
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from os.path import join
+from threading import Thread
 from unittest import TestCase
 import mycroft.configuration
+from mycroft.configuration.config import ConfigFileCache
+from mycroft.util.json_helper import load_commented_json
+
+
+class SettingsHandler(BaseHTTPRequestHandler):
+    """ Device settings and location, answered after a delay. """
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        if self.path.endswith('/setting'):
+            body = json.dumps(self.server.settings)
+        else:
+            body = json.dumps({'city': 'Stockholm'})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
 
 
 class TestConfiguration(TestCase):
@@ -64,6 +92,45 @@ class TestConfiguration(TestCase):
         lc = mycroft.configuration.LocalConf('test')
         self.assertEquals(lc, {})
 
+    def test_file_cache(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = join(tmp, 'mycroft.conf')
+            with open(path, 'w') as f:
+                f.write('{\n  // comment\n  "a": {"b": [1]}\n}')
+            snapshot = join(tmp, 'snapshot.json')
+            cache = ConfigFileCache(snapshot)
+            with mock.patch('mycroft.configuration.config.file_cache', cache),\
+                    mock.patch('mycroft.configuration.config.'
+                               'load_commented_json',
+                               wraps=load_commented_json) as loader:
+                conf = mycroft.configuration.LocalConf(path)
+                conf['a']['b'].append(2)  # Doesn't change the cache
+                self.assertEquals(mycroft.configuration.LocalConf(path),
+                                  {'a': {'b': [1]}})
+                self.assertEquals(loader.call_count, 1)
+                cache.store()
+                # No temporary file is left behind
+                self.assertEquals(sorted(os.listdir(tmp)),
+                                  ['mycroft.conf', 'snapshot.json'])
+
+                # Another process reads the snapshot
+                cache = ConfigFileCache(snapshot)
+                with mock.patch('mycroft.configuration.config.file_cache',
+                                cache):
+                    self.assertEquals(mycroft.configuration.LocalConf(path),
+                                      {'a': {'b': [1]}})
+                    self.assertEquals(loader.call_count, 1)
+
+                    # Changed files are parsed again
+                    with open(path, 'w') as f:
+                        f.write('{"a": {"b": [3, 4]}}')
+                    self.assertEquals(mycroft.configuration.LocalConf(path),
+                                      {'a': {'b': [3, 4]}})
+                    self.assertEquals(loader.call_count, 2)
+        finally:
+            shutil.rmtree(tmp)
+
     @mock.patch('mycroft.configuration.config.RemoteConf')
     @mock.patch('mycroft.configuration.config.LocalConf')
     def test_update(self, mock_remote, mock_local):
@@ -76,5 +143,106 @@ class TestConfiguration(TestCase):
         mycroft.configuration.Configuration.updated('message')
         self.assertEquals(c, {'a': 2})
 
+    def test_subscribe(self):
+        Configuration = mycroft.configuration.Configuration
+        Configuration.load_config_stack(
+            [{'tts': {'module': 'mimic'}, 'listener': {'rate': 16000}}], True)
+        version = Configuration.version()
+        tts = mock.Mock()
+        listener = mock.Mock()
+        Configuration.subscribe('tts', tts)
+        Configuration.subscribe(['listener.rate', 'lang'], listener)
+        try:
+            # Unrelated change
+            Configuration.load_config_stack(
+                [{'tts': {'module': 'mimic'}, 'listener': {'rate': 16000,
+                                                           'channels': 1}}],
+                True)
+            self.assertEquals(Configuration.version(), version + 1)
+            self.assertFalse(tts.called)
+            self.assertFalse(listener.called)
+
+            config = Configuration.load_config_stack(
+                [{'tts': {'module': 'espeak'}, 'lang': 'de-de',
+                  'listener': {'rate': 8000, 'channels': 1}}], True)
+            # Same configuration loaded again
+            Configuration.load_config_stack(
+                [{'tts': {'module': 'espeak'}, 'lang': 'de-de',
+                  'listener': {'rate': 8000, 'channels': 1}}], True)
+            self.assertEquals(Configuration.version(), version + 2)
+            tts.assert_called_once_with(config)
+            listener.assert_called_once_with(config)
+        finally:
+            Configuration.unsubscribe(tts)
+            Configuration.unsubscribe(listener)
+
+    def test_patch(self):
+        Configuration = mycroft.configuration.Configuration
+        callback = mock.Mock()
+        Configuration.subscribe('test_patch', callback)
+        message = mock.Mock()
+        message.data = {'config': {'test_patch': {'a': 1}}}
+        with mock.patch('mycroft.configuration.config.RemoteConf') as remote:
+            remote.return_value = {}
+            Configuration.patch(message)
+            self.assertEquals(Configuration.get()['test_patch'], {'a': 1})
+            self.assertEquals(callback.call_count, 1)
+            # Patching the same value doesn't notify again
+            Configuration.patch(message)
+            self.assertEquals(callback.call_count, 1)
+        Configuration.unsubscribe(callback)
+        Configuration._Configuration__patch.clear()
+
+    def test_remote_refresh(self):
+        Configuration = mycroft.configuration.Configuration
+        server = HTTPServer(('127.0.0.1', 0), SettingsHandler)
+        server.delay = 0.5
+        server.settings = {'testConfig': 'fetched'}
+        Thread(target=server.serve_forever).start()
+        tmp = tempfile.mkdtemp()
+        default = join(tmp, 'mycroft.conf')
+        with open(default, 'w') as f:
+            json.dump({'server': {'url': 'http://127.0.0.1:{}'.format(
+                server.server_port), 'version': 'v1'}}, f)
+        cache = join(tmp, 'web_config_cache.json')
+        with open(cache, 'w') as f:
+            json.dump({'test_config': 'cached'}, f)
+        ws = mock.Mock()
+        # Refresh of the configuration loaded by other tests
+        Configuration.wait_for_refresh()
+        try:
+            with mock.patch('mycroft.configuration.config.DEFAULT_CONFIG',
+                            default), \
+                    mock.patch('mycroft.configuration.config.'
+                               'WEB_CONFIG_CACHE', cache):
+                start = time.time()
+                config = Configuration.get()
+                Configuration.init(ws)
+                # Started from the cache without waiting for the backend
+                self.assertTrue(time.time() - start < 0.3)
+                self.assertEquals(config['test_config'], 'cached')
+
+                Configuration.wait_for_refresh()
+                self.assertEquals(config['test_config'], 'fetched')
+                self.assertEquals(config['location']['city'], 'Stockholm')
+                with open(cache) as f:
+                    self.assertEquals(json.load(f)['test_config'], 'fetched')
+                self.assertEquals(ws.emit.call_count, 1)
+                message = ws.emit.call_args[0][0]
+                self.assertEquals(message.type, 'configuration.updated')
+                self.assertEquals(message.data,
+                                  {'changed': ['location', 'test_config']})
+
+                # Unchanged settings aren't announced
+                server.delay = 0
+                Configuration.refresh_remote()
+                Configuration.wait_for_refresh()
+                self.assertEquals(ws.emit.call_count, 1)
+        finally:
+            Configuration._Configuration__ws = None
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(tmp)
+
     def tearDown(self):
         mycroft.configuration.Configuration.load_config_stack([{}], True)
@@ -25,7 +25,8 @@ from mycroft.configuration import Configuration
 from mycroft.messagebus.message import Message
 from mycroft.skills.core import load_regex_from_file, load_regex, \
     load_vocab_from_file, load_vocabulary, MycroftSkill, \
-    load_skill, create_skill_descriptor, open_intent_envelope
+    load_skill, create_skill_descriptor, open_intent_envelope, \
+    create_handler_caller
 
 
 class MockEmitter(object):
@@ -292,6 +293,28 @@ class MycroftSkillTest(unittest.TestCase):
 
         self.check_register_decorators(expected)
 
+    def test_create_handler_caller(self):
+        calls = []
+
+        class Handlers(object):
+            def with_message(self, message):
+                calls.append(message)
+
+            def without_message(self):
+                calls.append(None)
+
+        def decorated(self, message):
+            calls.append((self, message))
+
+        s = TestSkill1()
+        handlers = Handlers()
+        create_handler_caller(handlers.with_message)('m')
+        create_handler_caller(handlers.without_message)('m')
+        create_handler_caller(decorated, s)('m')
+        self.assertEqual(calls, ['m', None, (s, 'm')])
+        with self.assertRaises(TypeError):
+            create_handler_caller(decorated)('m')
+
     def test_failing_set_context(self):
         s = TestSkill1()
         s.bind(self.emitter)
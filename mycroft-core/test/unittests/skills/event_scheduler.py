@@ -0,0 +1,130 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tempfile
+import time
+import unittest
+from threading import Lock
+
+from os.path import join
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.event_scheduler import EventScheduler
+
+
+class MockEmitter(object):
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+        self.lock = Lock()
+
+    def on(self, event, f):
+        self.handlers[event] = f
+
+    def remove_all_listeners(self, event):
+        self.handlers.pop(event, None)
+
+    def emit(self, message):
+        with self.lock:
+            self.emitted.append((time.time(), message))
+
+    def trigger(self, message):
+        self.handlers[message.type](message)
+
+    def times(self, event):
+        with self.lock:
+            return [t for t, m in self.emitted if m.type == event]
+
+    def data(self, event):
+        with self.lock:
+            return [m.data for t, m in self.emitted if m.type == event]
+
+
+class EventSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.schedule_file = join(self.dir, 'schedule.json')
+        self.emitter = MockEmitter()
+        self.scheduler = EventScheduler(self.emitter, self.schedule_file)
+
+    def tearDown(self):
+        if self.scheduler.isAlive():
+            self.scheduler.shutdown()
+        shutil.rmtree(self.dir)
+
+    def test_schedule(self):
+        start = time.time()
+        self.scheduler.schedule_event('late', start + 0.2)
+        self.scheduler.schedule_event('early', start + 0.1, data={'a': 1})
+        time.sleep(0.3)
+        early = self.emitter.times('early')
+        late = self.emitter.times('late')
+        self.assertEqual(len(early), 1)
+        self.assertEqual(len(late), 1)
+        # Emitted on time, not at the next poll
+        self.assertTrue(early[0] - start < 0.15)
+        self.assertTrue(early[0] < late[0])
+        self.assertEqual(self.emitter.data('early'), [{'a': 1}])
+        self.assertEqual(self.scheduler.events, {})
+
+    def test_repeat_and_remove(self):
+        self.scheduler.schedule_event('repeat', time.time() + 0.05, 0.1)
+        time.sleep(0.32)
+        self.scheduler.remove_event('repeat')
+        count = len(self.emitter.times('repeat'))
+        self.assertEqual(count, 3)
+        time.sleep(0.2)
+        self.assertEqual(len(self.emitter.times('repeat')), count)
+
+    def test_messagebus_api(self):
+        now = time.time()
+        self.emitter.trigger(Message('mycroft.scheduler.schedule_event', {
+            'event': 'bus', 'time': now + 0.1, 'data': {'old': True}}))
+        self.emitter.trigger(Message('mycroft.scheduler.update_event', {
+            'event': 'bus', 'data': {'new': True}}))
+        self.emitter.trigger(Message('mycroft.scheduler.schedule_event', {
+            'event': 'removed', 'time': now + 0.1}))
+        self.emitter.trigger(Message('mycroft.scheduler.remove_event', {
+            'event': 'removed'}))
+        time.sleep(0.2)
+        self.assertEqual(self.emitter.data('bus'), [{'new': True}])
+        self.assertEqual(self.emitter.times('removed'), [])
+
+    def test_store_and_load(self):
+        future = time.time() + 100
+        self.scheduler.schedule_event('pending', future, data={'x': 1})
+        self.scheduler.schedule_event('repeating', future, 10)
+        self.scheduler.schedule_event('past', time.time() + 0.05)
+        time.sleep(0.1)
+        self.scheduler.shutdown()
+
+        self.scheduler = EventScheduler(self.emitter, self.schedule_file)
+        self.assertEqual(self.scheduler.events,
+                         {'pending': [[future, None, {'x': 1}]]})
+
+    def test_crash(self):
+        future = time.time() + 100
+        self.scheduler.schedule_event('a', future)
+        self.scheduler.schedule_event('b', future)
+        self.scheduler.update_event('b', {'updated': True})
+        self.scheduler.remove_event('a')
+        time.sleep(self.scheduler.journal.sync_interval + 0.1)
+        # Another scheduler reading the files without a shutdown
+        restarted = EventScheduler(MockEmitter(), self.schedule_file)
+        try:
+            self.assertEqual(restarted.events,
+                             {'b': [[future, None, {'updated': True}]]})
+        finally:
+            restarted.shutdown()
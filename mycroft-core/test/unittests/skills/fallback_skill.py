@@ -0,0 +1,136 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import unittest
+
+import mock
+
+from mycroft.configuration import Configuration
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import FallbackSkill, _FallbackEmitter
+
+
+class MockEmitter(object):
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, message):
+        self.emitted.append(message)
+
+
+def make_fallback(name, result, delay=0.0, emitter=None):
+    def fallback(message):
+        if emitter:
+            emitter.emit(Message('speak', {'utterance': name}))
+        time.sleep(delay)
+        return result
+    fallback.__name__ = name
+    return fallback
+
+
+class FallbackSkillTest(unittest.TestCase):
+    def setUp(self):
+        self.handlers = FallbackSkill.fallback_handlers
+        self.sorted = FallbackSkill.sorted_fallback_handlers
+        FallbackSkill.fallback_handlers = {}
+        FallbackSkill.sorted_fallback_handlers = []
+        self.config = {'skills': {'fallback': {}}}
+        patcher = mock.patch.object(Configuration, 'get',
+                                    return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        FallbackSkill.fallback_handlers = self.handlers
+        FallbackSkill.sorted_fallback_handlers = self.sorted
+
+    def handled_by(self, emitter=None):
+        emitter = emitter or MockEmitter()
+        handler = FallbackSkill.make_intent_failure_handler(emitter)
+        handler(Message('intent_failure', {'utterance': 'test'}))
+        complete = emitter.emitted[-1]
+        self.assertEqual(complete.type, 'mycroft.skill.handler.complete')
+        return complete.data.get('fallback_handler')
+
+    def test_registration_order(self):
+        low = make_fallback('low', False)
+        high = make_fallback('high', False)
+        FallbackSkill._register_fallback(low, 50)
+        FallbackSkill._register_fallback(high, 10)
+        FallbackSkill._register_fallback(high, 10)
+        self.assertEqual(FallbackSkill.sorted_fallback_handlers,
+                         [(10, high), (11, high), (50, low)])
+        FallbackSkill.remove_fallback(low)
+        self.assertEqual(FallbackSkill.sorted_fallback_handlers,
+                         [(10, high), (11, high)])
+
+    def test_sequential(self):
+        FallbackSkill._register_fallback(make_fallback('low', True), 50)
+        FallbackSkill._register_fallback(make_fallback('high', False), 10)
+        self.assertEqual(self.handled_by(), 'low')
+
+    def test_none_handled(self):
+        FallbackSkill._register_fallback(make_fallback('a', False), 50)
+        self.assertEqual(self.handled_by(), None)
+
+    def test_concurrent_priority(self):
+        self.config['skills']['fallback'] = {'concurrent': True}
+        FallbackSkill._register_fallback(make_fallback('high', True, 0.3),
+                                         10)
+        FallbackSkill._register_fallback(make_fallback('mid', False, 0.3),
+                                         20)
+        FallbackSkill._register_fallback(make_fallback('low', True), 50)
+        start = time.time()
+        self.assertEqual(self.handled_by(), 'high')
+        self.assertTrue(time.time() - start < 0.55)
+
+    def test_concurrent_timeout(self):
+        self.config['skills']['fallback'] = {
+            'concurrent': True,
+            'timeout': 5,
+            'timeouts': {'slow': 0.1}
+        }
+        FallbackSkill._register_fallback(make_fallback('slow', True, 1.0),
+                                         10)
+        FallbackSkill._register_fallback(make_fallback('fast', True), 50)
+        start = time.time()
+        self.assertEqual(self.handled_by(), 'fast')
+        self.assertTrue(time.time() - start < 0.5)
+
+    def test_concurrent_messages(self):
+        self.config['skills']['fallback'] = {'concurrent': True}
+        emitter = MockEmitter()
+        skill_emitter = _FallbackEmitter(emitter)
+        FallbackSkill._register_fallback(
+            make_fallback('high', True, 0.2, skill_emitter), 10)
+        FallbackSkill._register_fallback(
+            make_fallback('low', True, 0.0, skill_emitter), 50)
+        self.assertEqual(self.handled_by(emitter), 'high')
+        # Only the winner speaks, before the handling completes
+        self.assertEqual([(m.type, m.data.get('utterance'))
+                          for m in emitter.emitted[1:]],
+                         [('speak', 'high'),
+                          ('mycroft.skill.handler.complete', None)])
+
+    def test_sequential_messages(self):
+        emitter = MockEmitter()
+        FallbackSkill._register_fallback(
+            make_fallback('a', True, 0.0, _FallbackEmitter(emitter)), 10)
+        self.assertEqual(self.handled_by(emitter), 'a')
+        self.assertEqual(emitter.emitted[1].type, 'speak')
+
+
+if __name__ == '__main__':
+    unittest.main()
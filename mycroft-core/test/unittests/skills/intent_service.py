@@ -14,7 +14,12 @@
 #
 import unittest
 
-from mycroft.skills.intent_service import ContextManager
+import mock
+from adapt.intent import IntentBuilder
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.intent_service import ContextManager, IntentService
+from mycroft.skills.skill_registry import SkillRegistry
 
 
 class MockEmitter(object):
@@ -70,5 +75,32 @@ class ContextManagerTest(unittest.TestCase):
         self.assertEqual(len(self.context_manager.frame_stack), 0)
 
 
+class IntentServiceTest(unittest.TestCase):
+    def setUp(self):
+        SkillRegistry.instance().clear()
+        self.service = IntentService(mock.Mock())
+
+    def tearDown(self):
+        SkillRegistry.instance().clear()
+
+    def register(self, name):
+        intent = IntentBuilder(name).require('Keyword').build()
+        self.service.handle_register_intent(
+            Message('register_intent', intent.__dict__))
+
+    def test_detach_skill(self):
+        self.register('12:a')
+        self.register('12:b')
+        self.register('123:a')
+        self.service.handle_detach_skill(
+            Message('detach_skill', {'skill_id': '12:'}))
+        self.assertEqual([p.name for p in self.service.engine.intent_parsers],
+                         ['123:a'])
+        # Only intents listed in the registry are detached
+        self.service.handle_detach_skill(
+            Message('detach_skill', {'skill_id': '1'}))
+        self.assertEqual(len(self.service.engine.intent_parsers), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
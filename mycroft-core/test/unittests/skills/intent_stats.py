@@ -0,0 +1,88 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+from mycroft.messagebus.message import Message
+from mycroft.metrics import MetricsAggregator, Stopwatch
+from mycroft.skills.core import MycroftSkill
+from mycroft.skills.intent_stats import IntentStats
+
+
+class MockEmitter(object):
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+
+    def on(self, event, f):
+        self.handlers[event] = f
+
+    def emit(self, message):
+        self.emitted.append(message)
+
+
+class IntentStatsTest(unittest.TestCase):
+    def setUp(self):
+        IntentStats.clear()
+
+    def test_stopwatch_context(self):
+        stopwatch = Stopwatch()
+        with stopwatch:
+            pass
+        self.assertTrue(stopwatch.time >= 0.0)
+
+    def test_timer_stats(self):
+        metrics = MetricsAggregator(max_samples=2)
+        metrics.timer('t', 1.0)
+        metrics.timer('t', 2.0)
+        metrics.timer('t', 4.0)
+        stats = metrics.timer_stats()['t']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['min'], 2.0)
+        self.assertEqual(stats['max'], 4.0)
+        self.assertEqual(stats['mean'], 3.0)
+        self.assertEqual(stats['last'], 4.0)
+
+    def test_query(self):
+        emitter = MockEmitter()
+        IntentStats.init(emitter)
+        IntentStats.timer('adapt', 0.5)
+        emitter.handlers['mycroft.debug.intent_stats'](
+            Message('mycroft.debug.intent_stats'))
+        reply = emitter.emitted[0]
+        self.assertEqual(reply.type, 'mycroft.debug.intent_stats.response')
+        stages = reply.data['stages']
+        self.assertEqual(stages['mycroft.intent.adapt.time_s']['count'], 1)
+
+    def test_handler_dispatch(self):
+        emitter = MockEmitter()
+        IntentStats.init(emitter)
+        skill = MycroftSkill()
+        skill.bind(emitter)
+        skill.add_event('a', lambda message: None, intent=True)
+        skill.add_event('b', lambda message: None)
+        emitter.handlers['a'](Message('a'))
+        emitter.handlers['b'](Message('b'))
+        stages = IntentStats.summary()
+        # Only the intent handler is timed
+        self.assertEqual(stages['mycroft.intent.dispatch.time_s']['count'], 1)
+
+    def test_not_answering(self):
+        # Like a skill worker process, nothing answers the queries
+        IntentStats.timer('dispatch', 0.5)
+        self.assertEqual(IntentStats.summary(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
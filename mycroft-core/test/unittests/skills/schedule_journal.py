@@ -0,0 +1,102 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import shutil
+import tempfile
+import unittest
+
+from os.path import join, getsize
+
+from mycroft.skills.schedule_journal import ScheduleJournal
+
+
+class ScheduleJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = join(self.dir, 'schedule.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_changes(self, journal):
+        journal.append('schedule', 'a', time=10, repeat=None, data={})
+        journal.append('schedule', 'a', time=20, repeat=None, data={})
+        journal.append('schedule', 'b', time=30, repeat=5, data={})
+        journal.append('update', 'a', data={'x': 1})
+        journal.append('fire', 'a', time=10)
+        journal.append('remove', 'b')
+
+    def test_replay(self):
+        journal = ScheduleJournal(self.path)
+        self.assertEqual(journal.load(), {})
+        self.write_changes(journal)
+        self.assertIsNotNone(journal.sync_time())
+        journal.sync()
+        self.assertIsNone(journal.sync_time())
+        journal.close()
+
+        # A change cut off by a crash is ignored
+        with open(self.path + '.journal', 'a') as f:
+            f.write('{"seq": 7, "op": "rem')
+        journal = ScheduleJournal(self.path)
+        self.assertEqual(journal.load(), {'a': [[20, None, {}]]})
+        self.assertEqual(journal.seq, 6)
+
+    def test_compaction(self):
+        journal = ScheduleJournal(self.path, compact_changes=6)
+        journal.load()
+        self.write_changes(journal)
+        self.assertTrue(journal.needs_compaction({}))
+        journal.compact({'a': [[20, None, {}]]})
+        self.assertFalse(journal.needs_compaction({}))
+        self.assertEqual(getsize(self.path + '.journal'), 0)
+        journal.append('schedule', 'c', time=40, repeat=None, data={})
+        journal.close()
+
+        journal = ScheduleJournal(self.path)
+        self.assertEqual(journal.load(), {'a': [[20, None, {}]],
+                                          'c': [[40, None, {}]]})
+        self.assertEqual(journal.seq, 7)
+
+    def test_compaction_counts_entries(self):
+        journal = ScheduleJournal(self.path, compact_changes=6)
+        journal.load()
+        self.write_changes(journal)
+        journal.append('schedule', 'c', time=40, repeat=None, data={})
+        # Seven changes, smaller than a snapshot of eight entries
+        events = {'a': [[i, None, {}] for i in range(4)],
+                  'c': [[i, None, {}] for i in range(4)]}
+        self.assertFalse(journal.needs_compaction(events))
+        journal.append('remove', 'c')
+        self.assertTrue(journal.needs_compaction(events))
+        journal.close()
+
+    def test_snapshot_newer_than_journal(self):
+        # Crash after writing the snapshot, before emptying the journal
+        journal = ScheduleJournal(self.path)
+        journal.load()
+        self.write_changes(journal)
+        journal.close()
+        with open(self.path, 'w') as f:
+            json.dump({'seq': 6, 'events': {'a': [[20, None, {}]]}}, f)
+        journal = ScheduleJournal(self.path)
+        self.assertEqual(journal.load(), {'a': [[20, None, {}]]})
+
+    def test_old_schedule_file(self):
+        with open(self.path, 'w') as f:
+            json.dump({'a': [[20, None, {}]]}, f)
+        journal = ScheduleJournal(self.path)
+        self.assertEqual(journal.load(), {'a': [[20, None, {}]]})
+        self.assertEqual(journal.seq, 0)
@@ -13,20 +13,73 @@
 # limitations under the License.
 #
 import json
+import os
+import shutil
+import stat
+import tempfile
+import time
 import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
 
-from os import remove
-from os.path import join, dirname
+import mock
+from os import rename
+from os.path import join, dirname, isfile
 
-from mycroft.skills.settings import SkillSettings
+from mycroft.api import DeviceApi
+from mycroft.skills.settings import SkillSettings, hash_meta
+from mycroft.skills.settings_sync import SettingsSync
+
+
+class SlowBackend(HTTPServer):
+    """ Skill settings endpoint answering after a delay. """
+
+    def __init__(self, delay):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), SlowBackendHandler)
+        self.delay = delay
+        self.settings = []
+        self.requests = []
+
+    def api(self):
+        api = DeviceApi()
+        api.url = 'http://127.0.0.1:{}'.format(self.server_port)
+        api.version = 'v1'
+        return api
+
+
+class SlowBackendHandler(BaseHTTPRequestHandler):
+    def respond(self, data):
+        time.sleep(self.server.delay)
+        body = json.dumps(data)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append('GET')
+        self.respond(self.server.settings)
+
+    def do_PUT(self):
+        self.server.requests.append('PUT')
+        length = int(self.headers.getheader('Content-Length'))
+        meta = json.loads(self.rfile.read(length))
+        self.server.settings.append({'uuid': 'meta-uuid',
+                                     'identifier': meta['identifier'],
+                                     'skillMetadata': meta['skillMetadata']})
+        self.respond({})
+
+    def log_message(self, *args):
+        pass
 
 
 class SkillSettingsTest(unittest.TestCase):
     def setUp(self):
-        try:
-            remove(join(dirname(__file__), 'settings', 'settings.json'))
-        except OSError:
-            pass
+        # Emptied, not removed, to keep the permissions of the file
+        with open(join(dirname(__file__), 'settings', 'settings.json'),
+                  'w') as f:
+            f.write('{}')
 
     def test_new(self):
         s = SkillSettings(join(dirname(__file__), 'settings'),
@@ -96,6 +149,94 @@ class SkillSettingsTest(unittest.TestCase):
                            "test-skill-settings")
         self.assertTrue(len(s) == len(s2))
 
+    def test_dirty_tracking(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        self.assertTrue(s._is_stored)
+        s['d'] = {'a': [1]}
+        self.assertFalse(s._is_stored)
+        s.store()
+        self.assertTrue(s._is_stored)
+
+        s['d'] = {'a': [1]}  # Same value
+        self.assertTrue(s._is_stored)
+        s['d']['a'].append(2)
+        self.assertFalse(s._is_stored)
+        s.store()
+        del s['d']
+        self.assertFalse(s._is_stored)
+        s.store()
+        self.assertEqual(json.load(open(s._settings_path)), {})
+
+    def test_assigned_list_kept(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        l = []
+        s['l'] = l
+        s.store()
+        # The list isn't copied, changing it changes the settings
+        l.append(1)
+        self.assertIs(s['l'], l)
+        self.assertFalse(s._is_stored)
+        s.store()
+        self.assertEqual(json.load(open(s._settings_path)), {'l': [1]})
+        self.assertTrue(s._is_stored)
+
+    def test_store_later(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        with mock.patch('mycroft.skills.settings.STORE_DELAY', 0.1), \
+                mock.patch('os.rename', wraps=rename) as mock_rename:
+            for i in range(100):
+                s['counter'] = i
+                s.store_later()
+            self.assertEqual(mock_rename.call_count, 0)
+            time.sleep(0.2)
+            self.assertEqual(mock_rename.call_count, 1)
+            self.assertTrue(s._is_stored)
+            with open(s._settings_path) as f:
+                self.assertEqual(json.load(f), {'counter': 99})
+
+            # Written on shutdown without waiting
+            s['counter'] = 100
+            s.store_later()
+            s.shutdown()
+            self.assertEqual(mock_rename.call_count, 2)
+            with open(s._settings_path) as f:
+                self.assertEqual(json.load(f), {'counter': 100})
+            time.sleep(0.2)
+            self.assertEqual(mock_rename.call_count, 2)
+
+    def test_failed_write(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        s['a'] = 1
+        s.store()
+        s['a'] = 2
+        with mock.patch('os.rename', side_effect=OSError('disk full')):
+            s.store()
+        # The old settings are intact and the change is still pending
+        with open(s._settings_path) as f:
+            self.assertEqual(json.load(f), {'a': 1})
+        self.assertFalse(s._is_stored)
+        s.store()
+        with open(s._settings_path) as f:
+            self.assertEqual(json.load(f), {'a': 2})
+
+    def test_mode_kept(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = join(directory, 'settings.json')
+            with open(path, 'w') as f:
+                f.write('{}')
+            os.chmod(path, 0o600)
+            s = SkillSettings(directory, "test-skill-settings")
+            s['a'] = 1
+            s.store()
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+        finally:
+            shutil.rmtree(directory)
+
     def test_load_existing(self):
         directory = join(dirname(__file__), 'settings', 'settings.json')
         with open(directory, 'w') as f:
@@ -105,5 +246,69 @@ class SkillSettingsTest(unittest.TestCase):
         self.assertEqual(len(s), 1)
 
 
+class SettingsMetaTest(unittest.TestCase):
+    META = {'skillMetadata': {'sections': [{'name': 'Options', 'fields': [
+        {'name': 'color', 'type': 'text', 'value': 'red'}]}]}}
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        with open(join(self.dir, 'settingsmeta.json'), 'w') as f:
+            json.dump(self.META, f)
+        with open(join(self.dir, 'settings.json'), 'w') as f:
+            json.dump({'color': 'blue'}, f)
+        self.backend = SlowBackend(delay=0.5)
+        server = Thread(target=self.backend.serve_forever)
+        server.daemon = True
+        server.start()
+        self.sync = SettingsSync(api=self.backend.api())
+        patcher = mock.patch.object(SettingsSync, 'instance',
+                                    return_value=self.sync)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.backend.shutdown()
+        self.backend.server_close()
+        shutil.rmtree(self.dir)
+
+    def test_stable_hash(self):
+        reordered = json.loads(json.dumps(self.META))
+        self.assertEqual(hash_meta(self.META, 'device'),
+                         hash_meta(reordered, 'device'))
+        self.assertNotEqual(hash_meta(self.META, 'device'),
+                            hash_meta(self.META, 'other device'))
+
+    def test_upload_in_background(self):
+        start = time.time()
+        s = SkillSettings(self.dir, 'test-skill-settings')
+        self.assertTrue(time.time() - start < 0.25)
+        self.assertEqual(s['color'], 'blue')  # local settings
+        self.assertEqual(self.backend.requests, [])
+
+        s._meta_thread.join()
+        self.assertEqual(self.backend.requests, ['PUT', 'GET'])
+        hashed = hash_meta(self.META, s._device_identity)
+        with open(join(self.dir, 'hash')) as f:
+            self.assertEqual(f.read(), hashed)
+        with open(join(self.dir, 'uuid')) as f:
+            self.assertEqual(f.read(), 'meta-uuid')
+        # Registered with the values from the backend
+        self.assertEqual(self.sync.skills, {hashed: s})
+        self.assertEqual(s['color'], 'red')
+        s.shutdown()
+        self.assertEqual(self.sync.skills, {})
+
+    def test_unchanged_meta(self):
+        s = SkillSettings(self.dir, 'test-skill-settings')
+        s._meta_thread.join()
+        s.shutdown()
+        self.sync.fetched = 0
+        s = SkillSettings(self.dir, 'test-skill-settings')
+        s._meta_thread.join()
+        # Only checked to be still in the backend
+        self.assertEqual(self.backend.requests, ['PUT', 'GET', 'GET'])
+        s.shutdown()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,185 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from threading import Event, Thread
+
+from mycroft.api import DeviceApi
+from mycroft.skills.settings_sync import SettingsSync
+
+
+def skill_settings(identifier, **values):
+    fields = [{'name': k, 'value': v} for k, v in values.items()]
+    return {'identifier': identifier,
+            'skillMetadata': {'sections': [{'name': 'a', 'fields': fields}]}}
+
+
+class Backend(HTTPServer):
+    """ Skill settings endpoint supporting If-None-Match. """
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), BackendHandler)
+        self.settings = []
+        self.version = 0
+        self.requests = []  # (path, If-None-Match header)
+
+    def change(self, settings):
+        self.settings = settings
+        self.version += 1
+
+
+class BackendHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        etag = '"{}"'.format(server.version)
+        server.requests.append((self.path,
+                                self.headers.getheader('If-None-Match')))
+        if self.headers.getheader('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = json.dumps(server.settings)
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockSettings(dict):
+    name = 'mock'
+
+    def update_remote(self, values):
+        self.updates = getattr(self, 'updates', [])
+        self.updates.append(values)
+        self.update(values)
+
+
+class SettingsSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = Backend()
+        self.server = Thread(target=self.backend.serve_forever)
+        self.server.daemon = True
+        self.server.start()
+        api = DeviceApi()
+        api.url = 'http://127.0.0.1:{}'.format(self.backend.server_port)
+        api.version = 'v1'
+        self.sync = SettingsSync(api=api)
+
+    def tearDown(self):
+        self.backend.shutdown()
+        self.backend.server_close()
+
+    def test_one_request_per_sync(self):
+        self.backend.change([skill_settings('a', x=1),
+                             skill_settings('b', y=2)])
+        a, b = MockSettings(), MockSettings()
+        self.sync.register(a, 'a')
+        self.sync.register(b, 'b')
+        self.sync.sync()
+        self.assertEqual(len(self.backend.requests), 1)
+        path, etag = self.backend.requests[0]
+        self.assertTrue(path.startswith('/v1/device/'))
+        self.assertTrue(path.endswith('/skill'))
+        self.assertEqual(etag, None)
+        self.assertEqual(a, {'x': 1})
+        self.assertEqual(b, {'y': 2})
+        self.sync.unregister(a)
+        self.sync.unregister(b)
+        self.assertEqual(self.sync._timer, None)
+
+    def test_changed_skills_only(self):
+        self.backend.change([skill_settings('a', x=1),
+                             skill_settings('b', y=2)])
+        a, b = MockSettings(), MockSettings()
+        self.sync.register(a, 'a')
+        self.sync.register(b, 'b')
+        self.sync.sync()
+        self.backend.change([skill_settings('a', x=1),
+                             skill_settings('b', y=3)])
+        self.sync.sync()
+        self.assertEqual(a.updates, [{'x': 1}])
+        self.assertEqual(b.updates, [{'y': 2}, {'y': 3}])
+        self.sync.unregister(a)
+        self.sync.unregister(b)
+
+    def test_not_modified(self):
+        self.backend.change([skill_settings('a', x=1)])
+        a = MockSettings()
+        self.sync.register(a, 'a')
+        self.sync.sync()
+        self.sync.sync()
+        self.assertEqual(self.backend.requests[1][1], '"1"')
+        self.assertEqual(a.updates, [{'x': 1}])
+        # Served from the previous download
+        self.assertEqual(self.sync.remote_settings(max_age=0),
+                         [skill_settings('a', x=1)])
+        self.sync.unregister(a)
+
+    def test_shared_download(self):
+        self.backend.change([skill_settings('a', x=1)])
+        self.sync.remote_settings()
+        self.sync.remote_settings()
+        self.assertEqual(len(self.backend.requests), 1)
+        # A skill registering later gets the downloaded values
+        a = MockSettings()
+        self.sync.register(a, 'a')
+        self.assertEqual(a, {'x': 1})
+        self.sync.unregister(a)
+
+    def test_changes_passed_by_other_downloads(self):
+        self.backend.change([skill_settings('a', x=1)])
+        a = MockSettings()
+        self.sync.register(a, 'a')
+        self.sync.sync()
+        self.backend.change([skill_settings('a', x=2)])
+        # Another skill being loaded downloads the settings
+        self.sync.remote_settings(max_age=0)
+        self.sync.sync()
+        self.assertEqual(a.updates, [{'x': 1}, {'x': 2}])
+        self.sync.unregister(a)
+
+    def test_register_during_download(self):
+        self.backend.change([skill_settings('a', x=1)])
+        started, release = Event(), Event()
+        get = self.sync._get
+
+        def slow_get(etag):
+            started.set()
+            release.wait(5)
+            return get(etag)
+
+        self.sync._get = slow_get
+        download = Thread(target=self.sync.fetch)
+        download.start()
+        try:
+            self.assertTrue(started.wait(5))
+            # The slow backend doesn't hold up the registrations
+            a = MockSettings()
+            registration = Thread(target=lambda: (self.sync.register(a, 'a'),
+                                                  self.sync.unregister(a)))
+            registration.start()
+            registration.join(2)
+            self.assertFalse(registration.is_alive())
+        finally:
+            release.set()
+            download.join()
+        self.assertEqual(self.sync.values, {'a': {'x': 1}})
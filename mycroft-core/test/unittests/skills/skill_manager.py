@@ -0,0 +1,267 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import os
+from os.path import join
+
+from mycroft.messagebus.message import Message
+from mycroft.skills import main
+from mycroft.skills.skill_manifest import LazySkill
+from mycroft.skills.skill_registry import SkillRegistry
+from mycroft.skills.supervisor import SkillWorker, FALLBACK_REPORT
+
+SLOW_SKILL = """
+import time
+from mycroft.skills.core import MycroftSkill
+
+
+class SlowSkill(MycroftSkill):
+    def initialize(self):
+        time.sleep(0.5)
+
+
+def create_skill():
+    return SlowSkill()
+"""
+
+HELLO_SKILL = """
+from adapt.intent import IntentBuilder
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import MycroftSkill
+
+
+class HelloSkill(MycroftSkill):
+    def initialize(self):
+        intent = IntentBuilder('HelloIntent').require('HelloKeyword')
+        self.register_intent(intent, self.handle_hello)
+
+    def handle_hello(self, message):
+        self.emitter.emit(Message('hello.handled'))
+
+
+def create_skill():
+    return HelloSkill()
+"""
+
+
+QUICK_SKILL = """
+from mycroft.skills.core import MycroftSkill
+
+
+class QuickSkill(MycroftSkill):
+    pass
+
+
+def create_skill():
+    return QuickSkill()
+"""
+
+# Updates quick-a, then waits for the test to let it finish
+MSM_SCRIPT = """#!/bin/sh
+echo "Updating {skills_dir}/quick-a..."
+touch -d '+1 hour' {skills_dir}/quick-a/__init__.py
+while [ ! -e {skills_dir}/done ]; do sleep 0.05; done
+echo "Ignoring {skills_dir}/quick-b, skill has been modified."
+"""
+
+
+class MockEmitter(object):
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+
+    def on(self, event, f):
+        self.handlers.setdefault(event, []).append(f)
+
+    def remove(self, event, f):
+        self.handlers[event].remove(f)
+
+    def emit(self, message):
+        self.emitted.append(message)
+
+    def trigger(self, message):
+        for f in list(self.handlers.get(message.type, [])):
+            f(message)
+
+    def types(self):
+        return [m.type for m in self.emitted]
+
+
+class SkillManagerTest(unittest.TestCase):
+    def setUp(self):
+        SkillRegistry.instance().clear()
+        self.skills_dir = tempfile.mkdtemp()
+        for name in ['slow-a', 'slow-b', 'slow-c']:
+            os.mkdir(join(self.skills_dir, name))
+            with open(join(self.skills_dir, name, '__init__.py'), 'w') as f:
+                f.write(SLOW_SKILL)
+        os.mkdir(join(self.skills_dir, 'not-a-skill'))
+
+    def tearDown(self):
+        SkillRegistry.instance().clear()
+        shutil.rmtree(self.skills_dir)
+
+    @mock.patch.object(main, 'LOAD_WORKERS', 3)
+    def test_parallel_load(self):
+        with mock.patch.object(main, 'SKILLS_DIR', self.skills_dir):
+            manager = main.SkillManager(MockEmitter())
+            start = time.time()
+            manager.load_skill_list(['slow-a', 'slow-b', 'slow-c',
+                                     'not-a-skill'])
+            elapsed = time.time() - start
+
+        for name in ['slow-a', 'slow-b', 'slow-c']:
+            skill = manager.loaded_skills[name]
+            self.assertIsNotNone(skill['instance'])
+            self.assertTrue(skill['load_time'] >= 0.5)
+            skill['instance'].shutdown()
+        self.assertFalse(manager.loaded_skills['not-a-skill'].get('loaded'))
+        self.assertTrue(elapsed < 1.5)
+
+    @mock.patch.object(main, 'WORKERS', 1)
+    @mock.patch.object(SkillWorker, 'start')
+    def test_worker_fallback(self, _):
+        emitter = MockEmitter()
+        with mock.patch.object(main, 'SKILLS_DIR', self.skills_dir):
+            manager = main.SkillManager(emitter)
+            manager.load_skill_list(['slow-a'])
+            skill = manager.loaded_skills['slow-a']
+            self.assertTrue(skill['worker'])
+            self.assertNotIn('instance', skill)
+
+            # The worker found slow-a to be a fallback skill
+            emitter.trigger(Message(FALLBACK_REPORT, {
+                'skill_path': join(self.skills_dir, 'slow-a')}))
+            moved = manager._move_fallback_skills()
+            self.assertEqual(moved, ['slow-a'])
+            self.assertIsNone(manager.supervisor.worker_of('slow-a'))
+            manager.load_skill_list(moved)
+        self.assertNotIn('worker', skill)
+        self.assertIsNotNone(skill['instance'])
+        skill['instance'].shutdown()
+
+    def test_lazy_loading(self):
+        hello = join(self.skills_dir, 'hello')
+        os.makedirs(join(hello, 'vocab', 'en-us'))
+        with open(join(hello, '__init__.py'), 'w') as f:
+            f.write(HELLO_SKILL)
+        with open(join(hello, 'vocab', 'en-us', 'HelloKeyword.voc'),
+                  'w') as f:
+            f.write('hello\n')
+
+        manifest = join(self.skills_dir, 'manifest.json')
+        with mock.patch.multiple(main, SKILLS_DIR=self.skills_dir,
+                                 LAZY_LOADING=True, MANIFEST_FILE=manifest):
+            # First start loads the skill and records the manifest
+            emitter = MockEmitter()
+            manager = main.SkillManager(emitter)
+            manager.load_skill_list(['hello', 'slow-a'])
+            self.assertNotIsInstance(
+                manager.loaded_skills['hello']['instance'], LazySkill)
+            # Compare as sent over the messagebus
+            registrations = json.loads(json.dumps(
+                [m.data for m in emitter.emitted]))
+            for skill in manager.loaded_skills.values():
+                skill['instance'].shutdown()
+
+            # Second start registers from the manifest without importing
+            SkillRegistry.instance().clear()
+            emitter = MockEmitter()
+            manager = main.SkillManager(emitter)
+            manager.load_skill_list(['hello', 'slow-a'])
+
+        skill = manager.loaded_skills['hello']['instance']
+        self.assertIsInstance(skill, LazySkill)
+        self.assertIsNone(skill.instance)
+        self.assertEqual([m.data for m in emitter.emitted], registrations)
+        # Skills without intents are never lazy, nothing would load them
+        self.assertNotIsInstance(
+            manager.loaded_skills['slow-a']['instance'], LazySkill)
+
+        emitter.emitted = []
+        intent_name = str(skill.skill_id) + ':HelloIntent'
+        emitter.trigger(Message(intent_name, {'HelloKeyword': 'hello'}))
+        self.assertIsNotNone(skill.instance)
+        self.assertNotIn('register_intent', emitter.types())
+        self.assertIn('hello.handled', emitter.types())
+
+        # Later intents go directly to the loaded skill
+        emitter.emitted = []
+        emitter.trigger(Message(intent_name, {'HelloKeyword': 'hello'}))
+        self.assertEqual(emitter.types().count('hello.handled'), 1)
+        skill.shutdown()
+        manager.loaded_skills['slow-a']['instance'].shutdown()
+
+    def test_msm_update(self):
+        for name in ['quick-a', 'quick-b']:
+            os.mkdir(join(self.skills_dir, name))
+            with open(join(self.skills_dir, name, '__init__.py'), 'w') as f:
+                f.write(QUICK_SKILL)
+        msm = join(self.skills_dir, 'msm')
+        with open(msm, 'w') as f:
+            f.write(MSM_SCRIPT.format(skills_dir=self.skills_dir))
+        os.chmod(msm, 0o755)
+
+        emitter = MockEmitter()
+        with mock.patch.multiple(main, SKILLS_DIR=self.skills_dir,
+                                 MSM_BIN=msm):
+            manager = main.SkillManager(emitter)
+            manager.load_skill_list(['quick-a', 'quick-b'])
+            old_a = manager.loaded_skills['quick-a']['instance']
+            old_b = manager.loaded_skills['quick-b']['instance']
+
+            self.assertTrue(manager.download_skills())
+            while 'quick-a' not in manager.msm_job.busy():
+                time.sleep(0.01)
+            # Skills msm isn't working on are reloaded while it runs
+            now = time.time() + 60
+            os.utime(join(self.skills_dir, 'quick-b', '__init__.py'),
+                     (now, now))
+            manager._load_skills(['quick-a', 'quick-b'])
+            self.assertIs(manager.loaded_skills['quick-a']['instance'],
+                          old_a)
+            self.assertIsNot(manager.loaded_skills['quick-b']['instance'],
+                             old_b)
+            self.assertFalse(manager.download_skills())
+
+            open(join(self.skills_dir, 'done'), 'w').close()
+            manager.msm_job.join()
+            changed = manager.finish_download()
+            self.assertEqual(changed, ['quick-a', 'quick-b'])
+            manager._load_skills([])  # Held back skills are reloaded
+            self.assertIsNot(manager.loaded_skills['quick-a']['instance'],
+                             old_a)
+            self.assertTrue(manager.next_download > time.time() + 3000)
+
+        progress = [m.data for m in emitter.emitted
+                    if m.type == 'msm.progress']
+        self.assertEqual(progress[0]['skill'], 'quick-a')
+        self.assertEqual(len(progress), 2)
+        finished = [m.data for m in emitter.emitted
+                    if m.type == 'msm.finished']
+        self.assertEqual(finished, [{'returncode': 0,
+                                     'changed': ['quick-a', 'quick-b']}])
+        for skill in manager.loaded_skills.values():
+            skill['instance'].shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+from mycroft.skills.skill_registry import SkillRegistry, \
+    skill_id_from_intent, approximate_size
+
+
+class Skill(object):
+    def __init__(self, shared):
+        self.name = 'Skill'
+        self.shared = shared
+        self.data = ['x' * 1000 for _ in range(10)]
+        self.events = [('a', None), ('b', None)]
+
+
+class SkillRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = SkillRegistry()
+        self.registry['skill-a'] = {'id': 12, 'loaded': True,
+                                    'load_time': 0.5}
+        self.registry['skill-b'] = {'id': -7}
+
+    def test_skill_id_from_intent(self):
+        self.assertEqual(skill_id_from_intent('12:Intent'), 12)
+        self.assertEqual(skill_id_from_intent('-7:a.intent'), -7)
+        self.assertEqual(skill_id_from_intent('Intent'), None)
+        self.assertEqual(skill_id_from_intent('x:Intent'), None)
+
+    def test_lookup(self):
+        self.assertEqual(self.registry.by_id(12)['load_time'], 0.5)
+        self.assertEqual(self.registry.folder_of(-7), 'skill-b')
+        self.assertEqual(self.registry.by_intent('-7:Hello'), {'id': -7})
+        self.assertEqual(self.registry.by_intent('3:Hello'), None)
+        del self.registry['skill-b']
+        self.assertEqual(self.registry.by_id(-7), None)
+
+    def test_intents(self):
+        self.registry.add_intent('12:a')
+        self.registry.add_intent('12:b')
+        self.registry.add_intent('-7:a')
+        self.registry.remove_intent('12:b')
+        self.assertEqual(self.registry.intents_of(12), set(['12:a']))
+        self.assertEqual(self.registry.remove_intents(-7), set(['-7:a']))
+        self.assertEqual(self.registry.intents_of(-7), set())
+
+    def test_describe(self):
+        shared = ['y' * 100000]
+        self.registry['skill-a']['instance'] = Skill(shared)
+        self.registry.add_intent('12:a')
+        skills = self.registry.describe(exclude=[shared])
+        a = skills['skill-a']
+        self.assertEqual(a['intents'], 1)
+        self.assertEqual(a['handlers'], 2)
+        self.assertEqual(a['load_time'], 0.5)
+        self.assertTrue(10000 < a['memory'] < 100000)
+        self.assertEqual(skills['skill-b']['memory'], None)
+
+    def test_approximate_size(self):
+        small = approximate_size({'a': 1})
+        large = approximate_size({'a': 'x' * 10000})
+        self.assertTrue(large - small >= 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
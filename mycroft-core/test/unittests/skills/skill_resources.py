@@ -0,0 +1,135 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import sys
+import unittest
+from StringIO import StringIO
+from threading import Timer, Thread, Event
+
+from pyee import EventEmitter
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import MycroftSkill
+from mycroft.skills.skill_registry import SkillRegistry
+from mycroft.skills.skill_resources import LeakTracker, account, \
+    print_report
+
+
+class MockEmitter(object):
+    def __init__(self):
+        self.emitter = EventEmitter()
+
+    def on(self, event, f):
+        self.emitter.on(event, f)
+
+    def remove(self, event, f):
+        self.emitter.remove_listener(event, f)
+
+    def emit(self, message):
+        self.emitter.emit(message.type, message)
+
+
+class ResourceSkill(MycroftSkill):
+    def initialize(self):
+        self.add_event('resource.test', self.handler)
+        self.stop_worker = Event()
+        self.worker = Thread(target=self.work)
+        self.worker.daemon = True
+        self.worker.start()
+        self.timer = Timer(60, self.handler, [None])
+        self.timer.daemon = True
+        self.timer.start()
+        self.add_timer(60, self.handler, [None])
+
+    def handler(self, message):
+        sum(range(10000))
+
+    def work(self):
+        self.stop_worker.wait()
+
+    def shutdown(self):
+        super(ResourceSkill, self).shutdown()
+        self.stop_worker.set()
+        self.timer.cancel()
+        self.worker.join()
+        self.timer.join()
+
+
+# Skill classes are attributed to the skill folder by their module
+ResourceSkill.__module__ = 'skill-resource__init__'
+sys.modules[ResourceSkill.__module__] = sys.modules[__name__]
+
+
+class SkillResourcesTest(unittest.TestCase):
+    def setUp(self):
+        self.emitter = MockEmitter()
+        self.registry = SkillRegistry()
+        self.tracker = LeakTracker()
+        self.skill = self.load()
+
+    def tearDown(self):
+        self.skill.shutdown()
+
+    def load(self):
+        skill = ResourceSkill()
+        skill.bind(self.emitter)
+        skill.initialize()
+        self.registry['skill-resource'] = {'id': 1, 'instance': skill}
+        return skill
+
+    def test_account(self):
+        self.emitter.emit(Message('resource.test'))
+        self.emitter.emit(Message('resource.test'))
+        skills = account(self.registry, self.emitter, self.tracker)
+        report = skills['skill-resource']
+        # mycroft.stop and resource.test
+        self.assertEqual(report['listeners'], 2)
+        self.assertEqual(report['stale_listeners'], 0)
+        self.assertEqual(report['threads'], [self.skill.worker.name])
+        self.assertEqual(report['timers'], 2)
+        self.assertEqual(report['handler_calls'], 2)
+        self.assertTrue(report['handler_cpu_time'] >= 0)
+        self.assertTrue(report['memory'] > 0)
+        self.assertEqual(report['leaked_instances'], [])
+
+    def test_leak(self):
+        old = self.skill
+        old.shutdown()
+        # A listener the shutdown doesn't remove keeps the instance alive
+        self.emitter.on('leaked', old.handler)
+        self.tracker.track('skill-resource', old)
+        del old
+        self.skill = self.load()
+
+        skills = account(self.registry, self.emitter, self.tracker)
+        report = skills['skill-resource']
+        self.assertEqual(report['listeners'], 2)
+        self.assertEqual(report['stale_listeners'], 1)
+        self.assertEqual(len(report['leaked_instances']), 1)
+        leak = report['leaked_instances'][0]
+        self.assertEqual(leak['name'], 'ResourceSkill')
+        self.assertTrue(leak['memory'] > 0)
+
+        out = StringIO()
+        print_report(skills, out)
+        self.assertIn('ResourceSkill (skill-resource) unloaded',
+                      out.getvalue())
+
+    def test_freed_instance_is_not_leaked(self):
+        old = self.skill
+        old.shutdown()
+        self.tracker.track('skill-resource', old)
+        del old
+        self.skill = self.load()
+        self.assertEqual(self.tracker.leaks(), [])
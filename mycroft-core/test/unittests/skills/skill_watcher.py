@@ -0,0 +1,107 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tempfile
+import time
+import unittest
+
+import os
+from os.path import join
+
+from mycroft.skills.settings import SkillSettings
+from mycroft.skills.skill_watcher import is_relevant, \
+    PollingSkillWatcher, InotifySkillWatcher
+
+
+def touch(path, mtime=None):
+    with open(path, 'a'):
+        pass
+    if mtime:
+        os.utime(path, (mtime, mtime))
+
+
+class SkillWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.skills_dir = tempfile.mkdtemp()
+        os.mkdir(join(self.skills_dir, 'skill-a'))
+        touch(join(self.skills_dir, 'skill-a', '__init__.py'),
+              time.time() - 10)
+
+    def tearDown(self):
+        shutil.rmtree(self.skills_dir)
+
+    def test_is_relevant(self):
+        self.assertTrue(is_relevant('skill-a/__init__.py'))
+        self.assertTrue(is_relevant('skill-a/vocab/en-us/Test.voc'))
+        self.assertFalse(is_relevant('skill-a/__init__.pyc'))
+        self.assertFalse(is_relevant('skill-a/settings.json'))
+        self.assertFalse(is_relevant('skill-a/settings.json.tmp'))
+        self.assertFalse(is_relevant('skill-a/hash'))
+        self.assertFalse(is_relevant('skill-a/uuid'))
+        self.assertFalse(is_relevant('skill-a/.git/HEAD'))
+        self.assertFalse(is_relevant('.'))
+
+    def check_watcher(self, watcher):
+        self.assertEqual(watcher.wait(0.1), [])
+        # Files written at runtime don't change the skill
+        for name in ('settings.json', '.settings.json.tmp', 'hash', 'uuid',
+                     '__init__.pyc'):
+            touch(join(self.skills_dir, 'skill-a', name))
+        timeout = time.time() + 0.5
+        while time.time() < timeout:
+            self.assertEqual(watcher.wait(0.1), [])
+        touch(join(self.skills_dir, 'skill-a', 'new.py'))
+        changed = []
+        timeout = time.time() + 5
+        while not changed and time.time() < timeout:
+            changed = watcher.wait(0.1)
+        self.assertEqual(changed, ['skill-a'])
+        self.assertEqual(watcher.wait(0.1), [])
+        watcher.stop()
+
+    def check_settings_store(self, watcher):
+        self.assertEqual(watcher.wait(0.1), [])
+        settings = SkillSettings(join(self.skills_dir, 'skill-a'), 'skill-a')
+        for i in range(3):
+            settings['value'] = i
+            settings.store()
+        timeout = time.time() + 0.5
+        while time.time() < timeout:
+            self.assertEqual(watcher.wait(0.1), [])
+        watcher.stop()
+
+    def test_polling(self):
+        self.check_watcher(PollingSkillWatcher(self.skills_dir, 0.1, 0.1))
+
+    def test_polling_settings_store(self):
+        self.check_settings_store(
+            PollingSkillWatcher(self.skills_dir, 0.1, 0.1))
+
+    def inotify_watcher(self):
+        try:
+            import pyinotify
+        except ImportError:
+            self.skipTest('pyinotify not installed')
+        return InotifySkillWatcher(self.skills_dir, 0.1)
+
+    def test_inotify(self):
+        self.check_watcher(self.inotify_watcher())
+
+    def test_inotify_settings_store(self):
+        self.check_settings_store(self.inotify_watcher())
+
+
+if __name__ == '__main__':
+    unittest.main()
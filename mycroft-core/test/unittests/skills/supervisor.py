@@ -0,0 +1,133 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import sys
+import tempfile
+import unittest
+
+import mock
+from os.path import join
+
+from mycroft.skills.container import SkillContainer
+from mycroft.skills.core import FallbackSkill
+from mycroft.skills.supervisor import SkillSupervisor, SkillWorker, \
+    FALLBACK_REPORT
+
+# Stands in for the skill container, waits to be interrupted
+SLEEPER = [sys.executable, '-c', 'import time; time.sleep(60)']
+
+FALLBACK_SKILL = """
+from mycroft.skills.core import FallbackSkill
+
+
+class Fallback(FallbackSkill):
+    def initialize(self):
+        self.register_fallback(self.handle_fallback, 50)
+
+    def handle_fallback(self, message):
+        return False
+
+
+def create_skill():
+    return Fallback()
+"""
+
+
+@mock.patch.object(SkillWorker, 'command', SLEEPER)
+class SkillSupervisorTest(unittest.TestCase):
+    def setUp(self):
+        self.emitter = mock.Mock()
+        self.supervisor = SkillSupervisor(2, ['skill-noisy'], 0.0,
+                                          self.emitter)
+
+    def tearDown(self):
+        self.supervisor.stop()
+
+    def test_distribution(self):
+        self.supervisor.load({'skill-a': '/skills/skill-a',
+                              'skill-b': '/skills/skill-b',
+                              'skill-c': '/skills/skill-c',
+                              'skill-noisy': '/skills/skill-noisy'})
+        stats = self.supervisor.stats()
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(sorted(len(s['skills']) for s in stats), [1, 1, 2])
+        noisy = self.supervisor.worker_of('skill-noisy')
+        self.assertTrue(noisy.pinned)
+        self.assertEqual(list(noisy.skills), ['skill-noisy'])
+        for s in stats:
+            self.assertIsNotNone(s['pid'])
+            self.assertTrue(s['rss'] > 0)
+
+    def test_reload_restarts_worker(self):
+        self.supervisor.load({'skill-a': '/skills/skill-a'})
+        worker = self.supervisor.worker_of('skill-a')
+        pid = worker.process.pid
+        self.supervisor.load({'skill-a': '/skills/skill-a'})
+        self.assertNotEqual(worker.process.pid, pid)
+        self.assertEqual(worker.restarts, 0)
+        # The skills were shut down by the worker
+        self.assertFalse(self.emitter.emit.called)
+
+    def test_restart_crashed(self):
+        self.supervisor.load({'skill-a': '/skills/skill-a'})
+        worker = self.supervisor.worker_of('skill-a')
+        worker.process.kill()
+        worker.process.wait()
+        self.supervisor.check()
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(worker.restarts, 1)
+        # Intents of the crashed skills are removed
+        message = self.emitter.emit.call_args[0][0]
+        self.assertEqual(message.type, 'detach_skill')
+        self.assertEqual(message.data['skill_id'],
+                         str(hash('/skills/skill-a')) + ':')
+
+    def test_release(self):
+        self.supervisor.load({'skill-a': '/skills/skill-a',
+                              'skill-b': '/skills/skill-b'})
+        self.assertTrue(self.supervisor.release('skill-a'))
+        self.assertIsNone(self.supervisor.worker_of('skill-a'))
+        self.assertFalse(self.supervisor.release('skill-a'))
+
+
+class SkillContainerTest(unittest.TestCase):
+    def setUp(self):
+        self.skill_dir = tempfile.mkdtemp()
+        with open(join(self.skill_dir, '__init__.py'), 'w') as f:
+            f.write(FALLBACK_SKILL)
+
+    def tearDown(self):
+        shutil.rmtree(self.skill_dir)
+
+    @mock.patch('mycroft.skills.container.Configuration')
+    @mock.patch('mycroft.skills.container.WebsocketClient')
+    def test_fallback_handed_back(self, _, __):
+        container = SkillContainer(['--worker', self.skill_dir])
+        container.load_skill()
+        self.assertEqual(container.skills, {})
+        self.assertEqual(FallbackSkill.fallback_handlers, {})
+        message = container.ws.emit.call_args[0][0]
+        self.assertEqual(message.type, FALLBACK_REPORT)
+        self.assertEqual(message.data['skill_path'], self.skill_dir)
+
+        # Outside of a worker the skill is kept
+        container = SkillContainer([self.skill_dir])
+        container.load_skill()
+        self.assertEqual(len(container.skills), 1)
+        container.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import select
+import threading
+import time
+import unittest
+
+import mock
+
+from mycroft.skills.timer_service import TimerService
+
+
+class TimerServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.service = TimerService()
+        self.calls = []
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def callback(self, name):
+        self.calls.append((name, time.time()))
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+    def test_order(self):
+        threads = threading.active_count()
+        start = time.time()
+        for name, delay in [('c', 0.15), ('a', 0.05), ('b', 0.1)]:
+            self.service.schedule(delay, self.callback, [name])
+        # All timers share one thread
+        self.assertEqual(threading.active_count(), threads + 1)
+        time.sleep(0.25)
+        self.assertEqual(self.names(), ['a', 'b', 'c'])
+        self.assertTrue(self.calls[0][1] - start < 0.1)
+        self.assertEqual(self.service.pending(), [])
+
+    def test_repeat_cancel_and_reschedule(self):
+        repeating = self.service.schedule(0.05, self.callback, ['r'],
+                                          repeat=0.1)
+        moved = self.service.schedule(10, self.callback, ['moved'])
+        cancelled = self.service.schedule(0.05, self.callback, ['c'])
+        cancelled.cancel()
+        moved.reschedule(0.1)
+        self.assertFalse(cancelled.is_pending())
+        time.sleep(0.28)
+        repeating.cancel()
+        time.sleep(0.15)
+        self.assertEqual(self.names(), ['r', 'moved', 'r', 'r'])
+
+    def test_failing_callback(self):
+        def fail():
+            raise ValueError('Test')
+        self.service.schedule(0.01, fail)
+        self.service.schedule(0.02, self.callback, ['after'])
+        time.sleep(0.1)
+        self.assertEqual(self.names(), ['after'])
+
+    def test_lazy_cancel(self):
+        timers = [self.service.schedule(600, self.callback, [i])
+                  for i in range(100)]
+        for timer in timers[:50]:
+            timer.cancel()
+        # Cancelled timers stay in the heap until they make up half of it
+        self.assertEqual(len(self.service._heap), 100)
+        self.assertEqual(len(self.service.pending()), 50)
+        timers[50].cancel()
+        self.assertEqual(len(self.service._heap), 49)
+        timers[51].reschedule(0.01)
+        time.sleep(0.1)
+        self.assertEqual(self.names(), [51])
+        self.assertEqual(len(self.service.pending()), 48)
+
+    def test_sleeps_until_due(self):
+        self.service.schedule(600, self.callback, ['late'])
+        time.sleep(0.05)
+        with mock.patch('select.select', wraps=select.select) as sel:
+            time.sleep(0.3)
+        self.assertEqual(sel.call_count, 0)
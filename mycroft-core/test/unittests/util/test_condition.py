@@ -0,0 +1,66 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import select
+import time
+import unittest
+from threading import Thread
+
+import mock
+
+from mycroft.util.condition import BlockingCondition
+
+
+class TestBlockingCondition(unittest.TestCase):
+    def setUp(self):
+        self.cond = BlockingCondition()
+
+    def tearDown(self):
+        self.cond.close()
+
+    def test_timeout(self):
+        with mock.patch('select.select', wraps=select.select) as sel:
+            start = time.time()
+            with self.cond:
+                self.cond.wait(0.3)
+            self.assertTrue(0.25 < time.time() - start < 1.0)
+            # Slept in one go instead of polling
+            self.assertEqual(sel.call_count, 1)
+
+    def test_notify(self):
+        def notify():
+            time.sleep(0.1)
+            with self.cond:
+                self.cond.notify()
+
+        Thread(target=notify).start()
+        start = time.time()
+        with self.cond:
+            self.cond.wait(5)
+        self.assertTrue(time.time() - start < 1.0)
+
+    def test_notify_not_lost(self):
+        with self.cond:
+            self.cond.notify()
+            self.cond.notify()
+            start = time.time()
+            self.cond.wait(5)
+            self.assertTrue(time.time() - start < 1.0)
+            # Both notifications were consumed
+            self.cond.wait(0.1)
+            self.assertTrue(time.time() - start >= 0.1)
+
+    def test_closed(self):
+        self.cond.close()
+        self.cond.notify()
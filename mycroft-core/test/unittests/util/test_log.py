@@ -16,6 +16,7 @@ import unittest
 import sys
 from cStringIO import StringIO
 from threading import Thread
+from mycroft.configuration import Configuration
 from mycroft.util.log import LOG
 
 
@@ -39,6 +40,10 @@ class CaptureLogs(list):
 
 
 class TestLog(unittest.TestCase):
+    def setUp(self):
+        # Don't capture the log of a remote configuration refresh
+        Configuration.wait_for_refresh()
+
     def test_threads(self):
         with CaptureLogs() as output:
             def test_logging():